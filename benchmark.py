@@ -0,0 +1,938 @@
+"""性能基准测试
+
+在离屏 Qt 下用模拟桌面（FakeBackend 窗口表、显示器布局、鼠标轨迹脚本）运行
+WindowManager 的跟踪和隐藏/显示逻辑，输出耗时/内存结果，不需要 Windows 和 pywin32。
+
+用法：
+    python benchmark.py                          运行全部场景
+    python benchmark.py window_list 'tracking_*' 只运行指定场景（支持通配符）
+    python benchmark.py --list                   列出所有场景
+    python benchmark.py --json results.json      同时把结果保存为 JSON
+    python benchmark.py --compare base.json      与之前保存的结果对比，超过阈值的退化返回非零
+"""
+import argparse
+import collections
+import datetime
+import fnmatch
+import functools
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt6.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QScrollArea, QFrame, QListView
+
+import window_manager as wm
+from wmtesting import (DESKTOP_MONITORS, RSS_SCRIPT, STARTUP_SCRIPT, TICK_MS, close_manager, fake_manager,
+                       flush_events, run_client, run_python, run_script)
+
+SCENARIOS = {}
+
+
+def scenario(func):
+    SCENARIOS[func.__name__[len('bench_'):]] = func
+    return func
+
+
+class LegacyWindowList(QWidget):
+    """旧版 update_window_list 的实现，每次状态变化都重建整个控件树，仅用于对比"""
+
+    def __init__(self, target_windows, is_hidden):
+        super().__init__()
+        self.target_windows = target_windows
+        self.is_hidden = is_hidden
+        self.main_layout = QVBoxLayout(self)
+        self.main_layout.addWidget(QLabel('header'))
+
+    def remove_window(self, hwnd):
+        pass
+
+    def update_window_list(self):
+        if hasattr(self, 'windows_layout'):
+            while self.windows_layout.count():
+                item = self.windows_layout.takeAt(0)
+                if item.widget():
+                    item.widget().deleteLater()
+                elif item.layout():
+                    while item.layout().count():
+                        sub_item = item.layout().takeAt(0)
+                        if sub_item.widget():
+                            sub_item.widget().deleteLater()
+            self.main_layout.removeItem(self.windows_layout)
+
+        self.windows_layout = QVBoxLayout()
+        self.windows_layout.setSpacing(5)
+        scroll_widget = QWidget()
+        scroll_layout = QVBoxLayout(scroll_widget)
+        scroll_layout.setSpacing(5)
+        for hwnd, title in self.target_windows.items():
+            window_widget = QWidget()
+            window_layout = QHBoxLayout(window_widget)
+            window_layout.setContentsMargins(5, 2, 5, 2)
+            status = "已隐藏" if self.is_hidden.get(hwnd, False) else "显示中"
+            window_label = QLabel(f"• {title} ({status})")
+            window_label.setWordWrap(True)
+            window_layout.addWidget(window_label, stretch=1)
+            delete_btn = QPushButton("删除")
+            delete_btn.setMaximumWidth(60)
+            delete_btn.clicked.connect(lambda checked, h=hwnd: self.remove_window(h))
+            window_layout.addWidget(delete_btn)
+            scroll_layout.addWidget(window_widget)
+        if not self.target_windows:
+            scroll_layout.addWidget(QLabel("未选择任何窗口"))
+        scroll_layout.addStretch()
+        scroll_area = QScrollArea()
+        scroll_area.setWidget(scroll_widget)
+        scroll_area.setWidgetResizable(True)
+        scroll_area.setFrameShape(QFrame.Shape.NoFrame)
+        self.windows_layout.addWidget(scroll_area)
+        self.main_layout.insertLayout(1, self.windows_layout)
+
+
+def measure(app, changes, apply_change):
+    """执行 changes 次状态变化，返回每次的平均耗时、Python 内存分配峰值和控件创建数
+
+    计时和内存统计分两轮进行，避免 tracemalloc 本身的开销影响计时。
+    """
+    start = time.perf_counter()
+    for i in range(changes):
+        apply_change(i)
+        flush_events(app)
+    elapsed = time.perf_counter() - start
+
+    alloc_changes = min(changes, 10)
+    widgets_created = 0
+    tracemalloc.start()
+    for i in range(alloc_changes):
+        before = len(QApplication.allWidgets())
+        apply_change(i)
+        widgets_created += len(QApplication.allWidgets()) - before
+        flush_events(app)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'ms_per_change': elapsed * 1000 / changes,
+        'alloc_peak_kb': peak / 1024,
+        'widgets_created_per_change': widgets_created / alloc_changes,
+    }
+
+
+@scenario
+def bench_window_list(app, count=200, changes=50):
+    """窗口列表：每次隐藏/显示状态变化的开销，旧版整体重建 vs 模型 dataChanged"""
+    titles = {0x1000 + i * 4: f'Tool window {i}' for i in range(count)}
+    hwnds = list(titles)
+
+    hidden = {hwnd: False for hwnd in hwnds}
+    legacy = LegacyWindowList(titles, hidden)
+    legacy.resize(500, 600)
+    legacy.show()
+    legacy.update_window_list()
+    app.processEvents()
+
+    def legacy_change(i):
+        hwnd = hwnds[i % count]
+        hidden[hwnd] = not hidden[hwnd]
+        legacy.update_window_list()
+
+    legacy_result = measure(app, changes, legacy_change)
+    legacy.close()
+    legacy.deleteLater()
+    flush_events(app)
+
+    records = {hwnd: wm.ManagedWindow(hwnd, title) for hwnd, title in titles.items()}
+    model = wm.WindowListModel(records)
+    view = QListView()
+    view.setModel(model)
+    view.setItemDelegate(wm.WindowListDelegate(view))
+    view.setUniformItemSizes(True)
+    view.resize(500, 600)
+    view.show()
+    for hwnd in hwnds:
+        model.add_window(hwnd)
+    app.processEvents()
+
+    def model_change(i):
+        record = records[hwnds[i % count]]
+        record.state = wm.STATE_VISIBLE if record.hidden else wm.STATE_HIDDEN
+        model.update_window(record.hwnd)
+
+    model_result = measure(app, changes, model_change)
+    view.close()
+    return {'windows': count, 'legacy_rebuild': legacy_result, 'model': model_result}
+
+
+def cursor_stream(width, height, moves):
+    """生成一条确定的鼠标轨迹：在屏幕内来回扫动，并周期性地贴到右边缘和顶部边缘"""
+    points = []
+    for i in range(moves):
+        phase = i % 400
+        if phase < 300:
+            x, y = (i * 37) % width, (i * 53) % height
+        elif phase < 350:
+            x, y = width - 1 - (phase % 4), (i * 11) % height
+        else:
+            x, y = (i * 13) % width, phase % 3
+        points.append((x, y))
+    return points
+
+
+@scenario
+def bench_edge_trigger(app, zones=50, moves=200000):
+    """边缘触发：鼠标钩子回调中 EdgeZoneMatcher.feed 对录制轨迹的单次耗时"""
+    width, height = 1920, 1080
+    layout = wm.MonitorLayout([(0, 0, width, height)])
+    matcher = wm.EdgeZoneMatcher()
+    index = wm.EdgeZoneIndex(layout, matcher)
+    right = layout.edges['right'][0]
+    top = layout.edges['top'][0]
+    span = height // (zones // 2)
+    for i in range(zones // 2):
+        index.add(0x1000 + i, right, i * span, (i + 1) * span)
+        index.add(0x2000 + i, top, i * span, (i + 1) * span)
+    points = cursor_stream(width, height, moves)
+
+    feed = matcher.feed
+    events = 0
+    start = time.perf_counter()
+    for x, y in points:
+        events += len(feed(x, y))
+    elapsed = time.perf_counter() - start
+    return {
+        'zones': zones,
+        'moves': moves,
+        'events': events,
+        'us_per_move': elapsed * 1e6 / moves,
+    }
+
+
+@scenario
+def bench_slide_animation(app, count=20, duration_ms=150, frame_ms=16):
+    """滑动动画：多个窗口同时滑出时的帧数、每帧后端调用次数和耗时"""
+    backend = wm.FakeBackend()
+    clock = wm.VirtualClock()
+    animator = wm.SlideAnimator(backend, duration_ms=duration_ms, frame_interval_ms=frame_ms, clock=clock)
+    targets = {}
+    for i in range(count):
+        hwnd = backend.add_window((1500, i * 40, 1900, i * 40 + 300))
+        targets[hwnd] = (1915, i * 40, 2315, i * 40 + 300)
+        animator.animate(hwnd, backend.windows[hwnd]['rect'], targets[hwnd])
+
+    backend.calls.clear()
+    frames = 0
+    calls_per_frame = []
+    start = time.perf_counter()
+    while animator.is_animating():
+        before = sum(backend.calls.values())
+        clock.advance(frame_ms)
+        animator.step(clock())
+        frames += 1
+        calls_per_frame.append(sum(backend.calls.values()) - before)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'windows': count,
+        'frames': frames,
+        'backend_calls_per_frame': max(calls_per_frame),
+        'ms_per_frame': elapsed * 1000 / frames,
+    }
+
+
+class SimulatedDesktop:
+    """模拟桌面：FakeBackend 窗口表 + 显示器布局 + 在其上运行的 WindowManager
+
+    docked_ratio 比例的窗口贴在右侧显示器的右边缘或左侧显示器的顶部边缘，
+    其余窗口放在屏幕中间。动画时长设为 0，只测量检测本身；
+    管理器使用虚拟时钟，每次检测推进 TICK_MS，隐藏/显示延迟按检测次数确定地生效。
+    """
+
+    def __init__(self, count, docked_ratio=0.5, monitors=DESKTOP_MONITORS):
+        self.monitors = monitors
+        self.backend = wm.FakeBackend()
+        self.manager = fake_manager(self.backend, monitors)
+        self.manager.animator.duration_ms = 0
+        self.clock = wm.VirtualClock()
+        self.manager.clock = self.clock
+        self.right = max(x + width for x, y, width, height in monitors)
+        self.height = min(height for x, y, width, height in monitors)
+        docked = round(count * docked_ratio)
+        for i in range(count):
+            top = (i * 37) % (self.height - 200)
+            if i < docked and i % 2 == 0:
+                rect = (self.right - 300, top, self.right, top + 200)
+            elif i < docked:
+                left = (i * 53) % 1600
+                rect = (left, 0, left + 300, 200)
+            else:
+                left = 200 + (i * 53) % (self.right - 800)
+                rect = (left, top + 50, left + 300, top + 250)
+            self.add(rect, f'Window {i}')
+
+    def add(self, rect, title):
+        hwnd = self.backend.add_window(rect, title)
+        self.manager.add_window(hwnd, title)
+        return hwnd
+
+    def run(self, points):
+        """按鼠标轨迹逐个执行检测，返回每次检测的耗时（秒）"""
+        backend = self.backend
+        check = self.manager.check_window_position
+        durations = []
+        for point in points:
+            backend.cursor = point
+            self.clock.advance(TICK_MS)
+            start = time.perf_counter()
+            check()
+            durations.append(time.perf_counter() - start)
+        return durations
+
+    def wander_script(self, ticks):
+        """鼠标在整个桌面内来回移动，周期性贴到边缘"""
+        return cursor_stream(self.right, self.height, ticks)
+
+    def hover_storm_script(self, ticks):
+        """鼠标沿右边缘和顶部边缘快速扫动，每隔一次移出触发区域，不断触发显示/隐藏"""
+        points = []
+        for i in range(ticks):
+            along = (i * 37) % self.height
+            if i % 4 == 0:
+                points.append((self.right - 1, along))
+            elif i % 4 == 2:
+                points.append(((i * 53) % 1600 + 10, 0))
+            else:
+                points.append((self.right // 2, self.height // 2))
+        return points
+
+    def close(self):
+        close_manager(self.manager)
+
+
+def synthetic_window_table(backend, count, processes=200):
+    """生成模拟的顶层窗口表：processes 个进程各自的窗口类，标题为 '文档 N - 程序名'"""
+    hwnds = []
+    for i in range(count):
+        process = i % processes
+        left = (i * 53) % 1600
+        top = (i * 37) % 800
+        hwnds.append(backend.add_window(
+            (left, top, left + 300, top + 200), f'Document {i} - App{process}',
+            exe=f'app{process}.exe', class_name=f'AppWindow{process}',
+        ))
+    return hwnds
+
+
+@scenario
+def bench_session_restore(app, count=1000, managed=50):
+    """会话恢复：一次枚举在大量顶层窗口中找回上次管理的窗口的耗时和后端调用"""
+    directory = tempfile.mkdtemp(prefix='wm_session_')
+    path = os.path.join(directory, 'session.json')
+    backend = wm.FakeBackend()
+    hwnds = synthetic_window_table(backend, count)
+    right = DESKTOP_MONITORS[-1][0] + DESKTOP_MONITORS[-1][2]
+    entries = []
+    for i, hwnd in enumerate(hwnds[:managed]):
+        window = backend.windows[hwnd]
+        top = window['rect'][1]
+        # 一半停靠在右边缘（上次退出时处于隐藏状态），一半是普通窗口
+        rect = (right - 300, top, right, top + 200) if i % 2 == 0 else window['rect']
+        entries.append(wm.SessionEntry(window['exe'], window['class_name'], window['title'], 'right' if i % 2 == 0 else None, rect))
+    wm.SessionStore(path).save(entries)
+
+    manager = fake_manager(backend, session_path=path)
+    manager.animator.duration_ms = 0
+    backend.calls.clear()
+    start = time.perf_counter()
+    manager.acquire_startup_windows()
+    elapsed = time.perf_counter() - start
+    restore_calls = dict(backend.calls)
+    acquired = len(manager.managed)
+    close_manager(manager)
+    flush_events(app)
+    shutil.rmtree(directory)
+    return {
+        'windows': count,
+        'managed': acquired,
+        'restore_ms': elapsed * 1000,
+        'backend_calls': restore_calls,
+    }
+
+
+def naive_rule_match(rules, compiled, exe, class_name, title):
+    """逐条规则比较的参考实现，用于对比耗时"""
+    for rule, title_re in zip(rules, compiled):
+        if rule.exe and rule.exe.lower() != exe.lower():
+            continue
+        if rule.class_name and rule.class_name.lower() != class_name.lower():
+            continue
+        if title_re and not title_re.search(title):
+            continue
+        return rule
+    return None
+
+
+def synthetic_rules(count, processes=200):
+    rules = []
+    for i in range(count):
+        process = (i * 7) % processes
+        kind = i % 3
+        if kind == 0:
+            rules.append(wm.WindowRule(f'app{process}.exe', None, None, 'right', None))
+        elif kind == 1:
+            rules.append(wm.WindowRule(None, f'AppWindow{process}', rf'Document {i}\d* - ', 'top', 0))
+        else:
+            rules.append(wm.WindowRule(f'app{process}.exe', f'AppWindow{process}', rf'^Document \d+{i} ', None, None))
+    return rules
+
+
+@scenario
+def bench_rule_matcher(app, windows=1000, rules=50, repeat=5):
+    """规则引擎：合并匹配器的编译耗时，以及与逐条匹配对比的每个窗口匹配耗时"""
+    backend = wm.FakeBackend()
+    table = [(w['exe'], w['class_name'], w['title'])
+             for w in map(backend.windows.get, synthetic_window_table(backend, windows))]
+    rule_list = synthetic_rules(rules)
+    start = time.perf_counter()
+    matcher = wm.RuleMatcher(rule_list)
+    compile_ms = (time.perf_counter() - start) * 1000
+    compiled = [re.compile(rule.title) if rule.title else None for rule in rule_list]
+    hits = sum(matcher.match(*row) is not None for row in table)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for row in table:
+            matcher.match(*row)
+    combined_us = (time.perf_counter() - start) * 1e6 / (repeat * windows)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for row in table:
+            naive_rule_match(rule_list, compiled, *row)
+    naive_us = (time.perf_counter() - start) * 1e6 / (repeat * windows)
+    return {
+        'windows': windows,
+        'rules': rules,
+        'matches': hits,
+        'compile_ms': compile_ms,
+        'us_per_window': combined_us,
+        'naive_us_per_window': naive_us,
+    }
+
+
+def synthetic_snapshot(count, monitors=DESKTOP_MONITORS):
+    """生成按 Z 序排列的模拟窗口快照：大小不一的普通窗口，每 50 个中有一个最大化窗口"""
+    windows = []
+    for i in range(count):
+        x, y, width, height = monitors[i % len(monitors)]
+        if i % 50 == 49:
+            rect = (x, y, x + width, y + height)
+        else:
+            w = 300 + (i * 97) % 900
+            h = 200 + (i * 61) % 600
+            left = x + (i * 53) % (width - 200)
+            top = y + (i * 37) % (height - 100)
+            rect = (left, top, left + w, top + h)
+        windows.append(wm.WindowInfo(0x1000 + 4 * i, rect, f'Window {i}', f'Class{i % 200}', 1000 + i % 200))
+    return windows
+
+
+def naive_hit_test(windows, point):
+    x, y = point
+    for window in windows:
+        left, top, right, bottom = window.rect
+        if left <= x < right and top <= y < bottom:
+            return window
+    return None
+
+
+def bench_window_picker(app, count, points=20000, builds=5):
+    """选择窗口：快照索引的构建耗时、命中测试延迟（与线性扫描对比）"""
+    windows = synthetic_snapshot(count)
+    bounds = wm.MonitorLayout(DESKTOP_MONITORS).bounds()
+    build_ms = []
+    for _ in range(builds):
+        start = time.perf_counter()
+        index = wm.WindowPickIndex(windows, bounds)
+        build_ms.append((time.perf_counter() - start) * 1000)
+
+    width, height = bounds[2] - bounds[0], bounds[3] - bounds[1]
+    samples = [((i * 7919) % width, (i * 104729) % height) for i in range(points)]
+    durations = []
+    for point in samples:
+        start = time.perf_counter()
+        index.hit_test(point)
+        durations.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    for point in samples[:2000]:
+        naive_hit_test(windows, point)
+    naive_us = (time.perf_counter() - start) * 1e6 / 2000
+
+    return {
+        'windows': count,
+        'cells': len(index.cells),
+        'build_ms': sorted(build_ms)[builds // 2],
+        'hit_us': percentiles(durations),
+        'naive_hit_us': naive_us,
+    }
+
+
+for _count in (1000, 5000):
+    SCENARIOS[f'window_picker_{_count}'] = functools.partial(bench_window_picker, count=_count)
+
+
+@scenario
+def bench_command_worker(app, moves=200):
+    """窗口命令执行器：后台线程下一个窗口每次调用阻塞 300ms 时，提交命令的耗时和合并的命令数"""
+    backend = wm.FlakyBackend()
+    hung = backend.add_window((0, 0, 100, 100), 'Hung')
+    healthy = backend.add_window((0, 0, 100, 100), 'Healthy')
+    backend.delays[hung] = 300
+    worker = wm.WindowCommandWorker(backend)
+    reports = []
+    worker.results_ready.connect(lambda: reports.extend(worker.drain()))
+    worker.start()
+    submit_us = []
+    for i in range(moves):
+        start = time.perf_counter()
+        worker.move_windows([(hung, i, 0, 100, 100), (healthy, i, 0, 100, 100)])
+        submit_us.append(time.perf_counter() - start)
+        time.sleep(0.002)
+    deadline = time.perf_counter() + 5
+    while time.perf_counter() < deadline and (not reports or backend.windows[healthy]['rect'][0] != moves - 1):
+        app.processEvents()
+        time.sleep(0.01)
+    worker.stop()
+    app.processEvents()
+    return {
+        'submitted': worker.counts['submitted'],
+        'coalesced': worker.counts['coalesced'],
+        'executed': worker.counts['executed'],
+        'hung_window_calls': backend.calls['move_window'],
+        'submit_us': percentiles(submit_us),
+    }
+
+
+def percentiles(durations):
+    """返回以微秒为单位的 p50/p95/p99/max"""
+    ordered = sorted(durations)
+    n = len(ordered)
+
+    def pick(fraction):
+        return ordered[min(n - 1, int(fraction * n))] * 1e6
+
+    return {'p50': pick(0.50), 'p95': pick(0.95), 'p99': pick(0.99), 'max': ordered[-1] * 1e6}
+
+
+def bench_tracking(app, count, docked_ratio, script, ticks=2000):
+    """跟踪检测：模拟桌面上每次检测的耗时分布、后端调用次数和内存"""
+    desktop = SimulatedDesktop(count, docked_ratio)
+    points = getattr(desktop, f'{script}_script')(ticks)
+    # 预热：先让停靠在边缘的窗口隐藏
+    desktop.run(points[:20])
+    desktop.backend.calls.clear()
+    durations = desktop.run(points)
+    calls = desktop.backend.calls
+    hidden = sum(record.hidden for record in desktop.manager.managed.values())
+    desktop.close()
+    flush_events(app)
+
+    # 内存单独测量一轮，避免 tracemalloc 影响计时
+    tracemalloc.start()
+    desktop = SimulatedDesktop(count, docked_ratio)
+    desktop.run(points[:200])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    desktop.close()
+    flush_events(app)
+    return {
+        'windows': count,
+        'docked_ratio': docked_ratio,
+        'script': script,
+        'ticks': ticks,
+        'tick_us': percentiles(durations),
+        'backend_calls_per_tick': sum(calls.values()) / ticks,
+        'backend_calls': dict(sorted(calls.items())),
+        'hidden_at_end': hidden,
+        'python_peak_kb': peak / 1024,
+    }
+
+
+for _count in (1, 10, 100, 500):
+    for _mix, _ratio in (('undocked', 0.0), ('mixed', 0.5), ('docked', 1.0)):
+        SCENARIOS[f'tracking_{_mix}_{_count}'] = functools.partial(
+            bench_tracking, count=_count, docked_ratio=_ratio, script='wander')
+    SCENARIOS[f'hover_storm_{_count}'] = functools.partial(
+        bench_tracking, count=_count, docked_ratio=1.0, script='hover_storm')
+
+
+@scenario
+def bench_stats_overhead(app, count=50, ticks=1000, rounds=9):
+    """性能统计：开启与关闭时每次检测的实际耗时
+
+    同一鼠标轨迹在同一个模拟桌面上交替以关闭/开启统计运行 rounds 轮（每轮交换先后顺序，
+    抵消预热和缓存的影响），取每轮检测耗时的中位数，再取各轮的中位数比较。
+    """
+    desktop = SimulatedDesktop(count)
+    manager = desktop.manager
+    points = desktop.wander_script(ticks)
+    desktop.run(points)  # 预热
+    medians = {False: [], True: []}
+    for i in range(rounds):
+        for enabled in ((False, True) if i % 2 == 0 else (True, False)):
+            manager.set_stats_enabled(enabled)
+            durations = sorted(desktop.run(points))
+            medians[enabled].append(durations[len(durations) // 2])
+    manager.set_stats_enabled(False)
+    desktop.close()
+    flush_events(app)
+
+    disabled_us = sorted(medians[False])[rounds // 2] * 1e6
+    enabled_us = sorted(medians[True])[rounds // 2] * 1e6
+    return {
+        'windows': count,
+        'ticks': ticks,
+        'rounds': rounds,
+        'tick_us_median_disabled': disabled_us,
+        'tick_us_median_enabled': enabled_us,
+        'enabled_overhead_fraction': enabled_us / disabled_us - 1,
+    }
+
+
+def trace_events(desktop, ticks):
+    """录制轨迹时穿插的外部事件：拖动、固定、安全桌面、鼠标钩子、显示器变化、销毁和停靠命令"""
+    backend, manager = desktop.backend, desktop.manager
+    hwnds = list(manager.managed)
+    right = desktop.right
+
+    def hover_hidden(desktop):
+        for record in list(manager.managed.values()):
+            if record.hidden:
+                manager.handle_zone_event('enter', record.hwnd, manager.clock())
+                if manager.trace is not None:
+                    manager.trace.settle()
+                return
+
+    return {
+        ticks // 6: lambda desktop: backend.user_move(hwnds[-1], (right - 400, 300, right, 500)),
+        ticks // 5: lambda desktop: manager.toggle_pinned(hwnds[0]),
+        ticks // 4: hover_hidden,
+        ticks // 3: lambda desktop: setattr(backend, 'cursor', None),
+        ticks // 2: lambda desktop: manager.apply_monitor_layout(
+            wm.MonitorLayout([(0, 0, 1920, 1080), (1920, 0, 2560, 1440)])),
+        ticks * 3 // 5: lambda desktop: backend.destroy_window(hwnds[2]),
+        ticks * 2 // 3: lambda desktop: manager.dock_window(hwnds[-2], 'top', 0),
+        ticks * 3 // 4: lambda desktop: manager.toggle_pinned(hwnds[0]),
+    }
+
+
+def drive(desktop, points, events):
+    """按鼠标轨迹执行检测，events 中的事件在对应序号的检测之前发生，返回每次检测的耗时"""
+    backend = desktop.backend
+    check = desktop.manager.check_window_position
+    durations = []
+    for i, point in enumerate(points):
+        backend.cursor = point
+        if i in events:
+            events[i](desktop)
+        desktop.clock.advance(TICK_MS)
+        start = time.perf_counter()
+        check()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def replay(app, data):
+    manager = wm.WindowManager(wm.FakeBackend(), session_path=None, rules_path=None, journal_path=None)
+    replayer = wm.TraceReplayer(manager)
+    with wm.TraceReader(data) as reader:
+        start = time.perf_counter()
+        recorded, replayed = replayer.run(reader)
+        elapsed = time.perf_counter() - start
+    close_manager(manager)
+    flush_events(app)
+    return recorded, replayer.ticks, elapsed
+
+
+@scenario
+def bench_trace_replay(app, count=100, ticks=3000):
+    """轨迹记录与回放：记录开销、每次检测的字节数和回放耗时"""
+    # 同一鼠标轨迹和事件分别在不记录/记录轨迹的两个模拟桌面上运行，比较检测耗时
+    results = {}
+    path = os.path.join(tempfile.mkdtemp(prefix='wm_trace_'), 'trace.bin')
+    for label in ('off', 'on'):
+        desktop = SimulatedDesktop(count, docked_ratio=1.0)
+        # 轨迹时间精度为微秒，离开延迟不取检测间隔的整数倍，避免到期时刻与检测时刻恰好相等
+        desktop.manager.hide_delay_ms = 250
+        desktop.manager.reveal_dwell_ms = 50
+        # 鼠标在每个位置停留两次检测，停留时间超过 reveal_dwell_ms 才显示
+        points = [point for point in desktop.hover_storm_script(ticks // 2) for _ in range(2)]
+        desktop.run(points[:20])  # 先让停靠的窗口隐藏，轨迹从会话中途开始
+        if label == 'on':
+            desktop.manager.start_trace(path)
+        durations = drive(desktop, points, trace_events(desktop, ticks))
+        results[label] = sorted(durations)
+        if label == 'on':
+            recorder = desktop.manager.trace
+            records = recorder.records
+            desktop.manager.stop_trace()
+        desktop.close()
+        flush_events(app)
+
+    size = os.path.getsize(path)
+    recorded, replay_ticks, elapsed = replay(app, path)
+    actions = collections.Counter(wm.TRACE_ACTIONS[decision.action] for decision in recorded)
+    with wm.TraceReader(path) as reader:
+        external = sum(flag for _, flag in reader.decisions())
+    shutil.rmtree(os.path.dirname(path))
+
+    # 单条记录的开销：打包并追加到内存缓冲区
+    recorder = wm.TraceRecorder()
+    loops = 100000
+    start = time.perf_counter()
+    for i in range(loops):
+        recorder.tick((i, 0))
+    record_ns = (time.perf_counter() - start) * 1e9 / loops
+
+    off, on = results['off'], results['on']
+    return {
+        'windows': count,
+        'ticks': ticks,
+        'records': records,
+        'trace_bytes': size,
+        'bytes_per_tick': size / ticks,
+        'decisions': dict(sorted(actions.items())),
+        'external_decisions': external,
+        'tick_us_median_off': off[len(off) // 2] * 1e6,
+        'tick_us_median_on': on[len(on) // 2] * 1e6,
+        'record_ns': record_ns,
+        'replay_us_per_tick': elapsed * 1e6 / replay_ticks,
+    }
+
+
+@scenario
+def bench_journal_recovery(app, windows=40, ticks=3000):
+    """隐藏窗口日志：鼠标在边缘扫动时的隐藏/显示次数、日志写入次数和每次检测的耗时"""
+    directory = tempfile.mkdtemp(prefix='wm_journal_')
+    path = os.path.join(directory, 'journal.jsonl')
+    clock = wm.VirtualClock()
+    backend = wm.FakeBackend()
+    right = DESKTOP_MONITORS[-1][0] + DESKTOP_MONITORS[-1][2]
+    manager = fake_manager(backend, clock=clock, journal_path=path)
+    for i in range(windows):
+        hwnd = backend.add_window((right - 300, i * 20, right, i * 20 + 200), f'Window {i}', 'app.exe', 'AppWindow')
+        manager.add_window(hwnd, f'Window {i}')
+    journal = manager.journal
+    transitions = collections.Counter()
+
+    def counted(name, method):
+        def call(*args):
+            transitions[name] += 1
+            return method(*args)
+        return call
+
+    journal.hide = counted('hide', journal.hide)
+    journal.show = counted('show', journal.show)
+    points = cursor_stream(right, DESKTOP_MONITORS[0][3], ticks)
+    start = time.perf_counter()
+    for i, point in enumerate(points):
+        backend.cursor = point
+        clock.advance(TICK_MS)
+        if manager.animator.animations:
+            manager.animator.step(clock())
+        manager.check_window_position()
+        if i % 5 == 4:
+            manager.flush_journal()  # 代替 JOURNAL_FLUSH_DELAY_MS 定时器
+    elapsed = time.perf_counter() - start
+    manager.flush_journal()
+    writes = journal.appends + journal.compactions
+    results = {
+        'windows': windows,
+        'transitions': dict(sorted(transitions.items())),
+        'appends': journal.appends,
+        'compactions': journal.compactions,
+        'writes_per_transition': writes / max(1, sum(transitions.values())),
+        'journal_bytes': os.path.getsize(path),
+        'tick_us_mean': elapsed * 1e6 / len(points),
+    }
+    close_manager(manager)
+    flush_events(app)
+    shutil.rmtree(directory)
+    return results
+
+
+@scenario
+def bench_startup(app, runs=5):
+    """冷启动：模块导入耗时、托盘/主窗口各阶段耗时（子进程中测量）"""
+    import_ms = []
+    for _ in range(runs):
+        stderr = run_python(['-X', 'importtime', '-c', 'import window_manager']).stderr
+        imported = {}
+        for line in stderr.splitlines():
+            if not line.startswith('import time:') or '|' not in line:
+                continue
+            _, cumulative, name = line.split('|')
+            if cumulative.strip().isdigit():
+                imported[name.strip()] = int(cumulative) / 1000
+        import_ms.append(imported['window_manager'])
+
+    phases = [run_script(STARTUP_SCRIPT)['startup_ms'] for _ in range(runs)]
+    startup_ms = {name: sorted(run[name] for run in phases)[runs // 2] for name in phases[0]}
+    return {
+        'runs': runs,
+        'import_ms': sorted(import_ms)[runs // 2],
+        'startup_ms': startup_ms,
+    }
+
+
+@scenario
+def bench_control_ipc(app, windows=200, pings=2000, batch=50):
+    """本地控制接口：单个请求的延迟和批量请求的吞吐，以及无界面模式的内存"""
+    backend = wm.FakeBackend()
+    synthetic_window_table(backend, windows)
+    manager = fake_manager(backend)
+    manager.__dict__['is_authorized'] = True
+    name = f'wm_bench_{os.getpid()}'
+    if not manager.start_control_server(name):
+        raise RuntimeError(f'cannot listen on {name}')
+    script = ([{'cmd': 'list'}] + [{'cmd': 'ping', 'id': i} for i in range(pings)]
+              + [[{'cmd': 'ping', 'id': j} for j in range(batch)] for _ in range(pings // batch)])
+    latencies = run_client(app, name, script)['latencies']
+    single, batched = latencies[1:1 + pings], latencies[1 + pings:]
+    requests = manager.control_server.requests
+    close_manager(manager)
+    flush_events(app)
+
+    memory = {}
+    if os.path.exists('/proc/self/status'):
+        for mode in ('headless', 'ui'):
+            memory[f'{mode}_rss_kb'] = run_script(RSS_SCRIPT, mode)['rss_kb']
+    batched_rps = len(batched) * batch / sum(batched)
+    single_rps = len(single) / sum(single)
+    return {
+        'requests': requests,
+        'latency_us': percentiles(single),
+        'single_requests_per_s': single_rps,
+        'batched_requests_per_s': batched_rps,
+        **memory,
+    }
+
+
+def print_result(name, result, indent=''):
+    print(f'{indent}{name}:')
+    for key, value in result.items():
+        if isinstance(value, dict):
+            print_result(key, value, indent + '  ')
+        elif isinstance(value, float):
+            print(f'{indent}  {key}: {value:.3f}')
+        else:
+            print(f'{indent}  {key}: {value}')
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10,
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def numeric_leaves(result, prefix=''):
+    """把嵌套结果展开为 {'a.b.c': 数值}"""
+    leaves = {}
+    for key, value in result.items():
+        if isinstance(value, dict):
+            leaves.update(numeric_leaves(value, f'{prefix}{key}.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            leaves[f'{prefix}{key}'] = value
+    return leaves
+
+
+# 越小越好的指标，对比时检查这些指标是否退化
+COMPARED_METRICS = ('tick_us.p50', 'tick_us.p95', 'tick_us.p99', 'backend_calls_per_tick',
+                    'python_peak_kb', 'ms_per_change', 'us_per_move', 'ms_per_frame', 'us_per_window',
+                    'import_ms', 'startup_ms.tray', 'startup_ms.total', 'build_ms', 'hit_us.p50', 'hit_us.p99',
+                    'latency_us.p50', 'latency_us.p99', 'headless_rss_kb', 'bytes_per_tick', 'record_ns',
+                    'replay_us_per_tick')
+
+
+def compare_results(baseline, results, threshold):
+    """打印与基线的差异，返回退化的指标列表"""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        old = numeric_leaves(baseline[name])
+        new = numeric_leaves(result)
+        for key, value in new.items():
+            if not key.endswith(COMPARED_METRICS) or key not in old or not old[key]:
+                continue
+            change = (value - old[key]) / old[key]
+            marker = ''
+            if change > threshold:
+                marker = '  <-- 退化'
+                regressions.append(f'{name}.{key}')
+            print(f'{name}.{key}: {old[key]:.3f} -> {value:.3f} ({change:+.1%}){marker}')
+    return regressions
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='WindowManager 性能基准测试')
+    parser.add_argument('scenarios', nargs='*', help='场景名，支持通配符，默认运行全部')
+    parser.add_argument('--list', action='store_true', help='列出所有场景')
+    parser.add_argument('--json', metavar='PATH', help='把结果保存为 JSON')
+    parser.add_argument('--compare', metavar='PATH', help='与之前保存的 JSON 结果对比')
+    parser.add_argument('--threshold', type=float, default=0.25, help='判定为退化的相对变化，默认 0.25')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, func in SCENARIOS.items():
+            doc = (getattr(func, 'func', func).__doc__ or '').strip().splitlines()[0]
+            print(f'{name}: {doc}')
+        return 0
+
+    patterns = args.scenarios or ['*']
+    names = [name for name in SCENARIOS if any(fnmatch.fnmatchcase(name, p) for p in patterns)]
+    unknown = [p for p in patterns if not any(fnmatch.fnmatchcase(name, p) for name in SCENARIOS)]
+    if unknown:
+        print(f'未知场景: {", ".join(unknown)}，可用场景: {", ".join(SCENARIOS)}')
+        return 2
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    results = {}
+    for name in names:
+        results[name] = SCENARIOS[name](app)
+        print_result(name, results[name])
+
+    if args.json:
+        report = {
+            'meta': {
+                'commit': git_commit(),
+                'time': datetime.datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+            },
+            'results': results,
+        }
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare_results(baseline, results, args.threshold)
+        if regressions:
+            print(f'{len(regressions)} 项指标退化超过 {args.threshold:.0%}')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,45 @@
+"""测试公共夹具：离屏 Qt、模拟后端和虚拟时钟上的 WindowManager"""
+import os
+import sys
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from PyQt6 import sip
+from PyQt6.QtWidgets import QApplication
+
+import window_manager as wm
+from wmtesting import DESKTOP_MONITORS, close_manager, fake_manager, flush_events
+
+
+@pytest.fixture(scope='session')
+def app():
+    return QApplication.instance() or QApplication(sys.argv[:1])
+
+
+@pytest.fixture
+def clock():
+    return wm.VirtualClock()
+
+
+@pytest.fixture
+def make_manager(app, clock):
+    """返回创建 WindowManager 的函数
+
+    默认使用新的 FakeBackend，不读写会话/规则/日志文件，停止定时检测，
+    管理器、动画和命令执行器共用 clock 夹具的虚拟时钟。测试结束时销毁所有创建的管理器。
+    """
+    managers = []
+
+    def make(backend=None, monitors=DESKTOP_MONITORS, session_path=None, rules_path=None, journal_path=None):
+        manager = fake_manager(backend, monitors, clock, session_path=session_path, rules_path=rules_path,
+                               journal_path=journal_path)
+        managers.append(manager)
+        return manager
+
+    yield make
+    for manager in managers:
+        if not sip.isdeleted(manager):
+            close_manager(manager)
+    flush_events(app)
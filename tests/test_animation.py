@@ -0,0 +1,32 @@
+import window_manager as wm
+
+
+def test_windows_slide_together_with_one_backend_call_per_frame(app, clock):
+    backend = wm.FakeBackend()
+    animator = wm.SlideAnimator(backend, duration_ms=150, frame_interval_ms=16, clock=clock)
+    targets = {}
+    for i in range(20):
+        hwnd = backend.add_window((1500, i * 40, 1900, i * 40 + 300))
+        targets[hwnd] = (1915, i * 40, 2315, i * 40 + 300)
+        animator.animate(hwnd, backend.windows[hwnd]['rect'], targets[hwnd])
+
+    backend.calls.clear()
+    calls_per_frame = []
+    while animator.is_animating():
+        before = sum(backend.calls.values())
+        clock.advance(16)
+        animator.step(clock())
+        calls_per_frame.append(sum(backend.calls.values()) - before)
+
+    assert len(calls_per_frame) == -(-150 // 16)
+    assert max(calls_per_frame) == 1
+    assert all(backend.windows[hwnd]['rect'] == rect for hwnd, rect in targets.items())
+
+
+def test_zero_duration_moves_immediately(app, clock):
+    backend = wm.FakeBackend()
+    animator = wm.SlideAnimator(backend, duration_ms=0, clock=clock)
+    hwnd = backend.add_window((0, 0, 100, 100))
+    animator.animate(hwnd, (0, 0, 100, 100), (50, 0, 150, 100))
+    assert backend.windows[hwnd]['rect'] == (50, 0, 150, 100)
+    assert not animator.is_animating()
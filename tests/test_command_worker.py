@@ -0,0 +1,127 @@
+import time
+
+import pytest
+
+import window_manager as wm
+
+
+@pytest.fixture
+def flaky(app, clock):
+    """返回 (backend, worker, hwnds)：虚拟时钟上的 FlakyBackend 和内联执行的命令执行器"""
+    def make(count=1):
+        backend = wm.FlakyBackend(clock)
+        hwnds = [backend.add_window((0, 0, 100, 100), f'W{i}') for i in range(count)]
+        return backend, wm.WindowCommandWorker(backend, clock=clock), hwnds
+    return make
+
+
+def moves_made(backend):
+    return backend.calls['move_window'] + backend.calls['move_windows']
+
+
+def test_hung_window_backs_off_then_drops(flaky, clock, moves=50):
+    backend, worker, (hwnd,) = flaky()
+    backend.hung.add(hwnd)
+    for i in range(moves):
+        worker.move_window(hwnd, i, 0, 100, 100)
+    assert moves_made(backend) == 0
+    assert worker.counts['coalesced'] == moves - 1
+    backoffs = []
+    while hwnd in worker.quarantine:
+        retry_at = worker.quarantine[hwnd][0]
+        backoffs.append(round((retry_at - clock()) * 1000))
+        clock.now = retry_at
+        worker.run_pending()
+    assert backoffs == [min(wm.QUARANTINE_BACKOFF_MS << i, wm.QUARANTINE_MAX_BACKOFF_MS)
+                        for i in range(wm.QUARANTINE_MAX_RETRIES)]
+    assert [result.status for result in worker.drain()] == ['hung'] * wm.QUARANTINE_MAX_RETRIES + ['dropped']
+    assert hwnd not in worker.pending
+
+
+def test_recovered_window_gets_only_latest_move(flaky, clock, moves=50):
+    backend, worker, (hwnd,) = flaky()
+    backend.hung.add(hwnd)
+    for i in range(moves):
+        worker.move_window(hwnd, i, 0, 100, 100)
+    backend.hung.clear()
+    clock.now = worker.quarantine[hwnd][0]
+    worker.run_pending()
+    assert moves_made(backend) == 1
+    assert backend.windows[hwnd]['rect'] == (moves - 1, 0, moves + 99, 100)
+    assert [result.status for result in worker.drain()] == ['hung', 'recovered']
+
+
+def test_slow_and_failing_windows_retry_in_order(flaky, clock):
+    backend, worker, (slow, failing) = flaky(2)
+    backend.delays[slow] = wm.COMMAND_TIMEOUT_MS + 50
+    backend.failures[failing] = 2
+    worker.set_topmost(slow, True)
+    worker.set_topmost(failing, True)
+    backend.delays.clear()
+    worker.set_topmost(slow, False)
+    assert slow in worker.pending
+    while worker.pending:
+        clock.now = min(retry[0] for retry in worker.quarantine.values())
+        worker.run_pending()
+    # 800ms 时两个窗口同时到期，failing 先进入队列所以先执行
+    assert [(result.hwnd, result.status) for result in worker.drain()] == [
+        (slow, 'slow'), (failing, 'failed'), (failing, 'failed'), (slow, 'recovered'), (failing, 'recovered'),
+    ]
+
+
+def test_slow_batch_isolates_the_slow_window(flaky):
+    backend, worker, hwnds = flaky(4)
+    backend.delays[hwnds[1]] = wm.COMMAND_TIMEOUT_MS + 50
+    worker.move_windows([(hwnd, 10, 0, 100, 100) for hwnd in hwnds])
+    assert worker.counts['slow_batches'] == 1 and worker.suspects == set(hwnds)
+    worker.move_windows([(hwnd, 20, 0, 100, 100) for hwnd in hwnds])
+    assert list(worker.quarantine) == [hwnds[1]] and not worker.suspects
+    backend.destroy_window(hwnds[2])
+    worker.move_window(hwnds[2], 30, 0, 100, 100)
+    assert [result.status for result in worker.drain()] == ['slow', 'dropped']
+
+
+def test_failed_batch_isolates_only_the_failing_window(flaky, clock):
+    # 后端的批量移动出错（如 Win32Backend 探测到无响应的窗口）时不吞掉错误，逐个移动找出出错的窗口
+    backend, worker, hwnds = flaky(4)
+    failing = hwnds[2]
+    backend.failures[failing] = 2  # 批量移动和之后的单独移动各失败一次
+    worker.move_windows([(hwnd, 10, 0, 100, 100) for hwnd in hwnds])
+    assert backend.calls['move_windows'] == 0 and backend.calls['move_window'] == 3
+    assert [backend.windows[hwnd]['rect'][0] for hwnd in hwnds] == [10, 10, 0, 10]
+    assert list(worker.quarantine) == [failing] and worker.counts['failed'] == 1
+    # 隔离期间其他窗口照常批量移动，隔离的窗口到期后单独重试
+    worker.move_windows([(hwnd, 20, 0, 100, 100) for hwnd in hwnds])
+    assert backend.calls['move_windows'] == 1 and backend.windows[failing]['rect'][0] == 0
+    clock.now = worker.quarantine[failing][0]
+    worker.run_pending()
+    assert backend.windows[failing]['rect'][0] == 20
+    assert [(result.hwnd, result.status) for result in worker.drain()] == [(failing, 'failed'), (failing, 'recovered')]
+
+
+def test_thread_submission_is_not_blocked_by_slow_window(app, moves=30):
+    backend = wm.FlakyBackend()
+    hung = backend.add_window((0, 0, 100, 100), 'Hung')
+    healthy = backend.add_window((0, 0, 100, 100), 'Healthy')
+    backend.delays[hung] = 300
+    worker = wm.WindowCommandWorker(backend)
+    reports = []
+    worker.results_ready.connect(lambda: reports.extend(worker.drain()))
+    worker.start()
+    try:
+        slowest = 0.0
+        for i in range(moves):
+            start = time.perf_counter()
+            worker.move_windows([(hung, i, 0, 100, 100), (healthy, i, 0, 100, 100)])
+            slowest = max(slowest, time.perf_counter() - start)
+            time.sleep(0.002)
+        deadline = time.perf_counter() + 5
+        while time.perf_counter() < deadline and (not reports or backend.windows[healthy]['rect'][0] != moves - 1):
+            app.processEvents()
+            time.sleep(0.01)
+    finally:
+        worker.stop()
+    app.processEvents()
+    assert backend.windows[healthy]['rect'] == (moves - 1, 0, moves + 99, 100)
+    assert any(result.hwnd == hung and result.status == 'slow' for result in reports)
+    assert slowest < 0.05
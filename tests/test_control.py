@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+import window_manager as wm
+from wmtesting import run_client
+
+
+@pytest.fixture
+def controlled(make_manager):
+    """返回 (manager, backend, hwnds, 服务名)：带 60 个窗口的模拟桌面上已启动的控制接口"""
+    backend = wm.FakeBackend()
+    hwnds = [backend.add_window(((i * 53) % 1600, 100, (i * 53) % 1600 + 300, 300), f'Document {i} - App{i % 20}',
+                                exe=f'app{i % 20}.exe', class_name=f'AppWindow{i % 20}') for i in range(60)]
+    manager = make_manager(backend)
+    manager.__dict__['is_authorized'] = True
+    name = f'wm_test_{os.getpid()}'
+    assert manager.start_control_server(name)
+    return manager, backend, hwnds, name
+
+
+def test_control_commands(app, controlled):
+    manager, backend, hwnds, name = controlled
+    target = hwnds[3]
+    script = [
+        {'cmd': 'list', 'id': 'empty'},
+        {'cmd': 'add', 'id': 'rule', 'exe': 'app1.exe', 'class_name': 'AppWindow1'},
+        {'cmd': 'add', 'id': 'identity', 'hwnd': target},
+        {'cmd': 'dock', 'id': 'inner_edge', 'hwnd': target, 'edge': 'right', 'monitor': 0},
+        {'cmd': 'dock', 'id': 'dock', 'hwnd': target, 'edge': 'right', 'monitor': 1},
+        {'cmd': 'reveal', 'id': 'reveal', 'hwnd': target},
+        [{'cmd': 'remove', 'id': 'remove', 'hwnd': hwnds[1]}, {'cmd': 'list', 'id': 'after'}, {'cmd': 'stats', 'id': 'stats'}],
+        {'cmd': 'dock', 'id': 'bad_edge', 'hwnd': target, 'edge': 'middle'},
+        {'cmd': 'reveal', 'id': 'unmanaged', 'hwnd': hwnds[2]},
+        {'cmd': 'add', 'id': 'bad_rule', 'title': '['},
+        {'cmd': 'nope', 'id': 'unknown'},
+        # 按标识加入时标题按原文完全匹配：'.' 不是通配符
+        {'cmd': 'add', 'id': 'not_regex', 'exact': True, 'exe': 'app2.exe', 'class_name': 'AppWindow2', 'title': 'Document 2. - App2'},
+        {'cmd': 'add', 'id': 'exact', 'exact': True, 'exe': 'app2.exe', 'class_name': 'AppWindow2', 'title': 'Document 22 - App2'},
+        {'cmd': 'add', 'id': 'partial_identity', 'exact': True, 'exe': 'app2.exe', 'title': 'Document 42 - App2'},
+    ]
+    result = run_client(app, name, script)['replies']
+    replies = {reply['id']: reply for reply in result if isinstance(reply, dict)}
+    replies.update((reply['id'], reply) for reply in result[6])
+
+    expected_rule = [hwnd for hwnd in hwnds if backend.windows[hwnd]['exe'] == 'app1.exe']
+    assert replies['empty']['result'] == []
+    assert [window['hwnd'] for window in replies['rule']['result']] == expected_rule
+    assert replies['identity']['result'][0]['exe'] == backend.windows[target]['exe']
+    assert replies['dock']['result']['state'] == wm.STATE_HIDING and replies['dock']['result']['edge'] == 'right'
+    # 隐藏动画刚开始就显示时窗口还在原位，显示立即完成
+    assert replies['reveal']['result']['state'] in (wm.STATE_REVEALING, wm.STATE_DOCKED_VISIBLE)
+    assert replies['remove']['result'] == [hwnds[1]] and hwnds[1] not in manager.managed
+    assert len(replies['after']['result']) == len(expected_rule)
+    assert replies['stats']['result']['managed'] == len(expected_rule)
+    assert replies['not_regex']['result'] == []
+    assert [window['hwnd'] for window in replies['exact']['result']] == [hwnds[22]]
+    for key in ('inner_edge', 'bad_edge', 'unmanaged', 'bad_rule', 'unknown', 'partial_identity'):
+        assert not replies[key]['ok'] and replies[key]['error'], replies[key]
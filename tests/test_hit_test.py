@@ -0,0 +1,109 @@
+import logging
+import random
+
+import window_manager as wm
+from wmtesting import DESKTOP_MONITORS, TICK_MS
+
+RIGHT = DESKTOP_MONITORS[-1][0] + DESKTOP_MONITORS[-1][2]
+
+# (窗口矩形, 鼠标是否在窗口内)，鼠标在 (1000, 500)；窗口边界上算在窗口内
+CURSOR = (1000, 500)
+SNAPSHOT_RECTS = [
+    ((900, 400, 1100, 600), True),
+    ((1000, 500, 1300, 700), True),     # 左上角
+    ((700, 200, 1000, 500), True),      # 右下角
+    ((1001, 400, 1300, 600), False),
+    ((700, 400, 999, 600), False),
+    ((900, 501, 1100, 800), False),
+    ((-1280, -200, 0, 300), False),     # 负坐标
+    ((3540, 0, 3840, 1080), False),
+]
+
+
+def naive_outside(cursor, rects):
+    cx, cy = cursor
+    return [i for i, (left, top, right, bottom) in enumerate(rects)
+            if not (left <= cx <= right and top <= cy <= bottom)]
+
+
+def test_packed_snapshot_hit_test():
+    snapshot = wm.TickSnapshot(CURSOR)
+    for hwnd, (rect, _) in enumerate(SNAPSHOT_RECTS):
+        snapshot.add(hwnd, rect)
+    assert list(snapshot.rects[4:8]) == list(SNAPSHOT_RECTS[1][0])
+    assert wm.hit_test_windows(snapshot) == [hwnd for hwnd, (_, inside) in enumerate(SNAPSHOT_RECTS) if not inside]
+    assert wm.hit_test_windows(wm.TickSnapshot(CURSOR)) == []
+
+
+def test_hit_test_agrees_with_per_window_check():
+    rng = random.Random(3)
+    rects = []
+    for _ in range(500):
+        left, top = rng.randrange(-1000, 3800), rng.randrange(-200, 1000)
+        rects.append((left, top, left + rng.randrange(1, 600), top + rng.randrange(1, 400)))
+    for _ in range(50):
+        cursor = (rng.randrange(-1000, 4400), rng.randrange(-200, 1400))
+        snapshot = wm.TickSnapshot(cursor)
+        for hwnd, rect in enumerate(rects):
+            snapshot.add(hwnd, rect)
+        assert wm.hit_test_windows(snapshot) == naive_outside(cursor, rects)
+
+
+def mixed_desktop(make_manager, count=12):
+    """一半窗口贴在右侧显示器的右边缘（贴边显示），一半放在屏幕中间；鼠标在第一个贴边窗口内"""
+    manager = make_manager()
+    manager.animator.duration_ms = 0
+    manager.hide_delay_ms = 0
+    backend = manager.backend
+    docked, free = [], []
+    for i in range(count):
+        top = i * 80
+        if i % 2 == 0:
+            docked.append(backend.add_window((RIGHT - 300, top, RIGHT, top + 200), f'Docked {i}'))
+        else:
+            free.append(backend.add_window((800, top, 1100, top + 150), f'Free {i}'))
+    for hwnd in docked + free:
+        manager.add_window(hwnd, backend.windows[hwnd]['title'])
+    backend.cursor = (RIGHT - 100, 100)
+    return manager, backend, docked, free
+
+
+def tick(manager, clock):
+    clock.advance(TICK_MS)
+    manager.check_window_position()
+
+
+def test_tick_hides_only_docked_windows_outside_the_cursor(make_manager, clock):
+    manager, backend, docked, free = mixed_desktop(make_manager)
+    tick(manager, clock)
+    # 只有鼠标所在的第一个贴边窗口保持显示，其余贴边窗口隐藏，普通窗口不参与
+    assert [hwnd for hwnd in docked if not manager.managed[hwnd].hidden] == docked[:1]
+    assert all(manager.managed[hwnd].state == wm.STATE_VISIBLE for hwnd in free)
+
+
+def test_cursor_failure_skips_ticks_and_logs_once(make_manager, clock, caplog, ticks=50):
+    manager, backend, docked, _ = mixed_desktop(make_manager)
+    tick(manager, clock)
+    tick(manager, clock)  # 处理隐藏窗口产生的位置事件
+    backend.cursor = None  # 安全桌面下 GetCursorPos 被拒绝
+    backend.calls.clear()
+    with caplog.at_level(logging.WARNING):
+        for _ in range(ticks):
+            tick(manager, clock)
+    warnings = [record for record in caplog.records if 'GetCursorPos' in record.getMessage()]
+    assert len(warnings) == 1 and manager.cursor_error
+    assert dict(backend.calls) == {'get_cursor_pos': ticks}
+
+    # 恢复后继续检测：鼠标移到屏幕中间，剩下的贴边窗口也隐藏
+    backend.cursor = (960, 540)
+    tick(manager, clock)
+    assert not manager.cursor_error
+    assert all(manager.managed[hwnd].hidden for hwnd in docked)
+
+    # 再次失败时重新记录一次
+    caplog.clear()
+    backend.cursor = None
+    with caplog.at_level(logging.WARNING):
+        for _ in range(ticks):
+            tick(manager, clock)
+    assert len([record for record in caplog.records if 'GetCursorPos' in record.getMessage()]) == 1
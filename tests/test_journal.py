@@ -0,0 +1,251 @@
+import bisect
+import collections
+import logging
+import os
+import random
+
+import pytest
+
+import window_manager as wm
+
+from wmtesting import DESKTOP_MONITORS, TICK_MS, close_manager, flush_events, on_screen
+
+RIGHT = DESKTOP_MONITORS[-1][0] + DESKTOP_MONITORS[-1][2]
+
+
+class SimulatedCrash(Exception):
+    pass
+
+
+class CrashingJournal(wm.WindowJournal):
+    """压缩时写入 crash_at 字节后模拟崩溃；crash_at 为 None 时写完临时文件、替换之前崩溃"""
+
+    def __init__(self, path, crash_at):
+        super().__init__(path)
+        self.crash_at = crash_at
+
+    def write_snapshot(self, path, data):
+        if self.crash_at is None:
+            super().write_snapshot(path, data)
+        else:
+            with open(path, 'wb') as f:
+                f.write(data[:self.crash_at])
+        raise SimulatedCrash()
+
+
+def journal_ops(journal, hwnds, count, seed=7):
+    """在日志上执行随机的隐藏/显示/销毁，每隔几次合并写入一次；返回每条记录写完后的 (文件字节数, 隐藏窗口)"""
+    rng = random.Random(seed)
+    boundaries = []
+    written = 0
+    lines = 0
+    for _ in range(count):
+        hwnd = rng.choice(hwnds)
+        op = rng.random()
+        if op < 0.5:
+            left = rng.randrange(0, 3000)
+            journal.hide(wm.JournalEntry(hwnd, 'app.exe', 'AppWindow', f'窗口 {hwnd}',
+                                         (left, 100, left + 300, 300), rng.choice(wm.MonitorLayout.SIDES)))
+        elif op < 0.9:
+            journal.show(hwnd)
+        else:
+            journal.forget(hwnd)
+        for line in journal.pending[lines:]:
+            written += len(line)
+            boundaries.append((written, dict(journal.hidden)))
+        lines = len(journal.pending)
+        if rng.random() < 0.3:
+            journal.flush()
+            lines = 0
+    journal.flush()
+    return boundaries
+
+
+@pytest.fixture
+def journal_data(tmp_path):
+    """随机操作写出的日志：返回 (路径, 内容, 每条记录写完后的边界)"""
+    path = str(tmp_path / 'journal.jsonl')
+    journal = wm.WindowJournal(path, compact_records=10 ** 6)
+    boundaries = journal_ops(journal, list(range(0x100, 0x100 + 40, 4)), 80)
+    journal.close()
+    with open(path, 'rb') as f:
+        data = f.read()
+    assert len(data) == boundaries[-1][0]
+    return path, data, boundaries
+
+
+def test_torn_append_at_any_byte(journal_data, tmp_path):
+    _, data, boundaries = journal_data
+    offsets = [size for size, _ in boundaries]
+    crash_path = str(tmp_path / 'crash.jsonl')
+    logging.disable(logging.WARNING)  # 每个截断位置都会警告丢弃了不完整的记录
+    try:
+        for offset in range(len(data) + 1):
+            with open(crash_path, 'wb') as f:
+                f.write(data[:offset])
+            index = bisect.bisect_right(offsets, offset)
+            expected = boundaries[index - 1][1] if index else {}
+            crashed = wm.WindowJournal(crash_path)
+            assert crashed.load() == expected, f'torn append at byte {offset}'
+            if offset % 97 == 0:
+                # 截断不完整的记录后继续追加不受影响
+                entry = wm.JournalEntry(0x9999, 'late.exe', 'Late', 'late', (0, 0, 10, 10), 'top')
+                crashed.hide(entry)
+                crashed.close()
+                assert wm.WindowJournal(crash_path).load() == {**expected, 0x9999: entry}, offset
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+def test_crash_during_compaction_keeps_old_journal(journal_data):
+    path = journal_data[0]
+    state = wm.WindowJournal(path)
+    state.load()
+    snapshot = b''.join(state.encode('hide', hwnd, entry) for hwnd, entry in state.hidden.items())
+    for crash_at in list(range(0, len(snapshot), max(1, len(snapshot) // 50))) + [None]:
+        crashing = CrashingJournal(path, crash_at)
+        crashing.load()
+        with pytest.raises(SimulatedCrash):
+            crashing.compact()
+        assert wm.WindowJournal(path).load() == state.hidden, f'compaction crash at {crash_at}'
+    state.compact()
+    compacted = wm.WindowJournal(path)
+    assert compacted.load() == state.hidden and compacted.records == len(state.hidden)
+    assert os.path.getsize(path) == len(snapshot)
+
+
+def crash(app, manager):
+    """模拟程序崩溃：不保存、不写入等待中的记录，窗口留在当前位置"""
+    close_manager(manager)
+    flush_events(app)
+
+
+def dock_windows(backend, count):
+    homes = {}
+    for i in range(count):
+        rect = (RIGHT - 300, i * 20, RIGHT, i * 20 + 200)
+        homes[backend.add_window(rect, f'Window {i}', 'app.exe', 'AppWindow')] = rect
+    return homes
+
+
+def manage_all(manager, homes):
+    for hwnd in homes:
+        manager.add_window(hwnd, manager.backend.windows[hwnd]['title'])
+
+
+def hide_all(manager, clock):
+    manager.backend.cursor = (960, 540)
+    for _ in range(5):
+        clock.advance(TICK_MS)
+        manager.check_window_position()
+
+
+def test_batch_hide_writes_once_before_moving_and_recovers_after_crash(app, make_manager, clock, tmp_path, windows=20):
+    path = str(tmp_path / 'journal.jsonl')
+    backend = wm.FakeBackend()
+    homes = dock_windows(backend, windows)
+    manager = make_manager(backend, journal_path=path)
+    manage_all(manager, homes)
+    hide_all(manager, clock)
+    assert all(record.state == wm.STATE_HIDING for record in manager.managed.values())
+    assert manager.journal.appends == 0 and manager.journal.needs_flush
+    clock.advance(wm.FRAME_INTERVAL_MS)
+    manager.animator.step(clock())
+    assert manager.journal.appends == 1
+    assert not any(on_screen(backend.windows[hwnd]['rect']) for hwnd in homes)
+    crash(app, manager)
+
+    # 托盘先显示，窗口在之后的第一次事件循环中同步移回原位
+    manager = make_manager(backend, journal_path=path)
+    assert manager.tray_icon.isVisible() and manager.stranded == set(homes)
+    assert not any(on_screen(backend.windows[hwnd]['rect']) for hwnd in homes)
+    app.processEvents()
+    assert all(backend.windows[hwnd]['rect'] == home for hwnd, home in homes.items())
+    assert not manager.journal.hidden and wm.WindowJournal(path).load() == {}
+
+
+def test_unresponsive_windows_keep_their_record(tmp_path, windows=6):
+    path = str(tmp_path / 'journal.jsonl')
+    backend = wm.FlakyBackend()
+    homes = dock_windows(backend, windows)
+    journal = wm.WindowJournal(path)
+    for hwnd, (left, top, right, bottom) in homes.items():
+        journal.hide(wm.JournalEntry(hwnd, 'app.exe', 'AppWindow', f'Window {hwnd}', (left - 500, top, right - 500, bottom), 'right'))
+    journal.close()
+    hung, failing = list(homes)[:2]
+    backend.hung.add(hung)
+    backend.failures[failing] = 1
+
+    recovered = wm.recover_journal(path, backend)
+    assert set(recovered) == set(homes) - {hung, failing}
+    assert set(wm.WindowJournal(path).load()) == {hung, failing}
+    assert backend.windows[hung]['rect'] == homes[hung]
+
+    backend.hung.clear()
+    assert set(wm.recover_journal(path, backend)) == {hung, failing}
+    assert backend.windows[hung]['rect'] == (homes[hung][0] - 500, homes[hung][1], homes[hung][2] - 500, homes[hung][3])
+    assert wm.WindowJournal(path).load() == {}
+
+
+def test_recover_command_skips_reused_handles(app, make_manager, clock, tmp_path, windows=20):
+    path = str(tmp_path / 'journal.jsonl')
+    backend = wm.FakeBackend()
+    homes = dock_windows(backend, windows)
+    manager = make_manager(backend, journal_path=path)
+    manage_all(manager, homes)
+    hide_all(manager, clock)
+    clock.advance(wm.SLIDE_DURATION_MS)
+    manager.animator.step(clock())
+    # 显示记录还在等待合并写入时崩溃：日志仍记为隐藏，恢复到原位同样在屏幕内
+    appends = manager.journal.appends
+    shown = list(homes)[:5]
+    for hwnd in shown:
+        manager.reveal_window(hwnd)
+    clock.advance(wm.SLIDE_DURATION_MS)
+    manager.animator.step(clock())
+    assert manager.journal.appends == appends and len(manager.journal.pending) == len(shown)
+    # 句柄被其他程序的窗口复用的记录不恢复
+    reused = list(homes)[-1]
+    backend.windows[reused]['exe'] = 'other.exe'
+    reused_rect = backend.windows[reused]['rect']
+    crash(app, manager)
+
+    recovered = wm.recover_journal(path, backend)
+    assert len(recovered) == windows - 1 and reused not in recovered
+    assert all(on_screen(backend.windows[hwnd]['rect']) for hwnd in homes if hwnd != reused)
+    assert backend.windows[reused]['rect'] == reused_rect
+    assert wm.recover_journal(path, backend) == []
+
+
+def test_show_records_are_coalesced(make_manager, clock, tmp_path, windows=20):
+    path = str(tmp_path / 'journal.jsonl')
+    backend = wm.FakeBackend()
+    homes = dock_windows(backend, windows)
+    manager = make_manager(backend, journal_path=path)
+    manage_all(manager, homes)
+    journal = manager.journal
+    transitions = collections.Counter()
+
+    def counted(name, method):
+        def call(*args):
+            transitions[name] += 1
+            return method(*args)
+        return call
+
+    journal.hide = counted('hide', journal.hide)
+    journal.show = counted('show', journal.show)
+    for i in range(1000):
+        phase = i % 400
+        if phase < 300:
+            backend.cursor = ((i * 37) % RIGHT, (i * 53) % 1080)
+        else:
+            backend.cursor = (RIGHT - 1 - phase % 4, (i * 11) % 1080)
+        clock.advance(TICK_MS)
+        if manager.animator.animations:
+            manager.animator.step(clock())
+        manager.check_window_position()
+        if i % 5 == 4:
+            manager.flush_journal()  # 代替 JOURNAL_FLUSH_DELAY_MS 定时器
+    manager.flush_journal()
+    assert transitions['hide'] and transitions['show']
+    assert journal.appends + journal.compactions < sum(transitions.values())
@@ -0,0 +1,76 @@
+import logging
+import queue
+import time
+
+import pytest
+
+import window_manager as wm
+
+INTERVAL = 0.5
+
+
+class CollectingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append((record.levelno, record.getMessage()))
+
+
+def make_record(msg, level=logging.WARNING, lineno=10):
+    return logging.makeLogRecord({
+        'name': 'test', 'levelno': level, 'levelname': logging.getLevelName(level),
+        'pathname': 'window_manager.py', 'lineno': lineno, 'msg': msg,
+    })
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+@pytest.fixture
+def listener():
+    """返回 (日志队列, 后台线程, 收集到的消息)"""
+    log_queue = queue.SimpleQueue()
+    handler = CollectingHandler()
+    listener = wm.DedupQueueListener(log_queue, handler, interval=INTERVAL)
+    listener.start()
+    yield log_queue, listener, handler.messages
+    listener.stop()
+
+
+def test_repeats_are_folded_and_summarised_while_idle(listener):
+    log_queue, _, messages = listener
+    for _ in range(5):
+        log_queue.put(make_record('move failed'))
+    log_queue.put(make_record('move failed', lineno=20))  # 不同位置的相同消息单独输出
+    for i in range(3):
+        log_queue.put(make_record(f'tick {i}', level=logging.INFO))  # 警告以下的记录不折叠
+    assert wait_for(lambda: len(messages) == 5)
+    assert messages == [(logging.WARNING, 'move failed')] * 2 + [(logging.INFO, f'tick {i}') for i in range(3)]
+
+    # 之后没有新记录，汇总也在窗口结束后由后台线程输出
+    assert wait_for(lambda: len(messages) == 6)
+    level, summary = messages[-1]
+    assert level == logging.WARNING and summary.startswith('move failed (4 occurrences in last ')
+
+    # 汇总之后再出现的相同记录重新正常输出
+    log_queue.put(make_record('move failed'))
+    assert wait_for(lambda: len(messages) == 7)
+    assert messages[-1] == (logging.WARNING, 'move failed')
+    time.sleep(INTERVAL * 2)
+    assert len(messages) == 7  # 没有被折叠的记录时不输出汇总
+
+
+def test_stop_flushes_pending_summaries(listener):
+    log_queue, dedup, messages = listener
+    for _ in range(3):
+        log_queue.put(make_record('hook failed'))
+    dedup.stop()
+    assert messages[0] == (logging.WARNING, 'hook failed')
+    assert messages[1][1].startswith('hook failed (2 occurrences in last ')
+    assert len(messages) == 2
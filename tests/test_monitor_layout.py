@@ -0,0 +1,190 @@
+import pytest
+
+import window_manager as wm
+from window_manager import EdgeSegment
+
+# 0: 左侧 1280x1024，原点为负且向下错开 200；1: 主显示器 1920x1080；2: 右侧更高的 2560x1440
+#
+#            0 ┌──────────┬──────────────┐
+#   200 ┌──────┤    1     │      2       │
+#       │  0   │          │              │
+#       │      ├──────────┤ 1080         │
+#  1224 └──────┘          │              │ 1440
+#                         └──────────────┘
+MONITORS = [(-1280, 200, 1280, 1024), (0, 0, 1920, 1080), (1920, 0, 2560, 1440)]
+
+# 相邻显示器之间的内边缘被去掉，只剩外边缘线段 (坐标, 起点, 终点, 显示器)
+EXPECTED_EDGES = {
+    'right': [(0, 1080, 1224, 0), (4480, 0, 1440, 2)],
+    'top': [(0, 0, 1920, 1), (0, 1920, 4480, 2), (200, -1280, 0, 0)],
+    'left': [(-1280, 200, 1224, 0), (0, 0, 200, 1), (1920, 1080, 1440, 2)],
+    'bottom': [(1080, 0, 1920, 1), (1224, -1280, 0, 0), (1440, 1920, 4480, 2)],
+}
+
+# (说明, 窗口矩形, 期望触及的边缘 (边, 显示器) 或 None)
+EDGE_FOR_RECT = [
+    ('straddles 1|2', (1700, 100, 2100, 400), None),
+    ('flush with 1|2', (1620, 100, 1920, 300), None),
+    ('straddles 0|1', (-200, 300, 200, 600), None),
+    ('flush with 0|1', (0, 300, 300, 600), None),
+    ('middle of 1', (500, 500, 800, 700), None),
+    ('crosses right of 2', (4300, 100, 4500, 300), ('right', 2)),
+    ('crosses top of 1', (500, -50, 800, 200), ('top', 1)),
+    ('crosses lowered top of 0', (-800, 180, -500, 400), ('top', 0)),
+    ('crosses left of 0', (-1300, 500, -1000, 700), ('left', 0)),
+    ('crosses bottom of 0', (-600, 1100, -300, 1300), ('bottom', 0)),
+    ('crosses bottom of 1 under 0', (100, 1000, 400, 1100), ('bottom', 1)),
+    ('crosses bottom of 2', (3000, 1300, 3300, 1500), ('bottom', 2)),
+    ('exposed left of 1 above 0', (-100, 20, 200, 150), ('left', 1)),
+    ('exposed right of 0 below 1', (-300, 1100, 50, 1200), ('right', 0)),
+    ('exposed left of 2 below 1', (1800, 1150, 2000, 1300), ('left', 2)),
+    # 高度不同的显示器：窗口只有一部分在外边缘上时隐藏后会露在相邻的显示器里
+    ('partly beside 1 on left of 2', (1800, 1000, 2000, 1200), None),
+    ('partly beside 1 on left of 2, inside 2', (1920, 1000, 2100, 1200), None),
+    ('bottom of 1 running under 2', (1800, 1000, 2000, 1100), None),
+    ('partly beside 1 on right of 0', (-300, 1000, 50, 1200), None),
+    ('partly beside 0 on left of 1', (-100, 100, 200, 300), None),
+    ('right wins over top', (4300, -20, 4490, 300), ('right', 2)),
+]
+
+# (鼠标位置, 期望的触发区域线段 {(边, 显示器)})
+SEGMENTS_AT = [
+    ((4479, 700), {('right', 2)}),
+    ((4475, 700), {('right', 2)}),
+    ((4474, 700), set()),
+    ((4479, 0), {('right', 2), ('top', 2)}),
+    ((1919, 500), set()),
+    ((1920, 500), set()),
+    ((1920, 1200), {('left', 2)}),
+    ((-1, 500), set()),
+    ((-1, 1100), {('right', 0)}),
+    ((0, 100), {('left', 1)}),
+    ((-1280, 1223), {('left', 0), ('bottom', 0)}),
+    ((100, 1079), {('bottom', 1)}),
+    ((-500, 200), {('top', 0)}),
+    ((960, 540), set()),
+]
+
+# (窗口矩形, 边, 显示器, 期望 ((边, 显示器), 移动后的矩形) 或 None)
+DOCK_RECT = [
+    ((500, 300, 800, 500), 'right', 1, None),
+    ((500, 300, 800, 500), 'right', 2, (('right', 2), (4180, 300, 4480, 500))),
+    ((500, 300, 800, 500), 'left', None, None),
+    ((500, 50, 800, 150), 'left', None, (('left', 1), (0, 50, 300, 150))),
+    ((500, 300, 800, 500), 'top', 7, (('top', 1), (500, 0, 800, 200))),
+    ((-900, 100, -600, 300), 'top', 0, (('top', 0), (-900, 200, -600, 400))),
+    ((-900, 100, -600, 300), 'bottom', 0, (('bottom', 0), (-900, 1024, -600, 1224))),
+    ((3000, 1300, 3400, 1500), 'bottom', 2, (('bottom', 2), (3000, 1240, 3400, 1440))),
+    ((2000, 1200, 2300, 1400), 'left', 2, (('left', 2), (1920, 1200, 2220, 1400))),
+    ((2000, 100, 2300, 300), 'left', 2, None),
+    ((2000, 1000, 2300, 1200), 'left', 2, None),
+    ((2000, 1040, 2300, 1440), 'left', 2, None),
+    ((-600, 1000, -300, 1200), 'right', 0, None),
+]
+
+
+@pytest.fixture(scope='module')
+def layout():
+    return wm.MonitorLayout(MONITORS)
+
+
+def side_and_monitor(segment):
+    return None if segment is None else (segment.side, segment.monitor)
+
+
+def test_only_external_edges_are_indexed(layout):
+    for side, expected in EXPECTED_EDGES.items():
+        assert layout.edges[side] == [EdgeSegment(side, *segment) for segment in expected], side
+    assert layout.bounds() == (-1280, 0, 4480, 1440)
+
+
+@pytest.mark.parametrize('name, rect, expected', EDGE_FOR_RECT, ids=[case[0] for case in EDGE_FOR_RECT])
+def test_edge_for_rect(layout, name, rect, expected):
+    assert side_and_monitor(layout.edge_for_rect(rect)) == expected
+
+
+@pytest.mark.parametrize('point, expected', SEGMENTS_AT)
+def test_segments_at(layout, point, expected):
+    assert {side_and_monitor(segment) for segment in layout.segments_at(point)} == expected
+
+
+@pytest.mark.parametrize('rect, side, monitor, expected', DOCK_RECT)
+def test_dock_rect(layout, rect, side, monitor, expected):
+    docked = layout.dock_rect(rect, side, monitor)
+    assert (docked and (side_and_monitor(docked[0]), docked[1])) == expected
+
+
+def test_docked_rect_touches_its_edge(layout):
+    # 贴到外边缘后的矩形再查询时触及同一条线段
+    for rect, side, monitor, expected in DOCK_RECT:
+        if expected is not None:
+            segment, docked = layout.dock_rect(rect, side, monitor)
+            assert layout.edge_for_rect(docked) == segment
+
+
+def test_dock_into_corner_prefers_right_edge(layout):
+    # 先限制在显示器内：贴到 0 的底边时落在右下角，同时触及 0 的右侧外边缘，查询时右边缘优先
+    segment, docked = layout.dock_rect((100, 1100, 400, 1200), 'bottom', 0)
+    assert (side_and_monitor(segment), docked) == (('bottom', 0), (-300, 1124, 0, 1224))
+    assert side_and_monitor(layout.edge_for_rect(docked)) == ('right', 0)
+
+
+def test_dock_into_corner_beside_taller_monitor(layout):
+    # 窗口上半部分挨着 1 时，0 的右边缘不能停靠，只触及底边
+    segment, docked = layout.dock_rect((100, 100, 400, 300), 'bottom', 0)
+    assert (side_and_monitor(segment), docked) == (('bottom', 0), (-300, 1024, 0, 1224))
+    assert side_and_monitor(layout.edge_for_rect(docked)) == ('bottom', 0)
+
+
+def segment(layout, side, monitor):
+    return next(segment for segment in layout.edges[side] if segment.monitor == monitor)
+
+
+# (鼠标位置, 期望的隐藏窗口)
+OWNER_AT = [
+    ((4479, 50), None),
+    ((4479, 100), 1),
+    ((4479, 350), 4),    # 同一线段上重叠的区域，起点靠后的优先
+    ((4479, 599), 4),
+    ((4479, 600), None),
+    ((4475, 200), 1),
+    ((4474, 200), None),
+    ((4480, 200), None),
+    ((0, 100), 2),
+    ((4, 100), 2),
+    ((5, 100), None),
+    ((0, 180), 5),       # 超出线段的部分被截掉
+    ((0, 300), None),
+    ((-1, 300), None),   # 内边缘上没有触发区域
+    ((-850, 1223), 3),
+    ((-850, 1219), 3),
+    ((-850, 1218), None),
+    ((-1100, 1223), None),
+]
+
+
+@pytest.fixture
+def zones(layout):
+    index = wm.EdgeZoneIndex(layout)
+    index.add(1, segment(layout, 'right', 2), 100, 400)
+    index.add(4, segment(layout, 'right', 2), 300, 600)
+    index.add(2, segment(layout, 'left', 1), 50, 150)
+    index.add(5, segment(layout, 'left', 1), 150, 400)
+    index.add(3, segment(layout, 'bottom', 0), -1000, -700)
+    return index
+
+
+@pytest.mark.parametrize('point, expected', OWNER_AT)
+def test_owner_at(zones, point, expected):
+    assert zones.owner_at(point) == expected
+
+
+def test_removed_zone_has_no_owner(zones):
+    zones.remove(1)
+    assert zones.owner_at((4479, 200)) is None
+    assert zones.owner_at((4479, 350)) == 4
+    zones.remove(4)
+    assert zones.owner_at((4479, 350)) is None
+    # 整条线段外的区域不加入
+    zones.add(6, segment(zones.layout, 'left', 1), 300, 500)
+    assert 6 not in zones.owners
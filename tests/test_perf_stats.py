@@ -0,0 +1,79 @@
+import collections
+import threading
+import time
+
+import window_manager as wm
+from wmtesting import DESKTOP_MONITORS, TICK_MS
+
+RIGHT = DESKTOP_MONITORS[-1][0] + DESKTOP_MONITORS[-1][2]
+
+
+def test_counts_from_several_threads_are_not_lost(threads=4, calls=20000):
+    # 界面线程和命令执行线程同时计数、记录耗时，统计数必须完整
+    stats = wm.PerfStats(enabled=True)
+    backend = wm.FakeBackend()
+    hwnd = backend.add_window((0, 0, 100, 100), 'W')
+    stats.instrument_backend(backend)
+    barrier = threading.Barrier(threads)
+
+    def work():
+        barrier.wait()
+        for i in range(calls):
+            backend.is_hung(hwnd)
+            stats.count('ticks')
+            stats.observe('tick', i * 1e-6)
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    snapshot = stats.snapshot()
+    assert snapshot['counters'] == {'backend.is_hung': threads * calls, 'ticks': threads * calls}
+    assert snapshot['histograms']['tick']['count'] == threads * calls
+    stats.uninstrument_backend(backend)
+    assert 'is_hung' not in backend.__dict__
+
+
+def run_hover_ticks(manager, clock, ticks=400):
+    """鼠标在右边缘和屏幕中间之间往返，停靠的窗口反复隐藏和显示"""
+    for i in range(ticks):
+        manager.backend.cursor = (RIGHT - 1, (i * 37) % 1000) if i % 40 < 10 else (960, 540)
+        clock.advance(TICK_MS)
+        if manager.animator.animations:
+            manager.animator.step(clock())
+        manager.check_window_position()
+
+
+def test_disabled_stats_cost_nothing_per_tick(make_manager, clock, monkeypatch, windows=10):
+    # 关闭统计时检测路径上只有 perf_stats.enabled 判断：不读时钟、不计数，后端方法没有被包装
+    manager = make_manager()
+    manager.animator.duration_ms = 0
+    for i in range(windows):
+        hwnd = manager.backend.add_window((RIGHT - 300, i * 90, RIGHT, i * 90 + 200), f'Window {i}')
+        manager.add_window(hwnd, f'Window {i}')
+    calls = collections.Counter()
+    perf_counter = time.perf_counter
+
+    def counted_perf_counter():
+        calls['perf_counter'] += 1
+        return perf_counter()
+
+    monkeypatch.setattr(wm.time, 'perf_counter', counted_perf_counter)
+    for name in ('count', 'observe'):
+        method = getattr(wm.perf_stats, name)
+        monkeypatch.setattr(wm.perf_stats, name, lambda *args, name=name, method=method: (calls.update([name]), method(*args)))
+
+    manager.set_stats_enabled(False)
+    run_hover_ticks(manager, clock)
+    assert manager.backend.calls['move_windows'] + manager.backend.calls['move_window'], 'windows were hidden and shown'
+    assert not calls
+    assert not set(wm.PerfStats.BACKEND_CALLS) & set(vars(manager.backend))
+
+    # 同样的检测在开启统计时确实经过这些埋点
+    manager.set_stats_enabled(True)
+    try:
+        run_hover_ticks(manager, clock)
+    finally:
+        manager.set_stats_enabled(False)
+    assert calls['perf_counter'] and calls['count'] and calls['observe']
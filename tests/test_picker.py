@@ -0,0 +1,57 @@
+import window_manager as wm
+
+from wmtesting import DESKTOP_MONITORS
+
+
+def synthetic_snapshot(count, monitors=DESKTOP_MONITORS):
+    """按 Z 序排列的模拟窗口快照：大小不一的普通窗口，每 50 个中有一个最大化窗口"""
+    windows = []
+    for i in range(count):
+        x, y, width, height = monitors[i % len(monitors)]
+        if i % 50 == 49:
+            rect = (x, y, x + width, y + height)
+        else:
+            w, h = 300 + (i * 97) % 900, 200 + (i * 61) % 600
+            left, top = x + (i * 53) % (width - 200), y + (i * 37) % (height - 100)
+            rect = (left, top, left + w, top + h)
+        windows.append(wm.WindowInfo(0x1000 + 4 * i, rect, f'Window {i}', f'Class{i % 200}', 1000 + i % 200))
+    return windows
+
+
+def naive_hit_test(windows, point):
+    x, y = point
+    for window in windows:
+        left, top, right, bottom = window.rect
+        if left <= x < right and top <= y < bottom:
+            return window
+    return None
+
+
+def test_index_matches_linear_scan():
+    windows = synthetic_snapshot(1000)
+    bounds = wm.MonitorLayout(DESKTOP_MONITORS).bounds()
+    index = wm.WindowPickIndex(windows, bounds)
+    width, height = bounds[2] - bounds[0], bounds[3] - bounds[1]
+    for i in range(2000):
+        point = ((i * 7919) % width, (i * 104729) % height)
+        assert index.hit_test(point) is naive_hit_test(windows, point), point
+    assert index.hit_test((-1, 0)) is None
+
+
+def test_overlay_hovers_without_backend_calls_and_picks_top_window(make_manager):
+    backend = wm.FakeBackend()
+    for i in range(100):
+        backend.add_window(((i * 53) % 1600, (i * 37) % 800, (i * 53) % 1600 + 300, (i * 37) % 800 + 200), f'W{i}')
+    below = backend.add_window((2000, 100, 2600, 500), 'Below', exe='below.exe', class_name='Below')
+    above = backend.add_window((2200, 300, 2800, 700), 'Above', exe='above.exe', class_name='Above')
+    manager = make_manager(backend)
+    manager.__dict__['is_authorized'] = True
+    backend.calls.clear()
+    manager.start_window_selection()
+    picker = manager.picker
+    assert backend.calls == {'snapshot_windows': 1}
+    for i in range(500):
+        picker.hover(((i * 7919) % 3840, (i * 104729) % 1080))
+    assert backend.calls == {'snapshot_windows': 1}
+    picker.pick((2300, 400))
+    assert manager.picker is None and above in manager.managed and below not in manager.managed
@@ -0,0 +1,160 @@
+import json
+import re
+
+import pytest
+
+import window_manager as wm
+
+from wmtesting import DESKTOP_MONITORS
+
+# (规则, [(exe, 类名, 标题, 期望命中的规则序号或 None)])
+RULE_CASES = [
+    ([wm.WindowRule('notepad.exe', None, None, 'right', None)], [
+        ('notepad.exe', 'Notepad', 'a.txt - Notepad', 0),
+        ('NOTEPAD.EXE', 'Notepad', '', 0),
+        ('notepad.exe.bak', 'Notepad', '', None),
+        ('wordpad.exe', 'Notepad', '', None),
+    ]),
+    ([wm.WindowRule(None, 'Chrome_WidgetWin_1', None, 'top', None)], [
+        ('chrome.exe', 'chrome_widgetwin_1', 'x', 0),
+        ('chrome.exe', 'Chrome_WidgetWin_10', 'x', None),
+    ]),
+    ([wm.WindowRule(None, None, r'^微信$', 'right', None), wm.WindowRule(None, None, r'\.pdf', None, None)], [
+        ('wechat.exe', 'WeChatMainWndForPC', '微信', 0),
+        ('wechat.exe', 'WeChatMainWndForPC', '微信 - 文件', None),
+        ('acrobat.exe', 'AcrobatSDIWindow', 'report.pdf - Adobe', 1),
+        ('acrobat.exe', 'AcrobatSDIWindow', 'report.pdf\n微信', 1),
+    ]),
+    # 同时命中多条规则时按规则顺序取第一条
+    ([wm.WindowRule('code.exe', None, 'main', 'left', 1), wm.WindowRule('code.exe', None, None, 'right', 0)], [
+        ('code.exe', 'Chrome_WidgetWin_1', 'main.py - Code', 0),
+        ('code.exe', 'Chrome_WidgetWin_1', 'util.py - Code', 1),
+        ('other.exe', 'Chrome_WidgetWin_1', 'main.py', None),
+    ]),
+    ([], [('notepad.exe', 'Notepad', 'x', None)]),
+]
+
+
+def naive_rule_match(rules, exe, class_name, title):
+    """逐条规则比较的参考实现"""
+    for rule in rules:
+        if rule.exe and rule.exe.lower() != exe.lower():
+            continue
+        if rule.class_name and rule.class_name.lower() != class_name.lower():
+            continue
+        if rule.title and not re.search(rule.title, title):
+            continue
+        return rule
+    return None
+
+
+def write_rules(path, rules):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'rules': rules}, f)
+    return str(path)
+
+
+@pytest.mark.parametrize('rules, cases', RULE_CASES)
+def test_first_matching_rule_wins(rules, cases):
+    matcher = wm.RuleMatcher(rules)
+    for exe, class_name, title, expected in cases:
+        rule = matcher.match(exe, class_name, title)
+        assert (None if rule is None else rules.index(rule)) == expected, (exe, class_name, title)
+
+
+def test_combined_matcher_agrees_with_naive_matching():
+    rules = []
+    for i in range(50):
+        process = (i * 7) % 200
+        if i % 3 == 0:
+            rules.append(wm.WindowRule(f'app{process}.exe', None, None, 'right', None))
+        elif i % 3 == 1:
+            rules.append(wm.WindowRule(None, f'AppWindow{process}', rf'Document {i}\d* - ', 'top', 0))
+        else:
+            rules.append(wm.WindowRule(f'app{process}.exe', f'AppWindow{process}', rf'^Document \d+{i} ', None, None))
+    matcher = wm.RuleMatcher(rules)
+    table = [(f'app{i % 200}.exe', f'AppWindow{i % 200}', f'Document {i} - App{i % 200}') for i in range(1000)]
+    expected = [naive_rule_match(rules, *row) for row in table]
+    assert any(expected)
+    assert [matcher.match(*row) for row in table] == expected
+
+
+def test_load_rules_skips_invalid_entries(tmp_path):
+    path = write_rules(tmp_path / 'rules.json', [
+        {'exe': 'notepad.exe', 'edge': 'right'},
+        {'edge': 'right'},                         # 没有任何匹配条件
+        {'exe': 'a.exe', 'edge': 'middle'},        # 未知边缘
+        {'title': '(?i)abc'},                      # 全局标志无法合并
+        {'title': '[unclosed'},                    # 正则错误
+        {'class_name': 'Foo', 'monitor': 'left'},  # 显示器不是序号
+        {'class_name': 'Bar', 'title': 'x$', 'monitor': 1},
+    ])
+    assert wm.load_rules(path) == [
+        wm.WindowRule('notepad.exe', None, None, 'right', None),
+        wm.WindowRule(None, 'Bar', 'x$', None, 1),
+    ]
+    assert wm.load_rules(str(tmp_path / 'missing.json')) == []
+
+
+def test_rules_dock_existing_and_new_windows(make_manager, tmp_path):
+    path = write_rules(tmp_path / 'dock_rules.json', [
+        {'exe': 'notepad.exe', 'edge': 'right', 'monitor': 1},
+        {'class_name': 'ChatWnd', 'edge': 'left'},
+        {'title': 'Monitor only$'},
+    ])
+    backend = wm.FakeBackend()
+    for i in range(20):
+        backend.add_window((i * 10, 0, i * 10 + 300, 200), f'Document {i}', f'app{i}.exe', f'AppWindow{i}')
+    note = backend.add_window((100, 100, 500, 400), 'a.txt - Notepad', 'notepad.exe', 'Notepad')
+    manager = make_manager(backend, rules_path=path)
+    manager.animator.duration_ms = 0
+    manager.acquire_startup_windows()
+    right = DESKTOP_MONITORS[1][0] + DESKTOP_MONITORS[1][2]
+    assert list(manager.managed) == [note]
+    assert manager.managed[note].hidden and backend.windows[note]['rect'][0] == right - wm.HIDDEN_VISIBLE_WIDTH
+    assert manager.tracker.watch_created
+
+    # 之后出现的窗口由创建事件触发；手动移除的窗口不会被重新加入
+    chat = backend.launch_window((900, 200, 1200, 600), 'Chat', 'chat.exe', 'ChatWnd')
+    plain = backend.launch_window((900, 200, 1200, 600), 'Monitor only', 'tool.exe', 'Tool')
+    backend.launch_window((900, 200, 1200, 600), 'Unrelated', 'tool.exe', 'Tool')
+    manager.check_window_position()
+    assert set(manager.managed) == {note, chat, plain}
+    assert manager.managed[chat].hidden and backend.windows[chat]['rect'][2] == wm.HIDDEN_VISIBLE_WIDTH
+    assert not manager.managed[plain].hidden and backend.windows[plain]['rect'] == (900, 200, 1200, 600)
+    manager.remove_window(plain)
+    backend.emit('create', plain)
+    manager.check_window_position()
+    assert plain not in manager.managed
+
+
+# 单独看是合法正则，合并进一个表达式后组号/组名冲突
+UNMERGEABLE_RULES = [
+    {'title': r'(a)\1'},
+    {'title': '(?P<name>x)'},
+    {'title': '(?P<name>y)'},
+    {'exe': 'ok.exe', 'title': r'(\d+) - Editor'},
+]
+
+
+def test_backreferences_and_named_groups_are_rejected(tmp_path):
+    path = write_rules(tmp_path / 'rules.json', UNMERGEABLE_RULES)
+    assert wm.load_rules(path) == [wm.WindowRule('ok.exe', None, r'(\d+) - Editor', None, None)]
+    for item in UNMERGEABLE_RULES[:3]:
+        with pytest.raises(ValueError):
+            wm.parse_rule(item)
+
+
+def test_rules_that_only_fail_when_combined_are_dropped(tmp_path, monkeypatch):
+    monkeypatch.setattr(wm, 'check_title_pattern', lambda title: None)
+    path = write_rules(tmp_path / 'rules.json', UNMERGEABLE_RULES[1:])
+    assert [rule.title for rule in wm.load_rules(path)] == ['(?P<name>x)', r'(\d+) - Editor']
+
+
+def test_startup_survives_unmergeable_rules(app, make_manager, tmp_path):
+    path = write_rules(tmp_path / 'rules.json', UNMERGEABLE_RULES)
+    backend = wm.FakeBackend()
+    hwnd = backend.add_window((100, 100, 400, 300), '42 - Editor', 'ok.exe', 'Editor')
+    manager = make_manager(backend, rules_path=path)
+    app.processEvents()  # 启动时的 acquire_startup_windows 在事件循环中执行
+    assert len(manager.rule_matcher) == 1 and hwnd in manager.managed
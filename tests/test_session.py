@@ -0,0 +1,87 @@
+import window_manager as wm
+
+from wmtesting import DESKTOP_MONITORS
+
+
+def window_table(backend, count, processes=50):
+    """模拟的顶层窗口表：processes 个进程各自的窗口类，标题为 'Document N - AppM'"""
+    hwnds = []
+    for i in range(count):
+        process = i % processes
+        left, top = (i * 53) % 1600, (i * 37) % 800
+        hwnds.append(backend.add_window(
+            (left, top, left + 300, top + 200), f'Document {i} - App{process}',
+            exe=f'app{process}.exe', class_name=f'AppWindow{process}',
+        ))
+    return hwnds
+
+
+def test_restore_with_one_enumeration_then_creation_events(make_manager, tmp_path, count=300, managed=20, late=4):
+    path = str(tmp_path / 'session.json')
+    backend = wm.FakeBackend()
+    hwnds = window_table(backend, count)
+    right = DESKTOP_MONITORS[-1][0] + DESKTOP_MONITORS[-1][2]
+    late_windows = [backend.windows[hwnd] for hwnd in hwnds[managed:managed + late]]
+    for i, window in enumerate(late_windows):
+        window['exe'] = f'late{i}.exe'
+    entries = []
+    for i, hwnd in enumerate(hwnds[:managed + late]):
+        window = backend.windows[hwnd]
+        top = window['rect'][1]
+        # 偶数个停靠在右边缘（上次退出时处于隐藏状态），其余是普通窗口
+        docked = i % 2 == 0
+        rect = (right - 300, top, right, top + 200) if docked else window['rect']
+        entries.append(wm.SessionEntry(window['exe'], window['class_name'], window['title'],
+                                       'right' if docked else None, rect))
+    # 后 late 个窗口模拟尚未启动的程序
+    for hwnd in hwnds[managed:managed + late]:
+        del backend.windows[hwnd]
+    wm.SessionStore(path).save(entries)
+
+    manager = make_manager(backend, session_path=path)
+    manager.animator.duration_ms = 0
+    backend.calls.clear()
+    manager.acquire_startup_windows()
+    assert len(manager.managed) == managed
+    assert backend.calls['enum_windows'] == 1
+    session_classes = {entry.class_name for entry in entries}
+    class_hits = sum(window['class_name'] in session_classes for window in backend.windows.values())
+    assert backend.calls['get_process_name'] <= class_hits
+    assert sum(record.hidden for record in manager.managed.values()) == (managed + 1) // 2
+    assert manager.tracker.watch_created
+
+    backend.calls.clear()
+    for window in late_windows:
+        backend.launch_window(window['rect'], window['title'], window['exe'], window['class_name'])
+        backend.launch_window((0, 0, 100, 100), 'Unrelated', 'other.exe', 'Other')
+    manager.check_window_position()
+    assert len(manager.managed) == managed + late
+    assert backend.calls['enum_windows'] == 0
+    assert not manager.tracker.watch_created
+
+    manager.save_session()
+    assert len(wm.SessionStore(path).load()) == managed + late
+
+
+def test_claim_prefers_exact_title_then_program_name():
+    key = ('code.exe', 'Chrome_WidgetWin_1')
+    index = wm.SessionIndex([
+        wm.SessionEntry(*key, 'main.py - Code', None, (0, 0, 10, 10)),
+        wm.SessionEntry(*key, 'util.py - Code', 'right', (0, 0, 10, 10)),
+    ])
+    assert index.claim(key, 'util.py - Code').title == 'util.py - Code'
+    assert index.claim(key, 'other.py - Code', exact=True) is None
+    assert index.claim(key, 'other.py - Code').title == 'main.py - Code'
+    assert index.claim(key, 'other.py - Code') is None and not index.class_names
+
+
+def test_empty_title_pattern_matches_only_the_same_title():
+    key = ('tool.exe', 'ToolWindow')
+    index = wm.SessionIndex([
+        wm.SessionEntry(*key, '', 'top', (0, 0, 10, 10)),
+        wm.SessionEntry(*key, 'draft - ', None, (0, 0, 10, 10)),
+    ])
+    assert index.claim(key, 'Settings') is None
+    assert index.claim(key, 'notes - Tool') is None
+    assert index.claim(key, '').edge == 'top'
+    assert index.claim(key, 'draft - ').title == 'draft - ' and not index.class_names
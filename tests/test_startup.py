@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+from wmtesting import RSS_SCRIPT, STARTUP_SCRIPT, run_python, run_script
+
+# 冷启动时不应加载的模块，只在第一次用到时才导入
+LAZY_MODULES = ('win32gui', 'win32con', 'win32api', 'win32process', 'hashlib', 'uuid', 'PyQt6.QtNetwork')
+
+# 无界面模式比显示并绘制主窗口后至少少占用这么多常驻内存（本地约 8 MB）
+HEADLESS_RSS_MARGIN_KB = 4096
+
+
+def test_import_does_not_load_lazy_modules():
+    stderr = run_python(['-X', 'importtime', '-c', 'import window_manager']).stderr
+    imported = {line.split('|')[-1].strip() for line in stderr.splitlines() if line.startswith('import time:')}
+    assert 'window_manager' in imported
+    assert not [name for name in LAZY_MODULES if name in imported]
+
+
+def test_tray_is_shown_before_deferred_ui():
+    # 托盘出现时还没有加载延迟导入的模块，主窗口界面在之后才创建
+    result = run_script(STARTUP_SCRIPT)
+    assert result['tray_first'] and result['ui_ready']
+    assert not [name for name in LAZY_MODULES if name in result['modules']]
+
+
+def test_headless_uses_less_memory_than_shown_ui():
+    if not os.path.exists('/proc/self/status'):
+        pytest.skip('needs /proc/self/status')
+    headless, ui = (run_script(RSS_SCRIPT, mode) for mode in ('headless', 'ui'))
+    assert not headless['ui_ready'] and not headless['visible']
+    assert ui['ui_ready'] and ui['visible']
+    assert ui['rss_kb'] - headless['rss_kb'] >= HEADLESS_RSS_MARGIN_KB, (headless, ui)
@@ -0,0 +1,95 @@
+import pytest
+
+import window_manager as wm
+
+from wmtesting import TICK_MS
+
+# 单显示器右边缘停靠一个窗口 (1620, 100, 1920, 300)，每一步先设置输入，
+# 再推进 TICK_MS、推进动画帧并执行一次检测，然后检查窗口状态
+IN, OUT, ZONE = (1700, 200), (800, 500), (1919, 200)
+DV, HIDING, HIDDEN, REVEALING, PINNED, VISIBLE = (
+    wm.STATE_DOCKED_VISIBLE, wm.STATE_HIDING, wm.STATE_HIDDEN, wm.STATE_REVEALING, wm.STATE_PINNED, wm.STATE_VISIBLE,
+)
+# 离开延迟 250ms：离开后第三次检测（300ms）时开始隐藏，150ms 的动画在之后第二次检测时结束
+LEAVE_THEN_HIDE = [(IN, DV), (OUT, DV), (OUT, DV), (OUT, DV), (OUT, HIDING), (OUT, HIDING), (OUT, HIDDEN)]
+# (名称, 参数, [(鼠标位置 / ('move', 矩形) / 'pin', 期望状态)])
+STATE_TRACES = [
+    ('leave_delay', {}, LEAVE_THEN_HIDE),
+    ('return_before_delay', {}, [
+        (IN, DV), (OUT, DV), (OUT, DV), (IN, DV), (OUT, DV), (OUT, DV), (OUT, DV), (OUT, HIDING),
+    ]),
+    ('reveal_in_zone', {}, LEAVE_THEN_HIDE + [(ZONE, REVEALING), (ZONE, REVEALING), (ZONE, DV), (ZONE, DV)]),
+    ('reveal_while_hiding', {}, LEAVE_THEN_HIDE[:5] + [(ZONE, REVEALING), (ZONE, REVEALING), (ZONE, DV)]),
+    ('dwell', {'reveal_dwell_ms': 150}, LEAVE_THEN_HIDE + [
+        (ZONE, HIDDEN), (OUT, HIDDEN), (ZONE, HIDDEN), (ZONE, HIDDEN), (ZONE, REVEALING), (ZONE, REVEALING), (ZONE, DV),
+    ]),
+    ('pinned', {}, [(IN, DV), ('pin', PINNED)] + [(OUT, PINNED)] * 5 + [('pin', DV), (OUT, DV), (OUT, DV), (OUT, HIDING)]),
+    ('pin_hidden', {}, LEAVE_THEN_HIDE + [('pin', PINNED), (OUT, PINNED), (OUT, PINNED)]),
+    ('drag_away', {}, [(IN, DV), (('move', (800, 100, 1100, 300)), VISIBLE)] + [(OUT, VISIBLE)] * 4),
+    ('drag_back', {}, [(('move', (800, 100, 1100, 300)), VISIBLE), (('move', (1622, 100, 1922, 300)), DV),
+                       (OUT, DV), (OUT, DV), (OUT, HIDING)]),
+]
+# 在窗口边缘内外来回抖动：没有离开延迟时每次离开都会隐藏、再次进入触发区域又显示
+JITTER = [(1918, 200), (1619, 200)] * 10
+
+
+class StateTrace:
+    """在虚拟时钟上运行单个停靠窗口的状态机"""
+
+    def __init__(self, manager, clock, hide_delay_ms=250, reveal_dwell_ms=0):
+        self.manager = manager
+        self.backend = manager.backend
+        self.clock = clock
+        manager.hide_delay_ms = hide_delay_ms
+        manager.reveal_dwell_ms = reveal_dwell_ms
+        self.hwnd = self.backend.add_window((1620, 100, 1920, 300), 'Docked')
+        manager.add_window(self.hwnd, 'Docked')
+        self.record = manager.managed[self.hwnd]
+        self.transitions = 0
+
+    def step(self, action):
+        if action == 'pin':
+            self.manager.toggle_pinned(self.hwnd)
+        elif action[0] == 'move':
+            self.backend.user_move(self.hwnd, action[1])
+        else:
+            self.backend.cursor = action
+        self.clock.advance(TICK_MS)
+        self.manager.animator.step(self.clock())
+        before = self.record.state
+        self.manager.check_window_position()
+        self.transitions += self.record.state != before
+        return self.record.state
+
+
+@pytest.fixture
+def make_trace(make_manager, clock):
+    def make(**options):
+        return StateTrace(make_manager(monitors=[(0, 0, 1920, 1080)]), clock, **options)
+    return make
+
+
+@pytest.mark.parametrize('name, options, steps', STATE_TRACES, ids=[trace[0] for trace in STATE_TRACES])
+def test_state_trace(make_trace, name, options, steps):
+    trace = make_trace(**options)
+    assert [trace.step(action) for action, _ in steps] == [state for _, state in steps]
+
+
+def test_leave_delay_absorbs_edge_jitter(make_trace):
+    trace = make_trace(hide_delay_ms=250)
+    trace.step(IN)
+    trace.backend.calls.clear()
+    trace.transitions = 0
+    for point in JITTER:
+        trace.step(point)
+    assert trace.transitions == 0
+    assert trace.backend.calls['move_windows'] + trace.backend.calls['move_window'] == 0
+
+
+def test_jitter_without_delay_thrashes(make_trace):
+    trace = make_trace(hide_delay_ms=0)
+    trace.step(IN)
+    trace.transitions = 0
+    for point in JITTER:
+        trace.step(point)
+    assert trace.transitions > 0
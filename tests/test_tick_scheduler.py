@@ -0,0 +1,101 @@
+import pytest
+
+import window_manager as wm
+
+from test_state_machine import DV, HIDDEN, HIDING, IN, OUT, REVEALING, ZONE
+
+# 自适应检测频率时间线：(名称, 动作, 时长 ms, 鼠标位置, 阶段结束时的期望频率, 期望窗口状态)
+# 动作为 'add'（开始管理右边缘的窗口）或 ('block', 原因, 是否暂停)
+SCHEDULE = [
+    ('no_windows', None, 2000, OUT, 'idle', None),
+    ('docked', 'add', 1000, IN, 'normal', DV),
+    ('leave_pending', None, 200, OUT, 'fast', DV),
+    ('hide', None, 300, OUT, 'fast', HIDING),
+    ('hidden_far', None, 1500, OUT, 'idle', HIDDEN),
+    ('approach', None, 1000, (1500, 500), 'normal', HIDDEN),
+    ('near_edge', None, 500, (1850, 200), 'fast', HIDDEN),
+    ('reveal', None, wm.TICK_FAST_MS, ZONE, 'fast', REVEALING),
+    ('revealed', None, 484, IN, 'normal', DV),
+    ('locked', ('block', 'locked', True), 2000, IN, 'paused', DV),
+    ('unlocked', ('block', 'locked', False), 500, IN, 'normal', DV),
+    ('display_off', ('block', 'display_off', True), 1000, IN, 'paused', DV),
+    ('display_on', ('block', 'display_off', False), 500, IN, 'normal', DV),
+    ('idle_minute', None, 60000, OUT, 'idle', HIDDEN),
+]
+
+
+class ScheduleDriver:
+    """在虚拟时钟上按 TickScheduler 选择的间隔触发检测，代替 QTimer"""
+
+    def __init__(self, manager, clock):
+        self.manager = manager
+        self.backend = manager.backend
+        self.clock = clock
+        self.scheduler = manager.scheduler
+        self.scheduler.clock = clock
+        self.scheduler.mode_seconds.clear()
+        self.scheduler.start()
+        self.ms = 0
+        self.due = None  # 下一次检测的时间（ms），频率变化时 QTimer 重新开始计时
+        self.hwnd = None
+
+    def act(self, action):
+        mode = self.scheduler.mode
+        if action == 'add':
+            self.hwnd = self.backend.add_window((1620, 100, 1920, 300), 'Docked')
+            self.manager.add_window(self.hwnd, 'Docked')
+        elif action is not None:
+            self.scheduler.set_blocked(action[1], action[2])
+        if self.scheduler.mode != mode:
+            self.due = None
+
+    def run(self, duration_ms, cursor):
+        """运行 duration_ms，返回期间的检测次数"""
+        self.backend.cursor = cursor
+        end = self.ms + duration_ms
+        ticks = 0
+        while True:
+            interval = self.scheduler.interval_ms
+            if interval is None:
+                self.due = None
+                break
+            if self.due is None:
+                self.due = self.ms + interval
+            if self.due > end:
+                break
+            self.ms = self.due
+            self.clock.now = self.ms / 1000
+            self.manager.animator.step(self.clock())
+            mode = self.scheduler.mode
+            self.scheduler.on_timeout()
+            ticks += 1
+            self.due = self.ms + self.scheduler.interval_ms if self.scheduler.mode == mode else None
+        self.ms = end
+        self.clock.now = self.ms / 1000
+        return ticks
+
+
+@pytest.fixture
+def driver(make_manager, clock):
+    return ScheduleDriver(make_manager(monitors=[(0, 0, 1920, 1080)]), clock)
+
+
+def test_schedule_timeline(driver):
+    phases = {}
+    for name, action, duration_ms, cursor, mode, state in SCHEDULE:
+        driver.act(action)
+        ticks = driver.run(duration_ms, cursor)
+        record = driver.manager.managed.get(driver.hwnd)
+        assert (driver.scheduler.mode, record.state if record else None) == (mode, state), name
+        if mode == 'paused':
+            assert ticks == 0 and not driver.scheduler.timer.isActive(), name
+        assert wm.perf_stats.gauges['tick_mode'] == mode
+        phases[name] = ticks
+
+    snapshot = driver.scheduler.snapshot()
+    total_ms = sum(duration_ms for _, _, duration_ms, *_ in SCHEDULE)
+    assert sum(snapshot['mode_seconds'].values()) == pytest.approx(total_ms / 1000)
+    assert snapshot['mode_seconds']['paused'] == pytest.approx(3.0)
+    # 空闲一分钟的检测次数不超过空闲频率的 1.5 倍（开头隐藏窗口时短暂加快）
+    assert phases['idle_minute'] <= 60000 / wm.TICK_IDLE_MS * 1.5
+    assert snapshot['ticks'] < total_ms // wm.TICK_NORMAL_MS
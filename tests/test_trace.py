@@ -0,0 +1,134 @@
+import collections
+
+import pytest
+
+import window_manager as wm
+
+from wmtesting import DESKTOP_MONITORS, TICK_MS, close_manager, flush_events
+
+RIGHT = DESKTOP_MONITORS[-1][0] + DESKTOP_MONITORS[-1][2]
+HEIGHT = DESKTOP_MONITORS[-1][3]
+
+
+def docked_desktop(manager, count):
+    """一半窗口停靠在右侧显示器的右边缘，一半停靠在左侧显示器的顶部边缘"""
+    manager.animator.duration_ms = 0
+    # 轨迹时间精度为微秒，离开延迟不取检测间隔的整数倍，避免到期时刻与检测时刻恰好相等
+    manager.hide_delay_ms = 250
+    manager.reveal_dwell_ms = 50
+    for i in range(count):
+        top = (i * 37) % (HEIGHT - 200)
+        left = (i * 53) % 1600
+        rect = (RIGHT - 300, top, RIGHT, top + 200) if i % 2 == 0 else (left, 0, left + 300, 200)
+        hwnd = manager.backend.add_window(rect, f'Window {i}')
+        manager.add_window(hwnd, f'Window {i}')
+
+
+def hover_storm(ticks):
+    """鼠标沿右边缘和顶部边缘快速扫动，每个位置停留两次检测"""
+    points = []
+    for i in range(ticks):
+        along = (i * 37) % HEIGHT
+        if i % 4 == 0:
+            point = (RIGHT - 1, along)
+        elif i % 4 == 2:
+            point = ((i * 53) % 1600 + 10, 0)
+        else:
+            point = (RIGHT // 2, HEIGHT // 2)
+        points += [point, point]
+    return points
+
+
+def external_events(manager, ticks):
+    """录制期间穿插的外部事件：拖动、固定、安全桌面、鼠标钩子、显示器变化、销毁和停靠命令"""
+    backend = manager.backend
+    hwnds = list(manager.managed)
+
+    def hover_hidden():
+        for record in list(manager.managed.values()):
+            if record.hidden:
+                manager.handle_zone_event('enter', record.hwnd, manager.clock())
+                manager.trace.settle()
+                return
+
+    return {
+        ticks // 6: lambda: backend.user_move(hwnds[-1], (RIGHT - 400, 300, RIGHT, 500)),
+        ticks // 5: lambda: manager.toggle_pinned(hwnds[0]),
+        ticks // 4: hover_hidden,
+        ticks // 3: lambda: setattr(backend, 'cursor', None),
+        ticks // 2: lambda: manager.apply_monitor_layout(wm.MonitorLayout([(0, 0, 1920, 1080), (1920, 0, 2560, 1440)])),
+        ticks * 3 // 5: lambda: backend.destroy_window(hwnds[2]),
+        ticks * 2 // 3: lambda: manager.dock_window(hwnds[-2], 'top', 0),
+        ticks * 3 // 4: lambda: manager.toggle_pinned(hwnds[0]),
+    }
+
+
+def replay(app, path):
+    manager = wm.WindowManager(wm.FakeBackend(), session_path=None, rules_path=None, journal_path=None)
+    replayer = wm.TraceReplayer(manager)
+    try:
+        with wm.TraceReader(path) as reader:
+            return replayer.run(reader)
+    finally:
+        close_manager(manager)
+        flush_events(app)
+
+
+@pytest.fixture
+def recorded_trace(make_manager, clock, tmp_path, count=30, ticks=600):
+    """在模拟桌面上录制一段包含外部事件的轨迹，返回 (路径, 记录数)"""
+    path = str(tmp_path / 'trace.bin')
+    manager = make_manager()
+    docked_desktop(manager, count)
+    backend = manager.backend
+    points = hover_storm(ticks // 2)
+    for point in points[:20]:  # 先让停靠的窗口隐藏，轨迹从会话中途开始
+        backend.cursor = point
+        clock.advance(TICK_MS)
+        manager.check_window_position()
+    manager.start_trace(path)
+    events = external_events(manager, ticks)
+    for i, point in enumerate(points):
+        backend.cursor = point
+        if i in events:
+            events[i]()
+        clock.advance(TICK_MS)
+        manager.check_window_position()
+    records = manager.trace.records
+    manager.stop_trace()
+    return path, records
+
+
+def test_replay_reproduces_recorded_decisions(app, recorded_trace):
+    path, _ = recorded_trace
+    recorded, replayed = replay(app, path)
+    index = wm.TraceReplayer.first_divergence(recorded, replayed)
+    assert index is None, (recorded[index:index + 1], replayed[index:index + 1])
+    actions = collections.Counter(wm.TRACE_ACTIONS[decision.action] for decision in recorded)
+    assert all(actions[name] for name in wm.TRACE_ACTIONS), actions
+    with wm.TraceReader(path) as reader:
+        assert any(flag for _, flag in reader.decisions()), 'docking and pinning are external commands'
+    # 同一轨迹再回放一次，决策完全相同（包括时间）
+    assert replay(app, path)[1] == replayed
+
+
+def test_torn_tail_is_ignored(recorded_trace):
+    path, records = recorded_trace
+    with open(path, 'rb') as f:
+        data = f.read()
+    reader = wm.TraceReader(data[:-3])
+    assert sum(1 for _ in reader) == records - 1
+    assert reader.truncated
+
+
+def test_long_idle_gap_keeps_later_timestamps(clock):
+    # 锁屏等暂停检测超过 32 位微秒数（约 71.6 分钟）后，之后的记录时间仍然正确
+    recorder = wm.TraceRecorder(clock=clock)
+    offsets_ms = [0, 5000 * 1000, 10, 10, 73 * 60 * 1000, 1, 0]
+    expected = []
+    for offset in offsets_ms:
+        clock.advance(offset)
+        recorder.tick()
+        expected.append(clock() - recorder.started)
+    times = [t for t, kind, _ in wm.TraceReader(recorder.data()) if kind == wm.TRACE_TICK]
+    assert times == pytest.approx(expected, abs=1e-6)
@@ -0,0 +1,80 @@
+import pytest
+
+import window_manager as wm
+from wmtesting import TICK_MS
+
+# 每次检测允许的后端调用：只读取一次鼠标位置
+IDLE_TICK_CALLS = {'get_cursor_pos': 1}
+
+
+@pytest.fixture
+def tracked(make_manager, clock):
+    """返回 (manager, backend, hwnds, tick)：屏幕中间 20 个受管窗口，鼠标停在屏幕中间"""
+    manager = make_manager()
+    backend = manager.backend
+    hwnds = [backend.add_window((200 + i * 10, 200, 500 + i * 10, 400), f'Window {i}') for i in range(20)]
+    for hwnd in hwnds:
+        manager.add_window(hwnd, backend.windows[hwnd]['title'])
+    backend.cursor = (960, 540)
+
+    def tick():
+        """执行一次检测，返回这次检测的后端调用"""
+        backend.calls.clear()
+        clock.advance(TICK_MS)
+        manager.check_window_position()
+        return dict(backend.calls)
+
+    tick()
+    return manager, backend, hwnds, tick
+
+
+def test_idle_ticks_do_not_read_window_geometry(tracked, ticks=200):
+    _, _, _, tick = tracked
+    for _ in range(ticks):
+        assert tick() == IDLE_TICK_CALLS
+
+
+def test_location_event_rereads_only_the_moved_window(tracked):
+    manager, backend, hwnds, tick = tracked
+    backend.user_move(hwnds[3], (300, 300, 600, 500))
+    backend.user_move(hwnds[3], (320, 300, 620, 500))  # 两次检测之间的多次移动合并为一次读取
+    assert tick() == {**IDLE_TICK_CALLS, 'get_window_rect': 1}
+    assert manager.tracker.rects[hwnds[3]] == (320, 300, 620, 500)
+    assert tick() == IDLE_TICK_CALLS
+
+
+def test_destroyed_window_is_dropped_without_polling(tracked):
+    manager, backend, hwnds, tick = tracked
+    backend.destroy_window(hwnds[4])
+    assert tick() == IDLE_TICK_CALLS
+    assert hwnds[4] not in manager.managed and hwnds[4] not in manager.tracker.rects
+    # 已不再跟踪的窗口的事件被忽略
+    backend.emit('move', hwnds[4])
+    assert tick() == IDLE_TICK_CALLS
+
+
+def test_minimized_window_is_skipped_until_restored(tracked):
+    manager, backend, hwnds, tick = tracked
+    backend.minimize_window(hwnds[5])
+    assert tick() == IDLE_TICK_CALLS
+    assert hwnds[5] in manager.tracker.minimized and hwnds[5] in manager.managed
+    backend.restore_window(hwnds[5])
+    assert tick() == {**IDLE_TICK_CALLS, 'get_window_rect': 1}
+    assert hwnds[5] not in manager.tracker.minimized
+
+
+def test_tracker_reports_each_event_once():
+    backend = wm.FakeBackend()
+    tracker = wm.WindowTracker(backend)
+    moved, destroyed, minimized = (backend.add_window((0, 0, 100, 100)) for _ in range(3))
+    for hwnd in (moved, destroyed, minimized):
+        tracker.track(hwnd)
+    assert tracker.poll() == ([], {moved, destroyed, minimized})
+    backend.calls.clear()
+    backend.user_move(moved, (10, 0, 110, 100))
+    backend.destroy_window(destroyed)
+    backend.minimize_window(minimized)
+    assert tracker.poll() == ([destroyed], {moved, minimized})
+    assert dict(backend.calls) == {'get_window_rect': 1}
+    assert set(tracker.rects) == {moved, minimized} and tracker.minimized == {minimized}
+    assert tracker.poll() == ([], set())
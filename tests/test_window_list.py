@@ -0,0 +1,23 @@
+import window_manager as wm
+
+
+def test_state_change_updates_one_row_without_reset(app):
+    records = {0x1000 + i * 4: wm.ManagedWindow(0x1000 + i * 4, f'Tool window {i}') for i in range(10)}
+    model = wm.WindowListModel(records)
+    for hwnd in records:
+        model.add_window(hwnd)
+    changed, resets = [], []
+    model.dataChanged.connect(lambda first, last, roles: changed.append((first.row(), last.row())))
+    model.modelReset.connect(lambda: resets.append(True))
+
+    hwnd = list(records)[3]
+    records[hwnd].state = wm.STATE_HIDDEN
+    model.update_window(hwnd)
+    assert changed == [(3, 3)] and not resets
+    assert wm.STATE_LABELS[wm.STATE_HIDDEN] in model.data(model.index(3))
+
+    model.remove_window(list(records)[1])
+    assert model.rowCount() == 9
+    assert model.data(model.index(2), wm.WindowListModel.HwndRole) == hwnd
+    model.update_window(hwnd)
+    assert changed[-1] == (2, 2)
@@ -1,60 +1,3148 @@
 import sys
-import win32gui
-import win32con
-import win32api
+import time
+# 进程启动时间点，用于统计冷启动各阶段耗时
+STARTUP_T0 = time.perf_counter()
 from PyQt6.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QMessageBox, QSystemTrayIcon, QMenu, QStyle
-from PyQt6.QtCore import Qt, QTimer, QRect
-from PyQt6.QtGui import QScreen, QIcon, QAction
+from PyQt6.QtCore import Qt, QTimer, QRect, QSize, QEvent, QModelIndex, QAbstractListModel, QObject, pyqtSignal
+from PyQt6.QtGui import QScreen, QIcon, QAction, QPainter, QColor, QPen
 import logging
+import logging.handlers
+import queue
+import atexit
 import os
 import traceback
 import ctypes
 from ctypes import wintypes, c_void_p
-import win32process
-from PyQt6.QtWidgets import QScrollArea, QFrame
-import uuid
-import hashlib
-from PyQt6.QtWidgets import QLineEdit, QInputDialog
-
-# 设置日志到控制台和文件
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('window_manager.log'),
-        logging.StreamHandler(sys.stdout)
+import collections
+import array
+import bisect
+import itertools
+import threading
+import json
+import re
+import struct
+import mmap
+import importlib
+from functools import cached_property
+from PyQt6.QtWidgets import QFrame, QListView, QStyledItemDelegate, QStyleOptionViewItem, QStyleOptionButton
+from PyQt6.QtWidgets import QLineEdit, QInputDialog, QFileDialog
+
+
+class LazyModule:
+    """模块代理：第一次访问属性时才真正导入
+
+    pywin32 各模块加载 DLL 较慢，而启动时只需要托盘图标，推迟到第一次调用再导入。
+    非 Windows 平台（测试/模拟环境）下没有 pywin32，只要不访问就不会报错，只能使用 FakeBackend。
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+win32gui = LazyModule('win32gui')
+win32con = LazyModule('win32con')
+win32api = LazyModule('win32api')
+win32process = LazyModule('win32process')
+
+
+class StartupTimer:
+    """记录冷启动各阶段耗时，主窗口显示后输出一行汇总日志"""
+
+    def __init__(self, t0):
+        self.t0 = t0
+        self.last = t0
+        self.phases = []  # [(阶段名, 耗时毫秒)]
+        self.reported = False
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, (now - self.last) * 1000.0))
+        self.last = now
+
+    def total_ms(self):
+        return (self.last - self.t0) * 1000.0
+
+    def as_dict(self):
+        result = {name: round(ms, 3) for name, ms in self.phases}
+        result['total'] = round(self.total_ms(), 3)
+        return result
+
+    def report(self):
+        if self.reported:
+            return
+        self.reported = True
+        phases = ', '.join(f'{name} {ms:.1f} ms' for name, ms in self.phases)
+        logging.info(f'Startup phases: {phases}, total {self.total_ms():.1f} ms')
+
+
+startup_timer = StartupTimer(STARTUP_T0)
+
+# 日志配置
+LOG_FILE = 'window_manager.log'
+LOG_MAX_BYTES = 1024 * 1024      # 单个日志文件大小上限，超过后轮转
+LOG_BACKUP_COUNT = 3
+LOG_REPEAT_INTERVAL = 60.0       # 同一位置的相同错误在该时间内只记录一次，之后输出汇总
+# 每次检测的调试日志默认关闭，热路径上只判断这个标志
+TICK_DEBUG = '--debug-ticks' in sys.argv or os.environ.get('WM_DEBUG_TICKS') == '1'
+
+
+class DedupQueueListener(logging.handlers.QueueListener):
+    """日志后台线程：负责写文件/控制台，并折叠同一位置重复出现的相同警告和错误
+
+    第一次出现时正常输出，LOG_REPEAT_INTERVAL 秒内的重复记录只计数，
+    窗口结束时（即使之后没有新记录，也由后台线程等待超时后）输出一条
+    带 "N occurrences in last T seconds" 的汇总。
+    """
+    MAX_TRACKED = 1000
+
+    def __init__(self, queue, *handlers, interval=LOG_REPEAT_INTERVAL):
+        super().__init__(queue, *handlers, respect_handler_level=True)
+        self.interval = interval
+        self.repeats = {}  # (pathname, lineno, message) -> [窗口开始时间, 被折叠的次数, 最近一条记录]
+        self.folded = {}   # 有被折叠记录、等待输出汇总的 repeats 条目
+
+    def dequeue(self, block):
+        # 有等待输出的汇总时带超时等待，队列空闲时也能按时输出
+        while True:
+            if not self.folded:
+                return self.queue.get(block)
+            deadline = min(entry[0] for entry in self.folded.values()) + self.interval
+            try:
+                return self.queue.get(block, max(deadline - time.time(), 0))
+            except queue.Empty:
+                self.flush_expired(time.time())
+
+    def handle(self, record):
+        if record.levelno < logging.WARNING:
+            super().handle(record)
+            return
+        key = (record.pathname, record.lineno, record.getMessage())
+        entry = self.repeats.get(key)
+        if entry is not None and record.created - entry[0] < self.interval:
+            entry[1] += 1
+            entry[2] = record
+            self.folded[key] = entry
+            return
+        if entry is not None and entry[1]:
+            self.emit_summary(entry, record.created)
+            del self.folded[key]
+        if len(self.repeats) >= self.MAX_TRACKED:
+            self.flush_repeats()
+        self.repeats[key] = [record.created, 0, record]
+        super().handle(record)
+
+    def flush_expired(self, now):
+        """输出窗口已经结束的汇总，之后再出现的相同记录重新正常输出"""
+        for key, entry in list(self.folded.items()):
+            if now - entry[0] >= self.interval:
+                self.emit_summary(entry, now)
+                del self.folded[key]
+                del self.repeats[key]
+
+    def emit_summary(self, entry, now):
+        record = logging.makeLogRecord(entry[2].__dict__)
+        record.msg = f'{entry[2].getMessage()} ({entry[1]} occurrences in last {now - entry[0]:.0f} seconds)'
+        record.args = None
+        super().handle(record)
+
+    def flush_repeats(self):
+        now = time.time()
+        for entry in self.repeats.values():
+            if entry[1]:
+                self.emit_summary(entry, now)
+        self.repeats.clear()
+        self.folded.clear()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        super().stop()
+        self.flush_repeats()
+
+
+def setup_logging():
+    """配置日志：调用线程只把记录放入队列，格式化、去重和写文件都在后台线程完成"""
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    handlers = [logging.handlers.RotatingFileHandler(
+        LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8'
+    )]
+    # 打包成无控制台程序时 sys.stdout 为 None
+    if sys.stdout is not None:
+        handlers.append(logging.StreamHandler(sys.stdout))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(logging.DEBUG if TICK_DEBUG else logging.INFO)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener = DedupQueueListener(log_queue, *handlers)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+# 性能统计默认关闭，可用 --stats 参数或托盘菜单开启
+STATS_ENABLED = '--stats' in sys.argv or os.environ.get('WM_STATS') == '1'
+
+
+class LatencyHistogram:
+    """以 2 的幂（微秒）为桶边界的延迟直方图"""
+    __slots__ = ('buckets', 'count', 'total', 'max')
+    BUCKETS = 40
+
+    def __init__(self):
+        self.buckets = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.buckets[min(int(seconds * 1e6).bit_length(), self.BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction):
+        """返回百分位所在桶的上界（毫秒）"""
+        target = fraction * self.count
+        cumulative = 0
+        for index, bucket in enumerate(self.buckets):
+            cumulative += bucket
+            if bucket and cumulative >= target:
+                return min((1 << index) / 1000, self.max * 1000)
+        return self.max * 1000
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'mean_ms': self.total * 1000 / self.count if self.count else 0.0,
+            'p50_ms': self.percentile(0.50),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'max_ms': self.max * 1000,
+        }
+
+
+class PerfStats:
+    """热路径性能统计：计数器和延迟直方图
+
+    各处埋点都先判断 enabled，关闭时只有一次属性读取的开销；
+    后端调用计数通过在后端实例上覆盖方法实现，关闭时完全移除。
+    界面线程和命令执行线程都会更新统计，计数器和直方图的读写都在 lock 内进行。
+    """
+    BACKEND_CALLS = (
+        'is_window', 'get_window_rect', 'get_window_text', 'get_cursor_pos',
+        'move_window', 'move_windows', 'activate_window', 'set_topmost',
+        'enum_windows', 'get_class_name', 'get_process_name', 'snapshot_windows', 'is_hung',
+    )
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.counters = collections.Counter()
+        self.histograms = {}
+        self.gauges = {}  # 当前值类指标（如检测频率），不受 enabled 影响
+        self.started = time.time()
+        self.lock = threading.Lock()
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] += n
+
+    def set_gauge(self, name, value):
+        self.gauges[name] = value
+
+    def observe(self, name, seconds):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.started = time.time()
+
+    def instrument_backend(self, backend):
+        """在后端实例上安装带计数的同名方法"""
+        for name in self.BACKEND_CALLS:
+            method = getattr(type(backend), name).__get__(backend)
+            setattr(backend, name, self.counting_call(f'backend.{name}', method))
+
+    def uninstrument_backend(self, backend):
+        for name in self.BACKEND_CALLS:
+            backend.__dict__.pop(name, None)
+
+    def counting_call(self, name, method):
+        counters = self.counters
+        lock = self.lock
+
+        def call(*args):
+            with lock:
+                counters[name] += 1
+            return method(*args)
+        return call
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'enabled': self.enabled,
+                'uptime_s': round(time.time() - self.started, 1),
+                'startup_ms': startup_timer.as_dict(),
+                'gauges': dict(sorted(self.gauges.items())),
+                'counters': dict(sorted(self.counters.items())),
+                'histograms': {name: histogram.snapshot() for name, histogram in sorted(self.histograms.items())},
+            }
+
+    def format_text(self):
+        snapshot = self.snapshot()
+        lines = [f"统计状态: {'开启' if self.enabled else '关闭'}，统计时长 {snapshot['uptime_s']} 秒"]
+        if startup_timer.phases:
+            phases = '，'.join(f'{name} {ms:.1f} ms' for name, ms in startup_timer.phases)
+            lines.append(f'启动耗时: {phases}')
+        for name, value in snapshot['gauges'].items():
+            lines.append(f'{name}: {value}')
+        lines.append('')
+        for name, histogram in snapshot['histograms'].items():
+            lines.append(
+                f"{name}: {histogram['count']} 次, 平均 {histogram['mean_ms']:.3f} ms, "
+                f"p95 {histogram['p95_ms']:.3f} ms, 最大 {histogram['max_ms']:.3f} ms"
+            )
+        if snapshot['histograms']:
+            lines.append('')
+        for name, value in snapshot['counters'].items():
+            lines.append(f'{name}: {value}')
+        return '\n'.join(lines)
+
+    def dump_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2, ensure_ascii=False)
+
+
+perf_stats = PerfStats(enabled=STATS_ENABLED)
+
+
+# WinEvent 常量（win32con 中没有定义）
+EVENT_SYSTEM_MINIMIZESTART = 0x0016
+EVENT_SYSTEM_MINIMIZEEND = 0x0017
+EVENT_OBJECT_DESTROY = 0x8001
+EVENT_OBJECT_SHOW = 0x8002
+EVENT_OBJECT_LOCATIONCHANGE = 0x800B
+WINEVENT_OUTOFCONTEXT = 0x0000
+WINEVENT_SKIPOWNPROCESS = 0x0002
+OBJID_WINDOW = 0
+GA_ROOT = 2
+PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+DWMWA_CLOAKED = 14
+
+# 锁屏/显示器开关通知
+WM_WTSSESSION_CHANGE = 0x02B1
+WTS_SESSION_LOCK = 0x7
+WTS_SESSION_UNLOCK = 0x8
+NOTIFY_FOR_THIS_SESSION = 0
+WM_POWERBROADCAST = 0x0218
+PBT_POWERSETTINGCHANGE = 0x8013
+DEVICE_NOTIFY_WINDOW_HANDLE = 0
+
+
+class GUID(ctypes.Structure):
+    _fields_ = [
+        ('Data1', wintypes.DWORD),
+        ('Data2', wintypes.WORD),
+        ('Data3', wintypes.WORD),
+        ('Data4', ctypes.c_ubyte * 8),
+    ]
+
+
+class POWERBROADCAST_SETTING(ctypes.Structure):
+    _fields_ = [
+        ('PowerSetting', GUID),
+        ('DataLength', wintypes.DWORD),
+        ('Data', ctypes.c_ubyte * 1),
     ]
+
+
+# 6FE69556-704A-47A0-8F24-C28D936FDA47，Data 为 0 关闭、1 打开、2 变暗
+GUID_CONSOLE_DISPLAY_STATE = GUID(
+    0x6FE69556, 0x704A, 0x47A0, (ctypes.c_ubyte * 8)(0x8F, 0x24, 0xC2, 0x8D, 0x93, 0x6F, 0xDA, 0x47)
 )
 
+
+# 定义边缘检测的灵敏度（像素）
+EDGE_SENSITIVITY = 5
+SHOW_TRIGGER_WIDTH = 5
+
+HIDDEN_VISIBLE_WIDTH = 5  # 窗口隐藏后留在屏幕内的宽度
+
+
+class TickSnapshot:
+    """一次检测的快照：鼠标位置以及停靠在边缘、处于显示状态的窗口矩形
+
+    窗口矩形按 (left, top, right, bottom) 顺序平铺在一个 array('i') 中，
+    便于 hit_test_windows 一次性批量处理。
+    """
+    __slots__ = ('cursor', 'hwnds', 'rects')
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.hwnds = []
+        self.rects = array.array('i')
+
+    def add(self, hwnd, rect):
+        self.hwnds.append(hwnd)
+        self.rects.extend(rect)
+
+
+def hit_test_windows(snapshot):
+    """对快照中的所有窗口批量检测鼠标是否在窗口之外，返回需要隐藏的窗口"""
+    cx, cy = snapshot.cursor
+    rects = snapshot.rects
+    return [
+        hwnd for hwnd, left, top, right, bottom
+        in zip(snapshot.hwnds, rects[0::4], rects[1::4], rects[2::4], rects[3::4])
+        if not (left <= cx <= right and top <= cy <= bottom)
+    ]
+
+
+EdgeSegment = collections.namedtuple('EdgeSegment', 'side coord start end monitor')
+
+
+def subtract_span(spans, cut_start, cut_end):
+    """从区间列表中去掉 [cut_start, cut_end)"""
+    result = []
+    for start, end in spans:
+        if cut_end <= start or cut_start >= end:
+            result.append((start, end))
+            continue
+        if start < cut_start:
+            result.append((start, cut_start))
+        if cut_end < end:
+            result.append((cut_end, end))
+    return result
+
+
+class MonitorLayout:
+    """多显示器边缘索引
+
+    由各显示器的几何 (x, y, width, height) 构建每个显示器四条边上的外边缘线段，
+    相邻显示器之间共享的内边缘会被去掉。每种边缘的线段按坐标排序，
+    查询时用二分查找，不需要遍历所有显示器。
+    """
+    SIDES = ('right', 'top', 'left', 'bottom')
+
+    def __init__(self, geometries):
+        self.monitors = [(x, y, x + width, y + height) for x, y, width, height in geometries]
+        self.edges = {}
+        self.coords = {}
+        for side in self.SIDES:
+            segments = []
+            for index in range(len(self.monitors)):
+                coord, spans = self.external_spans(index, side)
+                segments.extend(EdgeSegment(side, coord, start, end, index) for start, end in spans)
+            segments.sort()
+            self.edges[side] = segments
+            self.coords[side] = [segment.coord for segment in segments]
+
+    def bounds(self):
+        """所有显示器组成的虚拟桌面范围 (left, top, right, bottom)"""
+        return (
+            min(monitor[0] for monitor in self.monitors), min(monitor[1] for monitor in self.monitors),
+            max(monitor[2] for monitor in self.monitors), max(monitor[3] for monitor in self.monitors),
+        )
+
+    @classmethod
+    def from_screens(cls, screens):
+        geometries = []
+        for screen in screens:
+            geometry = screen.geometry()
+            geometries.append((geometry.x(), geometry.y(), geometry.width(), geometry.height()))
+        return cls(geometries)
+
+    def external_spans(self, index, side):
+        """返回显示器某条边的坐标，以及不与其他显示器相邻的部分"""
+        left, top, right, bottom = self.monitors[index]
+        if side == 'right':
+            coord, spans = right, [(top, bottom)]
+        elif side == 'left':
+            coord, spans = left, [(top, bottom)]
+        elif side == 'top':
+            coord, spans = top, [(left, right)]
+        else:
+            coord, spans = bottom, [(left, right)]
+        return coord, self.exposed_spans(index, side, spans)
+
+    def exposed_spans(self, index, side, spans):
+        """从显示器某条边所在直线上的区间中去掉外侧紧挨着其他显示器的部分"""
+        left, top, right, bottom = self.monitors[index]
+        for other, (o_left, o_top, o_right, o_bottom) in enumerate(self.monitors):
+            if other == index:
+                continue
+            # 边缘外侧紧挨着的一行/一列像素属于另一台显示器时，这部分就是内边缘
+            if side == 'right' and o_left <= right < o_right:
+                spans = subtract_span(spans, o_top, o_bottom)
+            elif side == 'left' and o_left <= left - 1 < o_right:
+                spans = subtract_span(spans, o_top, o_bottom)
+            elif side == 'top' and o_top <= top - 1 < o_bottom:
+                spans = subtract_span(spans, o_left, o_right)
+            elif side == 'bottom' and o_top <= bottom < o_bottom:
+                spans = subtract_span(spans, o_left, o_right)
+        return spans
+
+    def segments_in(self, side, low, high):
+        """返回坐标在 [low, high] 范围内的某种边缘线段"""
+        coords = self.coords[side]
+        return self.edges[side][bisect.bisect_left(coords, low):bisect.bisect_right(coords, high)]
+
+    def covers(self, segment, span_start, span_end):
+        """窗口沿边缘方向的范围 [span_start, span_end) 能否停靠到该外边缘线段
+
+        范围要与线段重叠，并且外侧没有其他显示器。高度/宽度不同的显示器相邻时同一条边只有
+        一部分是外边缘，窗口有一部分在内边缘上时隐藏后会露在相邻的显示器里。
+        """
+        if max(span_start, segment.start) >= min(span_end, segment.end):
+            return False
+        return self.exposed_spans(segment.monitor, segment.side, [(span_start, span_end)]) == [(span_start, span_end)]
+
+    def edge_for_rect(self, rect):
+        """返回窗口矩形触及的外边缘线段，没有触及任何边缘时返回 None
+
+        按右、上、左、下的顺序优先匹配，窗口有一部分在内边缘上时不算触及（见 covers）。
+        """
+        left, top, right, bottom = rect
+        for side, low, high, position, span_start, span_end in (
+            ('right', left + 1, right + EDGE_SENSITIVITY, right, top, bottom),
+            ('top', top - EDGE_SENSITIVITY, bottom - 1, top, left, right),
+            ('left', left - EDGE_SENSITIVITY, right - 1, left, top, bottom),
+            ('bottom', top + 1, bottom + EDGE_SENSITIVITY, bottom, left, right),
+        ):
+            best = None
+            for segment in self.segments_in(side, low, high):
+                if self.covers(segment, span_start, span_end):
+                    if best is None or abs(segment.coord - position) < abs(best.coord - position):
+                        best = segment
+            if best is not None:
+                return best
+        return None
+
+    def monitor_for_rect(self, rect):
+        """返回窗口中心所在的显示器序号，中心不在任何显示器内时返回最近的显示器"""
+        x = (rect[0] + rect[2]) // 2
+        y = (rect[1] + rect[3]) // 2
+        best, best_distance = 0, None
+        for index, (left, top, right, bottom) in enumerate(self.monitors):
+            dx = max(left - x, 0, x - right + 1)
+            dy = max(top - y, 0, y - bottom + 1)
+            distance = dx * dx + dy * dy
+            if best_distance is None or distance < best_distance:
+                best, best_distance = index, distance
+        return best
+
+    def dock_rect(self, rect, side, monitor=None):
+        """把窗口贴到指定显示器的某条边缘
+
+        monitor 为空或超出范围时使用窗口所在的显示器。返回 (外边缘线段, 移动后的矩形)，
+        该位置有一部分是与其他显示器相邻的内边缘时返回 None。
+        """
+        if monitor is None or not 0 <= monitor < len(self.monitors):
+            monitor = self.monitor_for_rect(rect)
+        left, top, right, bottom = self.monitors[monitor]
+        width = rect[2] - rect[0]
+        height = rect[3] - rect[1]
+        # 先把窗口限制在显示器内，再贴到指定边缘
+        x = max(left, min(rect[0], right - width))
+        y = max(top, min(rect[1], bottom - height))
+        if side == 'right':
+            x = right - width
+        elif side == 'left':
+            x = left
+        elif side == 'top':
+            y = top
+        else:
+            y = bottom - height
+        if side in ('right', 'left'):
+            span_start, span_end = y, y + height
+        else:
+            span_start, span_end = x, x + width
+        for segment in self.edges[side]:
+            if segment.monitor == monitor and self.covers(segment, span_start, span_end):
+                return segment, (x, y, x + width, y + height)
+        return None
+
+    def segments_at(self, point, width=SHOW_TRIGGER_WIDTH):
+        """返回触发区域（边缘内侧 width 像素）包含该点的外边缘线段"""
+        x, y = point
+        for side, low, high, along in (
+            ('right', x + 1, x + width, y),
+            ('top', y - width + 1, y, x),
+            ('left', x - width + 1, x, y),
+            ('bottom', y + 1, y + width, x),
+        ):
+            for segment in self.segments_in(side, low, high):
+                if segment.start <= along < segment.end:
+                    yield segment
+
+
+class EdgeZoneIndex:
+    """隐藏窗口的触发区域索引
+
+    每条外边缘线段上按起点排序保存隐藏窗口沿边缘方向的范围，并维护结束位置的前缀最大值，
+    根据鼠标位置用二分查找定位拥有该触发区域的窗口。
+    """
+
+    def __init__(self, layout, matcher=None):
+        self.layout = layout
+        self.matcher = matcher
+        self.zones = {}      # EdgeSegment -> ([(start, end, hwnd), ...] 按 start 排序, 结束位置前缀最大值)
+        self.owners = {}     # hwnd -> EdgeSegment
+        self.publish()
+
+    def trigger_rects(self):
+        """返回所有隐藏窗口的触发区域矩形 (left, top, right, bottom, hwnd)"""
+        width = SHOW_TRIGGER_WIDTH
+        rects = []
+        for segment, (entries, max_ends) in self.zones.items():
+            coord = segment.coord
+            for start, end, hwnd in entries:
+                if segment.side == 'right':
+                    rects.append((coord - width, start, coord, end, hwnd))
+                elif segment.side == 'left':
+                    rects.append((coord, start, coord + width, end, hwnd))
+                elif segment.side == 'top':
+                    rects.append((start, coord, end, coord + width, hwnd))
+                else:
+                    rects.append((start, coord - width, end, coord, hwnd))
+        return rects
+
+    def publish(self):
+        """重新计算触发区域矩形，并交给鼠标钩子线程使用的匹配器"""
+        self.rects = self.trigger_rects()
+        if self.matcher is not None:
+            self.matcher.set_zones(self.rects)
+
+    def distance_to(self, point):
+        """鼠标到最近的触发区域的距离（横纵方向距离取大者），没有触发区域时返回 None"""
+        if not self.rects:
+            return None
+        x, y = point
+        return min(
+            max(left - x, x - right, top - y, y - bottom, 0)
+            for left, top, right, bottom, hwnd in self.rects
+        )
+
+    def add(self, hwnd, segment, start, end):
+        self.remove(hwnd)
+        start, end = max(start, segment.start), min(end, segment.end)
+        if start >= end:
+            return
+        entries = self.zones[segment][0] if segment in self.zones else []
+        bisect.insort(entries, (start, end, hwnd))
+        self.zones[segment] = (entries, list(itertools.accumulate((entry[1] for entry in entries), max)))
+        self.owners[hwnd] = segment
+        self.publish()
+
+    def remove(self, hwnd):
+        segment = self.owners.pop(hwnd, None)
+        if segment is None:
+            return
+        entries = [entry for entry in self.zones[segment][0] if entry[2] != hwnd]
+        if entries:
+            self.zones[segment] = (entries, list(itertools.accumulate((entry[1] for entry in entries), max)))
+        else:
+            del self.zones[segment]
+        self.publish()
+
+    def owner_at(self, point):
+        """返回鼠标所在触发区域对应的隐藏窗口，没有时返回 None"""
+        if not self.zones:
+            return None
+        x, y = point
+        for segment in self.layout.segments_at(point):
+            zone = self.zones.get(segment)
+            if zone is None:
+                continue
+            entries, max_ends = zone
+            along = y if segment.side in ('right', 'left') else x
+            # 从最后一个起点不大于鼠标位置的区域往前找，前面的区域都在鼠标之前结束时停止
+            i = bisect.bisect_right(entries, (along, float('inf'), 0))
+            while i > 0 and max_ends[i - 1] > along:
+                i -= 1
+                start, end, hwnd = entries[i]
+                if along < end:
+                    return hwnd
+        return None
+
+
+class EdgeZoneMatcher:
+    """边缘触发区域匹配器
+
+    在鼠标钩子线程中对每个鼠标移动点做匹配，只在进入/离开触发区域时产生事件。
+    触发区域由 GUI 线程通过 set_zones 整体替换为新的元组，钩子线程只读取，
+    不需要加锁。不依赖 Win32，可以直接用录制的鼠标轨迹测试。
+    """
+
+    def __init__(self):
+        self.zones = ()          # ((left, top, right, bottom, hwnd), ...)，右/下边界不包含
+        self.seen_zones = ()
+        self.current = None
+
+    def set_zones(self, zones):
+        self.zones = tuple(zones)
+
+    def feed(self, x, y):
+        """处理一个鼠标位置，返回 ('leave', hwnd) / ('enter', hwnd) 事件组成的元组"""
+        zones = self.zones
+        previous = self.current
+        # 绝大多数移动仍在同一区域内（或不在任何区域），直接返回
+        if previous is not None and zones is self.seen_zones:
+            if previous[0] <= x < previous[2] and previous[1] <= y < previous[3]:
+                return ()
+        self.seen_zones = zones
+        current = None
+        for zone in zones:
+            if zone[0] <= x < zone[2] and zone[1] <= y < zone[3]:
+                current = zone
+                break
+        self.current = current
+        if current == previous:
+            return ()
+        events = ()
+        if previous is not None:
+            events += (('leave', previous[4]),)
+        if current is not None:
+            events += (('enter', current[4]),)
+        return events
+
+
+class EdgeTriggerService(QObject):
+    """常驻的边缘触发服务
+
+    在独立线程中安装 WH_MOUSE_LL 钩子并运行消息循环，钩子回调里只做
+    EdgeZoneMatcher.feed，产生的进入/离开事件放入有界队列，再通过
+    跨线程信号通知 Qt 线程取走。回调保持足够快，避免系统超时移除钩子。
+    """
+    zone_events_ready = pyqtSignal()
+    MAX_PENDING_EVENTS = 64
+
+    def __init__(self, matcher, parent=None):
+        super().__init__(parent)
+        self.matcher = matcher
+        # deque 的 append/popleft 在 CPython 中是原子操作，钩子线程与 Qt 线程之间无需加锁
+        self.events = collections.deque(maxlen=self.MAX_PENDING_EVENTS)
+        self.thread = None
+        self.thread_id = None
+        self.ready = threading.Event()
+
+    def start(self):
+        if self.thread is not None:
+            return
+        self.ready.clear()
+        self.thread = threading.Thread(target=self.run, name='EdgeTriggerHook', daemon=True)
+        self.thread.start()
+        self.ready.wait(1.0)
+
+    def stop(self):
+        if self.thread is None:
+            return
+        if self.thread_id:
+            ctypes.windll.user32.PostThreadMessageW(self.thread_id, win32con.WM_QUIT, 0, 0)
+        self.thread.join(1.0)
+        self.thread = None
+        self.thread_id = None
+
+    def drain(self):
+        """在 Qt 线程中取出所有待处理的 (kind, hwnd, perf_counter 时间戳) 事件"""
+        events = []
+        while True:
+            try:
+                events.append(self.events.popleft())
+            except IndexError:
+                return events
+
+    def run(self):
+        # 使用独立的 WinDLL 实例设置 argtypes，不影响其他代码对 windll.user32 的调用
+        user32 = ctypes.WinDLL('user32', use_last_error=True)
+        kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        LRESULT = wintypes.LPARAM
+        LowLevelMouseProc = ctypes.WINFUNCTYPE(LRESULT, ctypes.c_int, wintypes.WPARAM, wintypes.LPARAM)
+        user32.SetWindowsHookExW.argtypes = [ctypes.c_int, LowLevelMouseProc, wintypes.HINSTANCE, wintypes.DWORD]
+        user32.SetWindowsHookExW.restype = wintypes.HHOOK
+        user32.CallNextHookEx.argtypes = [wintypes.HHOOK, ctypes.c_int, wintypes.WPARAM, wintypes.LPARAM]
+        user32.CallNextHookEx.restype = LRESULT
+        user32.UnhookWindowsHookEx.argtypes = [wintypes.HHOOK]
+        kernel32.GetModuleHandleW.restype = wintypes.HMODULE
+
+        class MSLLHOOKSTRUCT(ctypes.Structure):
+            _fields_ = [
+                ('pt', wintypes.POINT),
+                ('mouseData', wintypes.DWORD),
+                ('flags', wintypes.DWORD),
+                ('time', wintypes.DWORD),
+                ('dwExtraInfo', ctypes.c_size_t),
+            ]
+
+        feed = self.matcher.feed
+        events = self.events
+        notify = self.zone_events_ready.emit
+
+        def mouse_proc(nCode, wParam, lParam):
+            if nCode == 0 and wParam == win32con.WM_MOUSEMOVE:
+                try:
+                    pt = MSLLHOOKSTRUCT.from_address(lParam).pt
+                    changes = feed(pt.x, pt.y)
+                    if changes:
+                        now = time.perf_counter()
+                        events.extend((kind, hwnd, now) for kind, hwnd in changes)
+                        notify()
+                except Exception as e:
+                    logging.error(f'Error in edge trigger hook: {str(e)}')
+            return user32.CallNextHookEx(None, nCode, wParam, lParam)
+
+        self.proc = LowLevelMouseProc(mouse_proc)  # 保存引用防止被垃圾回收
+        self.thread_id = kernel32.GetCurrentThreadId()
+        hook = user32.SetWindowsHookExW(win32con.WH_MOUSE_LL, self.proc, kernel32.GetModuleHandleW(None), 0)
+        self.ready.set()
+        if not hook:
+            logging.error(f'Failed to set edge trigger mouse hook: {ctypes.get_last_error()}')
+            return
+        try:
+            msg = wintypes.MSG()
+            while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+                user32.TranslateMessage(ctypes.byref(msg))
+                user32.DispatchMessageW(ctypes.byref(msg))
+        finally:
+            user32.UnhookWindowsHookEx(hook)
+
+
+SLIDE_DURATION_MS = 150   # 滑入/滑出动画时长，0 表示直接移动
+FRAME_INTERVAL_MS = 16    # 动画帧间隔
+
+
+def ease_out_cubic(t):
+    return 1 - (1 - t) ** 3
+
+
+class SlideAnimator(QObject):
+    """窗口滑入/滑出动画调度器
+
+    所有窗口的动画共用一个帧时钟，每一帧把所有窗口的新位置收集起来，
+    通过 backend.move_windows 一次性批量提交。没有动画时帧时钟停止。
+    clock 可以替换为虚拟时钟，配合 step() 在无界面环境下驱动动画。
+    before_commit 不为 None 时在每次移动窗口前调用（用于先写入隐藏窗口日志）。
+    """
+
+    def __init__(self, backend, duration_ms=SLIDE_DURATION_MS, easing=ease_out_cubic,
+                 frame_interval_ms=FRAME_INTERVAL_MS, clock=time.monotonic, parent=None):
+        super().__init__(parent)
+        self.backend = backend
+        self.duration_ms = duration_ms
+        self.easing = easing
+        self.clock = clock
+        self.animations = {}  # hwnd -> [起始矩形, 目标矩形, 开始时间, 当前矩形, 完成回调]
+        self.frames = 0
+        self.before_commit = None
+        self.timer = QTimer(self)
+        self.timer.setInterval(frame_interval_ms)
+        self.timer.timeout.connect(self.on_frame)
+
+    def animate(self, hwnd, start_rect, end_rect, on_finished=None):
+        """把窗口从 start_rect 滑动到 end_rect
+
+        窗口已在动画中时从当前位置继续，被打断的动画的完成回调会立即调用。
+        """
+        animation = self.animations.pop(hwnd, None)
+        if animation is not None:
+            start_rect = animation[3]
+            if animation[4]:
+                animation[4]()
+        start_rect, end_rect = tuple(start_rect), tuple(end_rect)
+        if self.duration_ms <= 0 or start_rect == end_rect:
+            if start_rect != end_rect:
+                self.commit([(hwnd, end_rect)])
+            if on_finished:
+                on_finished()
+            return
+        self.animations[hwnd] = [start_rect, end_rect, self.clock(), start_rect, on_finished]
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def cancel(self, hwnd):
+        self.animations.pop(hwnd, None)
+        if not self.animations:
+            self.timer.stop()
+
+    def is_animating(self):
+        return bool(self.animations)
+
+    def on_frame(self):
+        try:
+            self.step(self.clock())
+        except Exception as e:
+            logging.error(f"Error in animation frame: {str(e)}")
+
+    def step(self, now):
+        """推进一帧，返回本帧移动的 [(hwnd, rect), ...]"""
+        moves = []
+        finished = []
+        for hwnd, animation in self.animations.items():
+            start_rect, end_rect, start_time = animation[0], animation[1], animation[2]
+            t = (now - start_time) * 1000 / self.duration_ms
+            if t >= 1:
+                rect = end_rect
+                finished.append(hwnd)
+            else:
+                k = self.easing(max(t, 0.0))
+                rect = tuple(round(a + (b - a) * k) for a, b in zip(start_rect, end_rect))
+            if rect != animation[3]:
+                animation[3] = rect
+                moves.append((hwnd, rect))
+        self.frames += 1
+        try:
+            if moves:
+                self.commit(moves)
+        finally:
+            for hwnd in finished:
+                on_finished = self.animations.pop(hwnd)[4]
+                if on_finished:
+                    on_finished()
+            if not self.animations:
+                self.timer.stop()
+        return moves
+
+    def commit(self, moves):
+        if self.before_commit is not None:
+            self.before_commit()
+        self.backend.move_windows([
+            (hwnd, left, top, right - left, bottom - top)
+            for hwnd, (left, top, right, bottom) in moves
+        ])
+
+
+TICK_FAST_MS = 16       # 动画中、有等待到期的切换或鼠标靠近触发区域时的检测间隔
+TICK_NORMAL_MS = 100    # 有贴边显示的窗口或鼠标在触发区域附近时的检测间隔
+TICK_IDLE_MS = 500      # 没有受管窗口或鼠标远离所有触发区域时的检测间隔
+NEAR_EDGE_DISTANCE = 150
+FAR_EDGE_DISTANCE = 600
+
+
+class TickScheduler(QObject):
+    """自适应的定时检测调度器
+
+    每次检测后调用 choose_mode() 选择下一次的检测频率（'fast'/'normal'/'idle'），
+    锁屏或显示器关闭期间暂停检测。clock 可以替换为虚拟时钟，
+    配合手动调用 on_timeout() 在无界面环境下驱动。
+    """
+    MODES = {'fast': TICK_FAST_MS, 'normal': TICK_NORMAL_MS, 'idle': TICK_IDLE_MS}
+
+    def __init__(self, tick, choose_mode, clock=time.monotonic, parent=None):
+        super().__init__(parent)
+        self.tick = tick
+        self.choose_mode = choose_mode
+        self.clock = clock
+        self.wanted = 'normal'  # 没有暂停时使用的频率
+        self.mode = None
+        self.running = False
+        self.blocked = set()    # 暂停原因：'locked'、'display_off'
+        self.ticks = 0
+        self.switches = 0
+        self.mode_seconds = collections.Counter()
+        self.mode_since = None
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.on_timeout)
+
+    @property
+    def interval_ms(self):
+        """当前检测间隔，暂停时为 None"""
+        return self.MODES.get(self.mode)
+
+    @property
+    def rate_hz(self):
+        interval = self.interval_ms
+        return 1000 / interval if interval else 0.0
+
+    def start(self):
+        self.running = True
+        self.set_mode(self.wanted)
+
+    def stop(self):
+        self.running = False
+        self.timer.stop()
+        self.account(self.clock())
+        self.mode = None
+
+    def account(self, now):
+        if self.mode is not None:
+            self.mode_seconds[self.mode] += now - self.mode_since
+        self.mode_since = now
+
+    def set_mode(self, wanted):
+        self.wanted = wanted
+        if not self.running:
+            return
+        mode = 'paused' if self.blocked else wanted
+        if mode == self.mode:
+            return
+        self.account(self.clock())
+        if self.mode is not None:
+            self.switches += 1
+        self.mode = mode
+        if mode == 'paused':
+            self.timer.stop()
+        else:
+            self.timer.start(self.MODES[mode])
+        perf_stats.set_gauge('tick_mode', mode)
+        perf_stats.set_gauge('tick_interval_ms', self.interval_ms or 0)
+        if TICK_DEBUG:
+            logging.debug(f'Tick mode: {mode}')
+
+    def set_blocked(self, reason, blocked):
+        """锁屏/解锁、显示器关闭/打开时暂停或恢复检测"""
+        if blocked == (reason in self.blocked):
+            return
+        if blocked:
+            self.blocked.add(reason)
+        else:
+            self.blocked.discard(reason)
+        logging.info(f"Tick {'paused' if blocked else 'resumed'}: {reason}")
+        self.set_mode(self.wanted)
+
+    def wake(self):
+        """状态在两次检测之间发生变化（加入窗口、显示动画等）时立即重新选择频率"""
+        try:
+            self.set_mode(self.choose_mode())
+        except Exception as e:
+            logging.error(f'Error choosing tick mode: {str(e)}')
+
+    def on_timeout(self):
+        self.ticks += 1
+        self.tick()
+        self.wake()
+
+    def snapshot(self):
+        seconds = collections.Counter(self.mode_seconds)
+        if self.mode is not None:
+            seconds[self.mode] += self.clock() - self.mode_since
+        return {
+            'mode': self.mode,
+            'interval_ms': self.interval_ms,
+            'rate_hz': self.rate_hz,
+            'ticks': self.ticks,
+            'switches': self.switches,
+            'mode_seconds': {mode: round(value, 3) for mode, value in sorted(seconds.items())},
+        }
+
+
+COMMAND_TIMEOUT_MS = 250           # 单次窗口操作超过这么久视为目标窗口无响应
+QUARANTINE_BACKOFF_MS = 500        # 隔离后第一次重试前的等待时间，之后每次翻倍
+QUARANTINE_MAX_BACKOFF_MS = 30000
+QUARANTINE_MAX_RETRIES = 8         # 连续失败这么多次后丢弃该窗口的命令
+HUNG_PROBE_TIMEOUT_MS = 50         # 移动前用 WM_NULL 探测目标窗口，超过这么久没有处理视为无响应
+
+# 窗口操作的执行结果，status 取值：
+# 'slow'（执行成功但超时，之后的命令先隔离）、'hung'（目标窗口无响应，未执行）、
+# 'failed'（调用出错）、'dropped'（窗口已不存在或多次重试仍失败，命令被丢弃）、'recovered'（隔离后重试成功）
+CommandResult = collections.namedtuple('CommandResult', 'hwnd kind status error elapsed_ms')
+
+
+class WindowCommandWorker(QObject):
+    """窗口操作（移动、激活、置顶）的执行器
+
+    提供与后端相同的 move_window/move_windows/activate_window/set_topmost 接口。
+    每个窗口的每种命令只保留最新的一次，移动只关心最新的目标位置；
+    同一批的移动通过 backend.move_windows 一次提交。目标窗口无响应（is_hung）
+    或调用超过 timeout_ms 时隔离该窗口，按指数退避重试，期间新命令继续合并。
+    异常结果放入队列，通过 results_ready 信号通知界面线程调用 drain() 取走。
+
+    start() 后在后台线程执行，界面线程不会被无响应的窗口卡住；
+    没有调用 start() 时命令在提交后立即在当前线程执行，隔离中的窗口
+    由 retry_timer 到期后重试（clock 为虚拟时钟时可以手动调用 run_pending()）。
+    """
+    results_ready = pyqtSignal()
+
+    def __init__(self, backend, timeout_ms=COMMAND_TIMEOUT_MS, backoff_ms=QUARANTINE_BACKOFF_MS,
+                 max_backoff_ms=QUARANTINE_MAX_BACKOFF_MS, clock=time.monotonic, parent=None):
+        super().__init__(parent)
+        self.backend = backend
+        self.timeout_ms = timeout_ms
+        self.backoff_ms = backoff_ms
+        self.max_backoff_ms = max_backoff_ms
+        self.clock = clock
+        self.lock = threading.Condition()
+        self.pending = {}      # hwnd -> {命令: 参数}，按提交顺序
+        self.quarantine = {}   # hwnd -> [重试时间, 退避 ms, 连续失败次数]
+        self.suspects = set()  # 所在的批量移动超时的窗口，之后单独移动以找出慢的窗口
+        self.results = collections.deque()
+        self.counts = collections.Counter()
+        self.thread = None
+        self.running = False
+        self.retry_timer = QTimer(self)
+        self.retry_timer.setSingleShot(True)
+        self.retry_timer.timeout.connect(self.run_pending)
+
+    def start(self):
+        if self.thread is not None:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name='WindowCommands', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        with self.lock:
+            self.running = False
+            self.lock.notify()
+        self.thread.join(1.0)
+        self.thread = None
+
+    def submit(self, hwnd, kind, value=None):
+        with self.lock:
+            self.counts['submitted'] += 1
+            commands = self.pending.get(hwnd)
+            if commands is None:
+                self.pending[hwnd] = {kind: value}
+                return
+            if kind in commands:
+                # 同一种命令只保留最新的一次，并按最新的提交顺序执行
+                del commands[kind]
+                self.counts['coalesced'] += 1
+            commands[kind] = value
+
+    def kick(self):
+        if self.thread is not None:
+            with self.lock:
+                self.lock.notify()
+        else:
+            self.run_pending()
+
+    def move_window(self, hwnd, x, y, width, height):
+        self.submit(hwnd, 'move', (x, y, width, height))
+        self.kick()
+
+    def move_windows(self, moves):
+        for hwnd, x, y, width, height in moves:
+            self.submit(hwnd, 'move', (x, y, width, height))
+        self.kick()
+
+    def activate_window(self, hwnd):
+        self.submit(hwnd, 'activate')
+        self.kick()
+
+    def set_topmost(self, hwnd, topmost):
+        self.submit(hwnd, 'topmost', topmost)
+        self.kick()
+
+    def cancel(self, hwnd):
+        """窗口不再受管时丢弃它等待中的命令和隔离状态"""
+        with self.lock:
+            self.pending.pop(hwnd, None)
+            self.quarantine.pop(hwnd, None)
+        self.suspects.discard(hwnd)
+
+    def drain(self):
+        """在界面线程中取出所有 CommandResult"""
+        results = []
+        while True:
+            try:
+                results.append(self.results.popleft())
+            except IndexError:
+                return results
+
+    def wait_time(self, now):
+        """距离下一批命令到期的秒数：有到期的命令时为 0，没有等待中的命令时为 None"""
+        wait = None
+        for hwnd in self.pending:
+            retry = self.quarantine.get(hwnd)
+            if retry is None or retry[0] <= now:
+                return 0
+            if wait is None or retry[0] - now < wait:
+                wait = retry[0] - now
+        return wait
+
+    def run(self):
+        while True:
+            with self.lock:
+                while self.running:
+                    wait = self.wait_time(self.clock())
+                    if wait == 0:
+                        break
+                    self.lock.wait(wait)
+                if not self.running:
+                    return
+            try:
+                self.run_pending()
+            except Exception as e:
+                logging.error(f'Error in window command worker: {str(e)}')
+
+    def run_pending(self):
+        """执行所有到期的命令"""
+        now = self.clock()
+        with self.lock:
+            batch = {}
+            for hwnd in list(self.pending):
+                retry = self.quarantine.get(hwnd)
+                if retry is None or retry[0] <= now:
+                    batch[hwnd] = self.pending.pop(hwnd)
+        moves = []
+        reported = len(self.results)
+        probe = self.backend.blocking_calls
+        for hwnd, commands in batch.items():
+            # 调用可能阻塞时先检查目标窗口是否无响应，不会阻塞的后端只在重试隔离的窗口时检查
+            if (probe or hwnd in self.quarantine) and self.backend.is_hung(hwnd):
+                self.requeue(hwnd, commands, CommandResult(hwnd, next(iter(commands)), 'hung', None, 0.0))
+                continue
+            # 激活/置顶按提交顺序逐个执行，移动放到最后与其他窗口的移动一起批量提交
+            for kind, value in list(commands.items()):
+                if kind == 'move':
+                    continue
+                started = self.clock()
+                try:
+                    if kind == 'activate':
+                        self.backend.activate_window(hwnd)
+                    else:
+                        self.backend.set_topmost(hwnd, value)
+                except Exception as e:
+                    self.failed(hwnd, kind, commands, e, started)
+                    break
+                del commands[kind]
+                self.finished(hwnd, kind, started)
+            else:
+                if 'move' in commands:
+                    moves.append((hwnd, *commands['move']))
+        # 可疑和重试中的窗口单独移动并计时
+        single = [move for move in moves if move[0] in self.suspects or move[0] in self.quarantine]
+        moves = [move for move in moves if move[0] not in self.suspects and move[0] not in self.quarantine]
+        if len(moves) == 1:
+            single += moves
+        elif moves:
+            started = self.clock()
+            try:
+                self.backend.move_windows(moves)
+            except Exception:
+                # 批量提交失败时逐个移动，找出出错的窗口
+                single += moves
+            else:
+                if (self.clock() - started) * 1000 > self.timeout_ms:
+                    # 不知道是哪个窗口慢，之后先单独移动这些窗口
+                    self.suspects.update(move[0] for move in moves)
+                    self.counts['slow_batches'] += 1
+                for move in moves:
+                    self.counts['executed'] += 1
+        for hwnd, x, y, width, height in single:
+            started = self.clock()
+            try:
+                self.backend.move_window(hwnd, x, y, width, height)
+            except Exception as e:
+                self.failed(hwnd, 'move', {'move': (x, y, width, height)}, e, started)
+            else:
+                self.suspects.discard(hwnd)
+                self.finished(hwnd, 'move', started)
+        if len(self.results) != reported:
+            self.results_ready.emit()
+        if self.thread is None:
+            with self.lock:
+                wait = self.wait_time(self.clock())
+            if wait is not None:
+                self.retry_timer.start(max(int(wait * 1000), 1))
+
+    def finished(self, hwnd, kind, started):
+        elapsed_ms = (self.clock() - started) * 1000
+        self.counts['executed'] += 1
+        if elapsed_ms > self.timeout_ms:
+            # 已经执行完，但目标窗口响应太慢，之后的命令先隔离
+            self.isolate(hwnd, CommandResult(hwnd, kind, 'slow', None, elapsed_ms))
+        elif hwnd in self.quarantine:
+            with self.lock:
+                self.quarantine.pop(hwnd, None)
+            self.results.append(CommandResult(hwnd, kind, 'recovered', None, elapsed_ms))
+
+    def failed(self, hwnd, kind, commands, error, started):
+        elapsed_ms = (self.clock() - started) * 1000
+        if not self.backend.is_window(hwnd):
+            self.cancel(hwnd)
+            self.results.append(CommandResult(hwnd, kind, 'dropped', str(error), elapsed_ms))
+            return
+        self.requeue(hwnd, commands, CommandResult(hwnd, kind, 'failed', str(error), elapsed_ms))
+
+    def requeue(self, hwnd, commands, result):
+        """把没有执行的命令放回队列（之后提交的同种命令优先），并隔离该窗口"""
+        with self.lock:
+            newer = self.pending.pop(hwnd, None)
+            merged = dict(commands)
+            if newer:
+                for kind, value in newer.items():
+                    merged.pop(kind, None)
+                    merged[kind] = value
+            self.pending[hwnd] = merged
+        self.isolate(hwnd, result)
+
+    def isolate(self, hwnd, result):
+        with self.lock:
+            self.counts[result.status] += 1
+            retry = self.quarantine.get(hwnd)
+            if retry is None:
+                retry = self.quarantine[hwnd] = [0.0, self.backoff_ms, 0]
+            else:
+                retry[1] = min(retry[1] * 2, self.max_backoff_ms)
+            retry[2] += 1
+            if retry[2] > QUARANTINE_MAX_RETRIES:
+                self.pending.pop(hwnd, None)
+                del self.quarantine[hwnd]
+                result = result._replace(status='dropped')
+            else:
+                retry[0] = self.clock() + retry[1] / 1000
+        self.results.append(result)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'pending_windows': len(self.pending),
+                'quarantined_windows': len(self.quarantine),
+                'counts': dict(sorted(self.counts.items())),
+            }
+
+
+# 选择窗口时一次快照得到的顶层窗口信息
+WindowInfo = collections.namedtuple('WindowInfo', 'hwnd rect title class_name pid')
+
+
+class WindowBackend:
+    """窗口系统后端接口，WindowManager 只通过它访问平台 API
+
+    事件回调签名为 callback(event, hwnd)，event 取值：
+    'move'、'destroy'、'minimize'、'restore'，以及顶层窗口出现时的 'create'
+    blocking_calls 为 True 时移动/激活/置顶可能被无响应的目标窗口阻塞，
+    由 WindowCommandWorker 在后台线程执行。
+    """
+    blocking_calls = False
+
+    def __init__(self):
+        self.event_callback = None
+
+    def set_event_callback(self, callback):
+        self.event_callback = callback
+
+    def start_event_hook(self):
+        pass
+
+    def stop_event_hook(self):
+        pass
+
+    def create_edge_trigger(self, matcher):
+        """创建常驻的边缘触发服务，不支持时返回 None（由定时检测兜底）"""
+        return None
+
+    def watch_session_state(self, hwnd):
+        """注册锁屏/解锁和显示器开关通知，通知以窗口消息发给 hwnd"""
+        pass
+
+    def session_state_change(self, message):
+        """解析窗口消息，返回 (原因, 是否暂停)，原因为 'locked' 或 'display_off'；其他消息返回 None"""
+        return None
+
+    def is_window(self, hwnd):
+        raise NotImplementedError
+
+    def get_window_rect(self, hwnd):
+        raise NotImplementedError
+
+    def get_window_text(self, hwnd):
+        raise NotImplementedError
+
+    def get_cursor_pos(self):
+        raise NotImplementedError
+
+    def enum_windows(self):
+        """返回所有可见的顶层窗口"""
+        raise NotImplementedError
+
+    def get_class_name(self, hwnd):
+        raise NotImplementedError
+
+    def get_process_name(self, hwnd):
+        """返回窗口所属进程的可执行文件名（小写，不含路径），获取失败时返回空字符串"""
+        raise NotImplementedError
+
+    def snapshot_windows(self):
+        """按 Z 序（最上层在前）返回其他进程所有可见、未最小化的顶层窗口 [WindowInfo, ...]"""
+        raise NotImplementedError
+
+    def move_window(self, hwnd, x, y, width, height):
+        raise NotImplementedError
+
+    def move_windows(self, moves):
+        """批量移动窗口，moves 为 [(hwnd, x, y, width, height), ...]"""
+        for hwnd, x, y, width, height in moves:
+            self.move_window(hwnd, x, y, width, height)
+
+    def activate_window(self, hwnd):
+        raise NotImplementedError
+
+    def set_topmost(self, hwnd, topmost):
+        raise NotImplementedError
+
+    def is_hung(self, hwnd):
+        """目标窗口是否无响应（不处理消息）"""
+        return False
+
+
+class Win32Backend(WindowBackend):
+    """基于 pywin32 / SetWinEventHook 的真实后端"""
+    blocking_calls = True
+
+    def __init__(self):
+        super().__init__()
+        self.user32 = ctypes.windll.user32
+        # DeferWindowPos 系列返回句柄，64 位下需要指定返回类型避免被截断
+        self.user32.BeginDeferWindowPos.restype = wintypes.HANDLE
+        self.user32.DeferWindowPos.restype = wintypes.HANDLE
+        self.user32.DeferWindowPos.argtypes = [
+            wintypes.HANDLE, wintypes.HWND, wintypes.HWND,
+            ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int, wintypes.UINT
+        ]
+        self.user32.EndDeferWindowPos.argtypes = [wintypes.HANDLE]
+        self.user32.GetAncestor.restype = wintypes.HWND
+        self.user32.GetAncestor.argtypes = [wintypes.HWND, wintypes.UINT]
+        self.user32.IsHungAppWindow.argtypes = [wintypes.HWND]
+        self.user32.SendMessageTimeoutW.restype = wintypes.LPARAM
+        self.user32.SendMessageTimeoutW.argtypes = [
+            wintypes.HWND, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM,
+            wintypes.UINT, wintypes.UINT, ctypes.POINTER(ctypes.c_size_t)
+        ]
+        self.kernel32 = ctypes.windll.kernel32
+        self.kernel32.OpenProcess.restype = wintypes.HANDLE
+        self.kernel32.QueryFullProcessImageNameW.argtypes = [
+            wintypes.HANDLE, wintypes.DWORD, wintypes.LPWSTR, ctypes.POINTER(wintypes.DWORD)
+        ]
+        self.kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+        self.process_names = {}  # pid -> 可执行文件名
+        self.dwmapi = ctypes.windll.dwmapi
+        self.event_hooks = []
+        self.event_proc = None
+
+    def start_event_hook(self):
+        if self.event_hooks:
+            return
+        WINEVENTPROC = ctypes.WINFUNCTYPE(
+            None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+            wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD
+        )
+
+        def win_event_proc(hook, event, hwnd, id_object, id_child, thread_id, event_time):
+            # 只关心顶层窗口本身的事件，光标、插入符等对象直接忽略
+            if id_object != OBJID_WINDOW or id_child != 0 or not hwnd or not self.event_callback:
+                return
+            try:
+                if event == EVENT_OBJECT_LOCATIONCHANGE:
+                    self.event_callback('move', hwnd)
+                elif event == EVENT_OBJECT_DESTROY:
+                    self.event_callback('destroy', hwnd)
+                elif event == EVENT_OBJECT_SHOW:
+                    # 子窗口显示也会触发，只转发顶层窗口
+                    if self.user32.GetAncestor(hwnd, GA_ROOT) == hwnd:
+                        self.event_callback('create', hwnd)
+                elif event == EVENT_SYSTEM_MINIMIZESTART:
+                    self.event_callback('minimize', hwnd)
+                elif event == EVENT_SYSTEM_MINIMIZEEND:
+                    self.event_callback('restore', hwnd)
+            except Exception as e:
+                logging.error(f'Error in win event callback: {str(e)}')
+
+        self.event_proc = WINEVENTPROC(win_event_proc)  # 保存引用防止被垃圾回收
+        flags = WINEVENT_OUTOFCONTEXT | WINEVENT_SKIPOWNPROCESS
+        for event_min, event_max in (
+            (EVENT_SYSTEM_MINIMIZESTART, EVENT_SYSTEM_MINIMIZEEND),
+            (EVENT_OBJECT_DESTROY, EVENT_OBJECT_SHOW),
+            (EVENT_OBJECT_LOCATIONCHANGE, EVENT_OBJECT_LOCATIONCHANGE),
+        ):
+            hook = self.user32.SetWinEventHook(event_min, event_max, None, self.event_proc, 0, 0, flags)
+            if hook:
+                self.event_hooks.append(hook)
+            else:
+                logging.error(f'Failed to set win event hook {event_min:#x}-{event_max:#x}')
+
+    def create_edge_trigger(self, matcher):
+        return EdgeTriggerService(matcher)
+
+    def stop_event_hook(self):
+        for hook in self.event_hooks:
+            self.user32.UnhookWinEvent(hook)
+        self.event_hooks = []
+
+    def watch_session_state(self, hwnd):
+        try:
+            if not ctypes.windll.wtsapi32.WTSRegisterSessionNotification(wintypes.HWND(hwnd), NOTIFY_FOR_THIS_SESSION):
+                logging.error('WTSRegisterSessionNotification failed')
+            self.user32.RegisterPowerSettingNotification.restype = wintypes.HANDLE
+            self.user32.RegisterPowerSettingNotification.argtypes = [
+                wintypes.HANDLE, ctypes.POINTER(GUID), wintypes.DWORD
+            ]
+            if not self.user32.RegisterPowerSettingNotification(
+                hwnd, ctypes.byref(GUID_CONSOLE_DISPLAY_STATE), DEVICE_NOTIFY_WINDOW_HANDLE
+            ):
+                logging.error('RegisterPowerSettingNotification failed')
+        except Exception as e:
+            logging.error(f'Error registering session notifications: {str(e)}')
+
+    def session_state_change(self, message):
+        msg = wintypes.MSG.from_address(int(message))
+        if msg.message == WM_WTSSESSION_CHANGE:
+            if msg.wParam == WTS_SESSION_LOCK:
+                return ('locked', True)
+            if msg.wParam == WTS_SESSION_UNLOCK:
+                return ('locked', False)
+        elif msg.message == WM_POWERBROADCAST and msg.wParam == PBT_POWERSETTINGCHANGE and msg.lParam:
+            setting = POWERBROADCAST_SETTING.from_address(msg.lParam)
+            if bytes(setting.PowerSetting) == bytes(GUID_CONSOLE_DISPLAY_STATE):
+                return ('display_off', setting.Data[0] == 0)
+        return None
+
+    def is_window(self, hwnd):
+        return win32gui.IsWindow(hwnd)
+
+    def get_window_rect(self, hwnd):
+        return win32gui.GetWindowRect(hwnd)
+
+    def get_window_text(self, hwnd):
+        return win32gui.GetWindowText(hwnd)
+
+    def get_cursor_pos(self):
+        return win32gui.GetCursorPos()
+
+    def enum_windows(self):
+        hwnds = []
+
+        def callback(hwnd, result):
+            if win32gui.IsWindowVisible(hwnd):
+                result.append(hwnd)
+            return True
+
+        win32gui.EnumWindows(callback, hwnds)
+        return hwnds
+
+    def get_class_name(self, hwnd):
+        return win32gui.GetClassName(hwnd)
+
+    def get_process_name(self, hwnd):
+        _, pid = win32process.GetWindowThreadProcessId(hwnd)
+        name = self.process_names.get(pid)
+        if name is not None:
+            return name
+        name = ''
+        handle = self.kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if handle:
+            try:
+                size = wintypes.DWORD(260)
+                buffer = ctypes.create_unicode_buffer(size.value)
+                if self.kernel32.QueryFullProcessImageNameW(handle, 0, buffer, ctypes.byref(size)):
+                    name = os.path.basename(buffer.value).lower()
+            finally:
+                self.kernel32.CloseHandle(handle)
+        else:
+            logging.warning(f'Cannot open process {pid} of window {hwnd}')
+        self.process_names[pid] = name
+        return name
+
+    def is_cloaked(self, hwnd):
+        """UWP 挂起的窗口、其他虚拟桌面上的窗口虽然可见但不显示"""
+        cloaked = wintypes.DWORD(0)
+        self.dwmapi.DwmGetWindowAttribute(
+            wintypes.HWND(hwnd), DWMWA_CLOAKED, ctypes.byref(cloaked), ctypes.sizeof(cloaked)
+        )
+        return cloaked.value != 0
+
+    def snapshot_windows(self):
+        # EnumWindows 按 Z 序从上到下枚举顶层窗口，一次遍历读取所有需要的信息
+        own_pid = os.getpid()
+        windows = []
+
+        def callback(hwnd, result):
+            try:
+                if not win32gui.IsWindowVisible(hwnd) or win32gui.IsIconic(hwnd) or self.is_cloaked(hwnd):
+                    return True
+                _, pid = win32process.GetWindowThreadProcessId(hwnd)
+                if pid != own_pid:
+                    result.append(WindowInfo(
+                        hwnd, win32gui.GetWindowRect(hwnd), win32gui.GetWindowText(hwnd),
+                        win32gui.GetClassName(hwnd), pid,
+                    ))
+            except Exception as e:
+                logging.error(f'Error reading window {hwnd} for snapshot: {str(e)}')
+            return True
+
+        win32gui.EnumWindows(callback, windows)
+        return windows
+
+    def probe(self, hwnd):
+        """向窗口发送 WM_NULL，HUNG_PROBE_TIMEOUT_MS 内没有处理（或窗口已无响应）时抛出 OSError"""
+        result = ctypes.c_size_t()
+        if not self.user32.SendMessageTimeoutW(hwnd, win32con.WM_NULL, 0, 0, win32con.SMTO_ABORTIFHUNG,
+                                               HUNG_PROBE_TIMEOUT_MS, ctypes.byref(result)):
+            raise OSError(f'Window {hwnd} did not respond within {HUNG_PROBE_TIMEOUT_MS} ms')
+
+    def move_window(self, hwnd, x, y, width, height):
+        # 异步移动：目标线程在探测之后卡住时也不会阻塞调用线程
+        self.probe(hwnd)
+        win32gui.SetWindowPos(hwnd, 0, x, y, width, height,
+                              win32con.SWP_NOZORDER | win32con.SWP_NOACTIVATE | win32con.SWP_ASYNCWINDOWPOS)
+
+    def move_windows(self, moves):
+        # 同一帧内的所有移动放在一个 DeferWindowPos 事务中一次性提交。事务会等待每个目标窗口，
+        # 所以先探测所有窗口，有窗口无响应或提交失败时抛出异常，由调用方逐个移动并隔离出错的窗口
+        for hwnd, x, y, width, height in moves:
+            self.probe(hwnd)
+        flags = win32con.SWP_NOZORDER | win32con.SWP_NOACTIVATE
+        hdwp = self.user32.BeginDeferWindowPos(len(moves))
+        for hwnd, x, y, width, height in moves:
+            if not hdwp:
+                break
+            hdwp = self.user32.DeferWindowPos(hdwp, hwnd, None, x, y, width, height, flags)
+        if not hdwp or not self.user32.EndDeferWindowPos(hdwp):
+            raise ctypes.WinError()
+
+    def activate_window(self, hwnd):
+        # 强制激活窗口
+        win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
+        # 使用 keybd_event 模拟按键来强制激活窗口
+        win32api.keybd_event(0, 0, 0, 0)
+        win32api.keybd_event(0, 0, win32con.KEYEVENTF_KEYUP, 0)
+
+    def set_topmost(self, hwnd, topmost):
+        win32gui.SetWindowPos(
+            hwnd,
+            win32con.HWND_TOPMOST if topmost else win32con.HWND_NOTOPMOST,
+            0, 0, 0, 0,
+            win32con.SWP_SHOWWINDOW | win32con.SWP_NOSIZE | win32con.SWP_NOMOVE |
+            win32con.SWP_ASYNCWINDOWPOS
+        )
+
+    def is_hung(self, hwnd):
+        # 不发送消息，目标窗口 5 秒没有处理消息时返回真
+        return bool(self.user32.IsHungAppWindow(hwnd))
+
+
+class FakeBackend(WindowBackend):
+    """内存中的模拟后端，用于在非 Windows 平台上测试跟踪引擎
+
+    calls 统计每个 API 的调用次数，可用来验证每次检测的系统调用数量。
+    """
+
+    def __init__(self):
+        super().__init__()
+        # hwnd -> {'rect': (l, t, r, b), 'title': str, 'minimized': bool, 'exe': str, 'class_name': str}
+        # 按 Z 序从下到上排列：后加入或激活的窗口在上层
+        self.windows = {}
+        self.cursor = (0, 0)
+        self.calls = collections.Counter()
+        self.next_hwnd = 0x1000
+        self.process_ids = {}  # 可执行文件名 -> 模拟的 pid
+
+    def add_window(self, rect, title='', exe='', class_name=''):
+        hwnd = self.next_hwnd
+        self.next_hwnd += 4
+        self.windows[hwnd] = {
+            'rect': tuple(rect), 'title': title, 'minimized': False, 'exe': exe, 'class_name': class_name,
+        }
+        return hwnd
+
+    def launch_window(self, rect, title='', exe='', class_name=''):
+        """模拟程序启动后新出现的顶层窗口"""
+        hwnd = self.add_window(rect, title, exe, class_name)
+        self.emit('create', hwnd)
+        return hwnd
+
+    def emit(self, event, hwnd):
+        if self.event_callback:
+            self.event_callback(event, hwnd)
+
+    def user_move(self, hwnd, rect):
+        """模拟用户拖动窗口"""
+        self.windows[hwnd]['rect'] = tuple(rect)
+        self.emit('move', hwnd)
+
+    def destroy_window(self, hwnd):
+        del self.windows[hwnd]
+        self.emit('destroy', hwnd)
+
+    def minimize_window(self, hwnd):
+        self.windows[hwnd]['minimized'] = True
+        self.emit('minimize', hwnd)
+
+    def restore_window(self, hwnd):
+        self.windows[hwnd]['minimized'] = False
+        self.emit('restore', hwnd)
+
+    def is_window(self, hwnd):
+        self.calls['is_window'] += 1
+        return hwnd in self.windows
+
+    def get_window_rect(self, hwnd):
+        self.calls['get_window_rect'] += 1
+        return self.windows[hwnd]['rect']
+
+    def get_window_text(self, hwnd):
+        self.calls['get_window_text'] += 1
+        return self.windows[hwnd]['title']
+
+    def get_cursor_pos(self):
+        self.calls['get_cursor_pos'] += 1
+        if self.cursor is None:
+            # 模拟安全桌面（UAC/锁屏）下读取鼠标位置被拒绝
+            raise OSError('GetCursorPos: access denied')
+        return self.cursor
+
+    def enum_windows(self):
+        self.calls['enum_windows'] += 1
+        return list(self.windows)
+
+    def get_class_name(self, hwnd):
+        self.calls['get_class_name'] += 1
+        return self.windows[hwnd]['class_name']
+
+    def get_process_name(self, hwnd):
+        self.calls['get_process_name'] += 1
+        return self.windows[hwnd]['exe']
+
+    def snapshot_windows(self):
+        self.calls['snapshot_windows'] += 1
+        process_ids = self.process_ids
+        return [
+            WindowInfo(hwnd, window['rect'], window['title'], window['class_name'],
+                       process_ids.setdefault(window['exe'], 1000 + 4 * len(process_ids)))
+            for hwnd, window in reversed(self.windows.items())
+            if not window['minimized']
+        ]
+
+    def move_window(self, hwnd, x, y, width, height):
+        self.calls['move_window'] += 1
+        self.windows[hwnd]['rect'] = (x, y, x + width, y + height)
+        self.emit('move', hwnd)
+
+    def move_windows(self, moves):
+        self.calls['move_windows'] += 1
+        for hwnd, x, y, width, height in moves:
+            self.windows[hwnd]['rect'] = (x, y, x + width, y + height)
+        for hwnd, x, y, width, height in moves:
+            self.emit('move', hwnd)
+
+    def activate_window(self, hwnd):
+        self.calls['activate_window'] += 1
+        window = self.windows.pop(hwnd)
+        window['minimized'] = False
+        self.windows[hwnd] = window
+
+    def set_topmost(self, hwnd, topmost):
+        self.calls['set_topmost'] += 1
+
+    def is_hung(self, hwnd):
+        self.calls['is_hung'] += 1
+        return False
+
+
+class FlakyBackend(FakeBackend):
+    """注入慢调用、失败和无响应窗口的模拟后端
+
+    delays 为 hwnd -> 每次调用耗时 ms：clock 为虚拟时钟时推进时钟，否则真的 sleep；
+    failures 为 hwnd -> 剩余的失败次数；hung 为无响应的窗口集合。
+    """
+    blocking_calls = True
+
+    def __init__(self, clock=None):
+        super().__init__()
+        self.clock = clock
+        self.delays = {}
+        self.failures = collections.Counter()
+        self.hung = set()
+
+    def inject(self, hwnds):
+        for hwnd in hwnds:
+            delay = self.delays.get(hwnd)
+            if delay:
+                if self.clock is not None:
+                    self.clock.advance(delay)
+                else:
+                    time.sleep(delay / 1000)
+            if self.failures[hwnd] > 0:
+                self.failures[hwnd] -= 1
+                raise OSError(f'injected failure for {hwnd}')
+
+    def is_hung(self, hwnd):
+        super().is_hung(hwnd)
+        return hwnd in self.hung
+
+    def move_window(self, hwnd, x, y, width, height):
+        self.inject([hwnd])
+        super().move_window(hwnd, x, y, width, height)
+
+    def move_windows(self, moves):
+        self.inject([move[0] for move in moves])
+        super().move_windows(moves)
+
+    def set_topmost(self, hwnd, topmost):
+        self.inject([hwnd])
+        super().set_topmost(hwnd, topmost)
+
+
+class VirtualClock:
+    """手动推进的虚拟时钟（秒），代替 time.perf_counter 让延迟和动画按确定的时间生效"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, ms):
+        self.now += ms / 1000
+
+
+class WindowTracker:
+    """基于窗口事件的跟踪引擎
+
+    为每个受管窗口缓存几何信息，只有收到移动/销毁/最小化事件的窗口
+    才会在下一次 poll() 时重新读取位置，避免每次定时检测都调用
+    IsWindow / GetWindowRect。
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.rects = {}
+        self.minimized = set()
+        self.stale = set()      # 收到移动事件、需要重新读取位置的窗口
+        self.changed = set()    # 几何或状态发生变化、需要重新评估的窗口
+        self.animating = set()  # 正在播放动画的窗口，位置由动画决定，忽略其移动事件
+        self.removed = []       # 已被销毁的窗口
+        self.created = []       # 新出现的顶层窗口，只在 watch_created 时记录
+        self.watch_created = False
+        backend.set_event_callback(self.on_window_event)
+
+    def track(self, hwnd):
+        self.rects[hwnd] = self.backend.get_window_rect(hwnd)
+        self.changed.add(hwnd)
+        self.backend.start_event_hook()
+
+    def untrack(self, hwnd):
+        self.rects.pop(hwnd, None)
+        self.minimized.discard(hwnd)
+        self.stale.discard(hwnd)
+        self.changed.discard(hwnd)
+        self.animating.discard(hwnd)
+        if not self.rects and not self.watch_created:
+            self.backend.stop_event_hook()
+
+    def clear(self):
+        for hwnd in list(self.rects):
+            self.untrack(hwnd)
+
+    def update_rect(self, hwnd, rect):
+        """记录由本程序移动后的窗口位置"""
+        if hwnd in self.rects:
+            self.rects[hwnd] = tuple(rect)
+
+    def set_watch_created(self, watch):
+        """开启/关闭新窗口事件的记录（会话中还有未找到的窗口时开启）"""
+        self.watch_created = watch
+        if watch:
+            self.backend.start_event_hook()
+        else:
+            self.created = []
+            if not self.rects:
+                self.backend.stop_event_hook()
+
+    def take_created(self):
+        created, self.created = self.created, []
+        return created
+
+    def on_window_event(self, event, hwnd):
+        if event == 'create':
+            if self.watch_created and hwnd not in self.rects:
+                self.created.append(hwnd)
+            return
+        if hwnd not in self.rects:
+            return
+        if event == 'move':
+            if hwnd not in self.animating:
+                self.stale.add(hwnd)
+        elif event == 'destroy':
+            self.untrack(hwnd)
+            self.removed.append(hwnd)
+        elif event == 'minimize':
+            self.minimized.add(hwnd)
+            self.changed.add(hwnd)
+        elif event == 'restore':
+            self.minimized.discard(hwnd)
+            self.stale.add(hwnd)
+
+    def poll(self):
+        """处理积累的事件，返回 (已销毁的窗口, 发生变化的窗口)"""
+        removed, self.removed = self.removed, []
+        stale, self.stale = self.stale, set()
+        for hwnd in stale:
+            try:
+                self.rects[hwnd] = self.backend.get_window_rect(hwnd)
+                self.changed.add(hwnd)
+            except Exception as e:
+                # 窗口可能在事件到达前已被销毁
+                logging.error(f'Error refreshing window rect: {str(e)}')
+                if not self.backend.is_window(hwnd):
+                    self.untrack(hwnd)
+                    removed.append(hwnd)
+        changed, self.changed = self.changed, set()
+        return removed, changed
+
+
+SESSION_FILE = 'window_manager_session.json'
+SESSION_SAVE_DELAY_MS = 1000  # 连续多次变化合并为一次保存
+
+# 受管窗口的稳定标识：可执行文件名、窗口类名、标题，以及停靠边缘和隐藏前的窗口矩形
+SessionEntry = collections.namedtuple('SessionEntry', 'exe class_name title edge rect')
+
+
+def title_pattern(title):
+    """标题中稳定的部分：'文档名 - 程序名' 取最后的程序名，没有分隔符时取整个标题"""
+    return title.rsplit(' - ', 1)[-1]
+
+
+class SessionStore:
+    """受管窗口会话的读写，保存为 JSON，先写临时文件再替换，避免写到一半时退出损坏文件"""
+    VERSION = 1
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        try:
+            if not os.path.exists(self.path):
+                return []
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return [
+                SessionEntry(item['exe'], item['class_name'], item['title'], item.get('edge'), tuple(item['rect']))
+                for item in data.get('windows', [])
+            ]
+        except Exception as e:
+            logging.error(f'Error loading session: {str(e)}')
+            return []
+
+    def save(self, entries):
+        try:
+            data = {
+                'version': self.VERSION,
+                'windows': [entry._asdict() for entry in entries],
+            }
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            logging.error(f'Error saving session: {str(e)}')
+
+
+class SessionIndex:
+    """尚未找到对应窗口的会话条目，按 (可执行文件名, 窗口类名) 建索引
+
+    枚举或新建的每个窗口先用类名过滤，再做一次字典查找，不需要逐条比较；
+    同一标识下有多个条目时优先匹配标题完全相同的，其次匹配标题模式（程序名部分）。
+    """
+
+    def __init__(self, entries=()):
+        self.entries = {}  # (exe, class_name) -> [SessionEntry]
+        self.class_names = collections.Counter()
+        for entry in entries:
+            self.entries.setdefault((entry.exe, entry.class_name), []).append(entry)
+            self.class_names[entry.class_name] += 1
+
+    def __len__(self):
+        return sum(self.class_names.values())
+
+    def pending(self):
+        return [entry for entries in self.entries.values() for entry in entries]
+
+    def claim(self, key, title, exact=False):
+        """取出与窗口匹配的条目，没有匹配时返回 None；exact 为真时只匹配标题完全相同的条目
+
+        标题模式为空（保存的标题为空或以 ' - ' 结尾）的条目只匹配标题完全相同的窗口。
+        """
+        candidates = self.entries.get(key)
+        if not candidates:
+            return None
+        match = None
+        for i, entry in enumerate(candidates):
+            if entry.title == title:
+                match = i
+                break
+            if match is None and not exact:
+                pattern = title_pattern(entry.title)
+                if pattern and title.endswith(pattern):
+                    match = i
+        if match is None:
+            return None
+        entry = candidates.pop(match)
+        if not candidates:
+            del self.entries[key]
+        self.class_names[entry.class_name] -= 1
+        if not self.class_names[entry.class_name]:
+            del self.class_names[entry.class_name]
+        return entry
+
+
+JOURNAL_FILE = 'window_manager_journal.jsonl'
+JOURNAL_FLUSH_DELAY_MS = 500     # 显示/移除记录合并写入的延迟；隐藏记录在窗口移出屏幕前写入
+JOURNAL_COMPACT_RECORDS = 1000   # 日志记录数超过该值且大部分已过时时重写为当前状态
+
+# 隐藏中的窗口：句柄、可执行文件名、窗口类名、标题、隐藏前的窗口矩形、停靠边缘
+JournalEntry = collections.namedtuple('JournalEntry', 'hwnd exe class_name title rect edge')
+
+
+class WindowJournal:
+    """隐藏窗口的预写日志，程序崩溃或被结束后把留在屏幕边缘外的窗口移回原位
+
+    每行一条 JSON 记录：hide（隐藏前的位置和停靠边缘）、show（已移回屏幕内）、
+    forget（窗口已销毁）。记录先放在内存中，flush() 时一次追加写入；
+    窗口移出屏幕前必须 flush()，显示等记录可以延迟合并写入。
+    追加只写到系统缓冲区，能承受程序崩溃；崩溃时写了一半的最后一行在读取时丢弃。
+    过时的记录多了以后 compact() 把当前状态写入临时文件并 fsync，再替换日志文件。
+    """
+
+    def __init__(self, path, compact_records=JOURNAL_COMPACT_RECORDS):
+        self.path = path
+        self.compact_records = compact_records
+        self.hidden = {}    # hwnd -> JournalEntry，日志中仍处于隐藏状态的窗口
+        self.pending = []   # 尚未写入的记录
+        self.needs_flush = False  # 有尚未写入的隐藏记录，窗口移出屏幕前必须写入
+        self.records = 0    # 日志文件中的记录数
+        self.appends = 0
+        self.compactions = 0
+        self.file = None
+
+    @staticmethod
+    def encode(op, hwnd, entry=None):
+        item = {'op': op, 'hwnd': hwnd}
+        if entry is not None:
+            item.update(exe=entry.exe, class_name=entry.class_name, title=entry.title,
+                        rect=list(entry.rect), edge=entry.edge)
+        return (json.dumps(item, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+
+    def load(self):
+        """读取日志，返回仍处于隐藏状态的窗口 {hwnd: JournalEntry}"""
+        self.hidden = {}
+        self.records = 0
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return self.hidden
+        except OSError as e:
+            logging.error(f'Error reading journal: {str(e)}')
+            return self.hidden
+        lines = data.split(b'\n')
+        # 最后一个换行之后的内容是崩溃时没有写完的记录
+        torn = lines.pop()
+        for line in lines:
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+                hwnd = item['hwnd']
+                if item['op'] == 'hide':
+                    self.hidden[hwnd] = JournalEntry(hwnd, item['exe'], item['class_name'], item['title'],
+                                                     tuple(item['rect']), item.get('edge'))
+                else:
+                    self.hidden.pop(hwnd, None)
+            except (ValueError, KeyError, TypeError) as e:
+                logging.warning(f'Skipping damaged journal record: {str(e)}')
+                continue
+            self.records += 1
+        if torn:
+            logging.warning(f'Discarding incomplete journal record ({len(torn)} bytes)')
+            try:
+                with open(self.path, 'r+b') as f:
+                    f.truncate(len(data) - len(torn))
+            except OSError as e:
+                logging.error(f'Error truncating journal: {str(e)}')
+        return self.hidden
+
+    def hide(self, entry):
+        self.hidden[entry.hwnd] = entry
+        self.pending.append(self.encode('hide', entry.hwnd, entry))
+        self.needs_flush = True
+
+    def show(self, hwnd):
+        if self.hidden.pop(hwnd, None) is not None:
+            self.pending.append(self.encode('show', hwnd))
+
+    def forget(self, hwnd):
+        if self.hidden.pop(hwnd, None) is not None:
+            self.pending.append(self.encode('forget', hwnd))
+
+    def flush(self):
+        """把积累的记录一次追加到日志，过时的记录太多时压缩"""
+        if not self.pending:
+            return
+        if self.records + len(self.pending) > self.compact_records and \
+                len(self.hidden) * 4 < self.records + len(self.pending):
+            self.compact()
+            return
+        if self.file is None:
+            self.file = open(self.path, 'ab')
+        self.file.write(b''.join(self.pending))
+        self.file.flush()
+        self.records += len(self.pending)
+        self.appends += 1
+        self.pending.clear()
+        self.needs_flush = False
+
+    def compact(self):
+        """把当前仍隐藏的窗口写成新的日志，写入临时文件并 fsync 后替换，中途崩溃时旧日志不受影响"""
+        self.close_file()
+        data = b''.join(self.encode('hide', hwnd, entry) for hwnd, entry in self.hidden.items())
+        temp_path = self.path + '.tmp'
+        self.write_snapshot(temp_path, data)
+        os.replace(temp_path, self.path)
+        self.pending.clear()
+        self.needs_flush = False
+        self.records = len(self.hidden)
+        self.compactions += 1
+
+    def write_snapshot(self, path, data):
+        with open(path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def recover(self, backend, hwnds=None):
+        """把日志中仍隐藏的窗口同步移回隐藏前的位置，返回移回的窗口
+
+        hwnds 不为空时只恢复其中的窗口。窗口已不存在或句柄已被其他程序的窗口复用时丢弃该记录；
+        窗口无响应或移动失败时保留记录，下次启动或 --recover 时再试。
+        """
+        recovered = []
+        for hwnd, entry in list(self.hidden.items()):
+            if hwnds is not None and hwnd not in hwnds:
+                continue
+            try:
+                if not backend.is_window(hwnd):
+                    del self.hidden[hwnd]
+                    continue
+                if (backend.get_process_name(hwnd), backend.get_class_name(hwnd)) != (entry.exe, entry.class_name):
+                    logging.info(f'Window handle {hwnd} now belongs to another window, not recovering {entry.title}')
+                    del self.hidden[hwnd]
+                    continue
+                if backend.is_hung(hwnd):
+                    logging.warning(f'Window {entry.title} is not responding, keeping it for the next recovery')
+                    continue
+                left, top, right, bottom = entry.rect
+                backend.move_window(hwnd, left, top, right - left, bottom - top)
+                del self.hidden[hwnd]
+                recovered.append(hwnd)
+                logging.info(f'Recovered window {entry.title} to {entry.rect}')
+            except Exception as e:
+                logging.error(f'Error recovering window {entry.title}: {str(e)}')
+        self.compact()
+        return recovered
+
+    def close_file(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def close(self):
+        self.flush()
+        self.close_file()
+
+
+def recover_journal(path=JOURNAL_FILE, backend=None):
+    """独立的恢复命令：不启动窗口管理器，只把日志中仍隐藏的窗口移回原位"""
+    journal = WindowJournal(path)
+    journal.load()
+    if not journal.hidden:
+        return []
+    recovered = journal.recover(backend or Win32Backend())
+    journal.close()
+    return recovered
+
+
+RULES_FILE = 'window_manager_rules.json'
+
+# 自动管理规则：exe/class_name 为空时匹配任意值，title 为正则表达式（在标题中搜索），
+# edge 为空时只加入管理不停靠，monitor 为显示器序号，为空时使用窗口所在的显示器
+WindowRule = collections.namedtuple('WindowRule', 'exe class_name title edge monitor')
+
+
+# 标题正则中的转义字符、反向引用 (?P=name) / 条件 (?(1)...) 和命名组 (?P<name>...)
+TITLE_GROUP_SYNTAX = re.compile(r'\\(.)|\(\?(P=|\(|P<)', re.DOTALL)
+
+
+def check_title_pattern(title):
+    """标题正则会被合并进 RuleMatcher 的大表达式，组号和组名都会改变，因此不支持反向引用和命名组"""
+    for found in TITLE_GROUP_SYNTAX.finditer(title):
+        escaped, group = found.groups()
+        if (escaped is not None and escaped in '123456789') or group in ('P=', '('):
+            raise ValueError('backreferences are not supported in title patterns')
+        if group == 'P<':
+            raise ValueError('named groups are not supported in title patterns, use (...) or (?:...)')
+
+
+def parse_rule(item):
+    """把规则文件或控制接口中的一条规则（dict）转换为 WindowRule，格式错误时抛出 ValueError"""
+    rule = WindowRule(
+        item.get('exe') or None, item.get('class_name') or None, item.get('title') or None,
+        item.get('edge') or None, item.get('monitor'),
+    )
+    if not (rule.exe or rule.class_name or rule.title):
+        raise ValueError('rule needs at least one of exe, class_name, title')
+    if rule.edge is not None and rule.edge not in MonitorLayout.SIDES:
+        raise ValueError(f'unknown edge {rule.edge!r}')
+    if rule.monitor is not None and not isinstance(rule.monitor, int):
+        raise ValueError(f'monitor must be an index, got {rule.monitor!r}')
+    if rule.title is not None:
+        check_title_pattern(rule.title)
+        # 与 RuleMatcher 中相同的包装方式编译一次，提前发现无法合并的写法
+        try:
+            RuleMatcher([rule])
+        except re.error as e:
+            raise ValueError(str(e))
+    return rule
+
+
+def load_rules(path):
+    """读取规则文件，格式错误的规则记录日志后跳过"""
+    try:
+        if not os.path.exists(path):
+            return []
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except Exception as e:
+        logging.error(f'Error loading rules: {str(e)}')
+        return []
+    rules = []
+    for number, item in enumerate(data.get('rules', []), 1):
+        try:
+            rules.append(parse_rule(item))
+        except Exception as e:
+            logging.error(f'Skipping rule {number} in {path}: {str(e)}')
+    try:
+        RuleMatcher(rules)
+    except re.error:
+        # 单独能编译的规则合并后仍可能出错，逐条加入找出并丢弃这些规则
+        kept = []
+        for rule in rules:
+            try:
+                RuleMatcher(kept + [rule])
+            except re.error as e:
+                logging.warning(f'Skipping rule {rule} in {path}: {str(e)}')
+                continue
+            kept.append(rule)
+        rules = kept
+    return rules
+
+
+class RuleMatcher:
+    """把所有规则编译成一个正则表达式
+
+    窗口被表示为 '可执行文件名\\n类名\\n标题'，每条规则是一个命名分支 r<序号>，
+    分支按规则顺序排列，匹配时从前往后尝试，命中的分支就是优先级最高的规则，
+    每个窗口只需匹配一次。可执行文件名和类名不区分大小写；标题正则不支持反向引用和命名组。
+    """
+
+    def __init__(self, rules=()):
+        self.rules = list(rules)
+        branches = []
+        for index, rule in enumerate(self.rules):
+            exe = f'(?i:{re.escape(rule.exe)})' if rule.exe else '[^\\n]*'
+            class_name = f'(?i:{re.escape(rule.class_name)})' if rule.class_name else '[^\\n]*'
+            title = f'[^\\n]*?(?:{rule.title})' if rule.title else ''
+            branches.append(f'(?P<r{index}>{exe}\\n{class_name}\\n{title})')
+        # MULTILINE 下规则里的 ^/$ 对应标题的开头和结尾
+        self.pattern = re.compile('|'.join(branches), re.MULTILINE) if branches else None
+
+    def __len__(self):
+        return len(self.rules)
+
+    def match(self, exe, class_name, title):
+        """返回窗口命中的第一条规则，没有命中时返回 None"""
+        if self.pattern is None:
+            return None
+        found = self.pattern.match(exe + '\n' + class_name + '\n' + title.replace('\n', ' '))
+        if found is None:
+            return None
+        return self.rules[int(found.lastgroup[1:])]
+
+
+# 受管窗口的状态
+STATE_VISIBLE = 'visible'                # 普通显示，没有贴在边缘
+STATE_DOCKED_VISIBLE = 'docked-visible'  # 贴在边缘并显示，鼠标离开后隐藏
+STATE_HIDING = 'hiding'                  # 正在滑出到边缘外
+STATE_HIDDEN = 'hidden'
+STATE_REVEALING = 'revealing'            # 正在滑回边缘内侧
+STATE_PINNED = 'pinned'                  # 固定显示，不自动隐藏
+STATE_LABELS = {
+    STATE_VISIBLE: '显示中',
+    STATE_DOCKED_VISIBLE: '贴边显示',
+    STATE_HIDING: '正在隐藏',
+    STATE_HIDDEN: '已隐藏',
+    STATE_REVEALING: '正在显示',
+    STATE_PINNED: '已固定',
+}
+
+HIDE_DELAY_MS = 300   # 鼠标离开贴边窗口持续这么久才隐藏，避免在边缘附近来回切换
+REVEAL_DWELL_MS = 0   # 鼠标在触发区域停留这么久才显示，默认立即显示
+
+
+class ManagedWindow:
+    """受管窗口的状态记录
+
+    edge/home_rect 为隐藏时停靠的边缘线段和隐藏前的窗口矩形，touching 为显示时触及的边缘线段，
+    deadline 为等待中的延迟切换（离开后隐藏、停留后显示）的到期时间，没有时为 None。
+    """
+    __slots__ = ('hwnd', 'title', 'state', 'edge', 'home_rect', 'touching', 'deadline')
+
+    def __init__(self, hwnd, title):
+        self.hwnd = hwnd
+        self.title = title
+        self.state = STATE_VISIBLE
+        self.edge = None
+        self.home_rect = None
+        self.touching = None
+        self.deadline = None
+
+    @property
+    def hidden(self):
+        return self.state in (STATE_HIDING, STATE_HIDDEN)
+
+
+class WindowListModel(QAbstractListModel):
+    """受管窗口列表模型
+
+    隐藏/显示只通过 dataChanged 刷新对应的一行，增删窗口只插入/删除一行，
+    不再重建整个控件树。
+    """
+    HwndRole = Qt.ItemDataRole.UserRole + 1
+
+    def __init__(self, windows, parent=None):
+        super().__init__(parent)
+        self.windows = windows  # hwnd -> ManagedWindow，与 WindowManager.managed 共享
+        self.hwnds = []
+        self.rows = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.hwnds)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        hwnd = self.hwnds[index.row()]
+        record = self.windows.get(hwnd)
+        if record is None:
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return f"• {record.title} ({STATE_LABELS[record.state]})"
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return f"{record.title}\n双击固定/取消固定"
+        if role == self.HwndRole:
+            return hwnd
+        return None
+
+    def add_window(self, hwnd):
+        if hwnd in self.rows:
+            self.update_window(hwnd)
+            return
+        row = len(self.hwnds)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.hwnds.append(hwnd)
+        self.rows[hwnd] = row
+        self.endInsertRows()
+
+    def remove_window(self, hwnd):
+        row = self.rows.pop(hwnd, None)
+        if row is None:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.hwnds[row]
+        for i in range(row, len(self.hwnds)):
+            self.rows[self.hwnds[i]] = i
+        self.endRemoveRows()
+
+    def update_window(self, hwnd):
+        row = self.rows.get(hwnd)
+        if row is None:
+            return
+        start = time.perf_counter() if perf_stats.enabled else None
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.DisplayRole])
+        if start is not None:
+            perf_stats.observe('list_update', time.perf_counter() - start)
+
+    def clear(self):
+        self.beginResetModel()
+        self.hwnds = []
+        self.rows = {}
+        self.endResetModel()
+
+
+class WindowListDelegate(QStyledItemDelegate):
+    """绘制窗口标题和行尾的删除按钮，点击按钮时发出 delete_requested"""
+    delete_requested = pyqtSignal(object)
+    BUTTON_WIDTH = 60
+    ROW_HEIGHT = 30
+
+    def button_rect(self, rect):
+        return QRect(rect.right() - self.BUTTON_WIDTH - 5, rect.top() + 2,
+                     self.BUTTON_WIDTH, rect.height() - 4)
+
+    def paint(self, painter, option, index):
+        text_option = QStyleOptionViewItem(option)
+        text_option.rect = option.rect.adjusted(5, 0, -(self.BUTTON_WIDTH + 10), 0)
+        super().paint(painter, text_option, index)
+
+        button = QStyleOptionButton()
+        button.rect = self.button_rect(option.rect)
+        button.text = "删除"
+        button.state = QStyle.StateFlag.State_Enabled | QStyle.StateFlag.State_Raised
+        style = option.widget.style() if option.widget else QApplication.style()
+        style.drawControl(QStyle.ControlElement.CE_PushButton, button, painter)
+
+    def sizeHint(self, option, index):
+        size = super().sizeHint(option, index)
+        return QSize(size.width() + self.BUTTON_WIDTH + 15, max(size.height(), self.ROW_HEIGHT))
+
+    def editorEvent(self, event, model, option, index):
+        if (event.type() == QEvent.Type.MouseButtonRelease and
+                self.button_rect(option.rect).contains(event.position().toPoint())):
+            self.delete_requested.emit(index.data(WindowListModel.HwndRole))
+            return True
+        return False
+
+
+PICKER_CELL_SIZE = 256  # 选择窗口时网格索引的格子边长（像素）
+
+
+class WindowPickIndex:
+    """选择窗口用的顶层窗口网格索引
+
+    windows 为一次快照得到的 [WindowInfo, ...]，按 Z 序排列（最上层在前）。
+    每个窗口登记到它覆盖的所有格子中，格子里的列表保持 Z 序，
+    命中测试只检查鼠标所在格子里的窗口，第一个包含鼠标的就是最上层的窗口。
+    bounds 为虚拟桌面范围，超出的部分不登记。
+    """
+
+    def __init__(self, windows, bounds=None, cell_size=PICKER_CELL_SIZE):
+        self.windows = windows
+        self.cell_size = cell_size
+        self.cells = {}  # (列, 行) -> [WindowInfo, ...]
+        cells = self.cells
+        for window in windows:
+            left, top, right, bottom = window.rect
+            if bounds is not None:
+                left, top = max(left, bounds[0]), max(top, bounds[1])
+                right, bottom = min(right, bounds[2]), min(bottom, bounds[3])
+            if left >= right or top >= bottom:
+                continue
+            for column in range(left // cell_size, (right - 1) // cell_size + 1):
+                for row in range(top // cell_size, (bottom - 1) // cell_size + 1):
+                    cell = cells.get((column, row))
+                    if cell is None:
+                        cells[(column, row)] = [window]
+                    else:
+                        cell.append(window)
+
+    def hit_test(self, point):
+        """返回 point 处最上层的窗口，没有时返回 None"""
+        x, y = point
+        cell = self.cells.get((x // self.cell_size, y // self.cell_size))
+        if cell:
+            for window in cell:
+                left, top, right, bottom = window.rect
+                if left <= x < right and top <= y < bottom:
+                    return window
+        return None
+
+
+class WindowPickerOverlay(QWidget):
+    """选择窗口时覆盖整个虚拟桌面的半透明遮罩
+
+    鼠标移动时在快照索引上做命中测试，高亮鼠标下最上层的窗口，不调用任何系统 API；
+    左键单击发出 picked(WindowInfo)，右键或 Esc 发出 cancelled。
+    """
+    picked = pyqtSignal(object)
+    cancelled = pyqtSignal()
+
+    def __init__(self, index, bounds):
+        super().__init__(None, Qt.WindowType.FramelessWindowHint | Qt.WindowType.WindowStaysOnTopHint |
+                         Qt.WindowType.Tool)
+        self.index = index
+        self.current = None
+        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
+        self.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        self.setMouseTracking(True)
+        self.setCursor(Qt.CursorShape.CrossCursor)
+        left, top, right, bottom = bounds
+        self.setGeometry(left, top, right - left, bottom - top)
+
+    def local_rect(self, window):
+        left, top, right, bottom = window.rect
+        origin = self.geometry().topLeft()
+        return QRect(left - origin.x(), top - origin.y(), right - left, bottom - top)
+
+    def hover(self, point):
+        """高亮 point（全局坐标）处的窗口并返回该窗口，只重绘新旧两个高亮区域"""
+        window = self.index.hit_test(point)
+        if window is not self.current:
+            previous, self.current = self.current, window
+            for item in (previous, window):
+                if item is not None:
+                    self.update(self.local_rect(item))
+        return window
+
+    def pick(self, point):
+        window = self.hover(point)
+        if window is not None:
+            self.close()
+            self.picked.emit(window)
+
+    def cancel(self):
+        self.close()
+        self.cancelled.emit()
+
+    def mouseMoveEvent(self, event):
+        point = event.globalPosition().toPoint()
+        self.hover((point.x(), point.y()))
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton:
+            point = event.globalPosition().toPoint()
+            self.pick((point.x(), point.y()))
+        elif event.button() == Qt.MouseButton.RightButton:
+            self.cancel()
+
+    def keyPressEvent(self, event):
+        if event.key() == Qt.Key.Key_Escape:
+            self.cancel()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        # 几乎透明的底色，保证整个遮罩都能接收鼠标事件
+        painter.fillRect(event.rect(), QColor(0, 0, 0, 1))
+        if self.current is not None:
+            rect = self.local_rect(self.current)
+            painter.fillRect(rect, QColor(0, 120, 215, 60))
+            painter.setPen(QPen(QColor(0, 120, 215), 3))
+            painter.drawRect(rect.adjusted(1, 1, -2, -2))
+            painter.setPen(QColor(255, 255, 255))
+            title = self.current.title or '(无标题)'
+            painter.drawText(
+                rect.adjusted(8, 6, -8, -6), Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop,
+                f'{title}\n{self.current.class_name}  pid {self.current.pid}',
+            )
+        painter.end()
+
+
+IPC_SERVER_NAME = 'window_manager_control'
+IPC_MAX_REQUEST_BYTES = 1024 * 1024  # 单行请求的长度上限，超过时断开连接
+
+
+class ControlServer(QObject):
+    """本地控制接口，基于 QLocalServer（Windows 上为命名管道，其他平台为本地套接字）
+
+    每行一个 JSON 请求 {"cmd": ..., "id": ..., 其他参数}，或者一行一个请求数组（批量，一次往返）。
+    每个请求返回 {"id": ..., "ok": true, "result": ...} 或 {"id": ..., "ok": false, "error": "..."}，
+    批量请求按顺序返回一个数组，各占一行。handlers 为命令名 -> 处理函数(request)，
+    处理函数抛出 ValueError 表示请求有误。
+    """
+
+    def __init__(self, handlers, name=IPC_SERVER_NAME, parent=None):
+        super().__init__(parent)
+        from PyQt6.QtNetwork import QLocalServer
+        self.handlers = handlers
+        self.name = name
+        self.server = QLocalServer(self)
+        # 只允许当前用户连接
+        self.server.setSocketOptions(QLocalServer.SocketOption.UserAccessOption)
+        self.server.newConnection.connect(self.on_new_connection)
+        self.buffers = {}  # QLocalSocket -> 还没有收到换行的数据
+        self.requests = 0
+
+    def listen(self):
+        from PyQt6.QtNetwork import QLocalServer
+        if self.server.listen(self.name):
+            return True
+        # 上次异常退出时留下的本地套接字文件
+        QLocalServer.removeServer(self.name)
+        if self.server.listen(self.name):
+            return True
+        logging.error(f'Cannot listen on control endpoint {self.name}: {self.server.errorString()}')
+        return False
+
+    def close(self):
+        self.server.close()
+        for socket in list(self.buffers):
+            socket.disconnectFromServer()
+
+    def on_new_connection(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            self.buffers[socket] = b''
+            socket.readyRead.connect(lambda socket=socket: self.on_ready_read(socket))
+            socket.disconnected.connect(lambda socket=socket: self.on_disconnected(socket))
+
+    def on_disconnected(self, socket):
+        self.buffers.pop(socket, None)
+        socket.deleteLater()
+
+    def on_ready_read(self, socket):
+        if socket not in self.buffers:
+            return
+        data = self.buffers[socket] + socket.readAll().data()
+        *lines, rest = data.split(b'\n')
+        if len(rest) > IPC_MAX_REQUEST_BYTES:
+            logging.error('Control request too large, closing connection')
+            self.buffers.pop(socket, None)
+            socket.abort()
+            return
+        self.buffers[socket] = rest
+        replies = [self.handle_line(line) for line in lines if line.strip()]
+        if replies:
+            socket.write(b''.join(replies))
+            socket.flush()
+
+    def handle_line(self, line):
+        try:
+            payload = json.loads(line)
+        except ValueError as e:
+            reply = {'id': None, 'ok': False, 'error': f'invalid JSON: {str(e)}'}
+        else:
+            if isinstance(payload, list):
+                reply = [self.handle_request(request) for request in payload]
+            else:
+                reply = self.handle_request(payload)
+        return json.dumps(reply, ensure_ascii=False).encode('utf-8') + b'\n'
+
+    def handle_request(self, request):
+        if not isinstance(request, dict):
+            return {'id': None, 'ok': False, 'error': 'request must be an object'}
+        self.requests += 1
+        request_id = request.get('id')
+        handler = self.handlers.get(request.get('cmd'))
+        if handler is None:
+            return {'id': request_id, 'ok': False, 'error': f"unknown command {request.get('cmd')!r}"}
+        try:
+            return {'id': request_id, 'ok': True, 'result': handler(request)}
+        except (ValueError, KeyError, TypeError) as e:
+            return {'id': request_id, 'ok': False, 'error': str(e) if not isinstance(e, KeyError) else f'missing {e}'}
+        except Exception as e:
+            logging.error(f"Error handling control command {request.get('cmd')}: {str(e)}\n{traceback.format_exc()}")
+            return {'id': request_id, 'ok': False, 'error': str(e)}
+
+
+TRACE_MAGIC = b'WMTRACE\x00'
+TRACE_VERSION = 1
+TRACE_HEADER = struct.Struct('<8sHd')  # 标识、版本、开始记录时的墙上时间
+TRACE_FLUSH_BYTES = 64 * 1024          # 缓冲区超过该大小时写入文件
+TRACE_FLUSH_INTERVAL_US = 1000000      # 距上次写入超过该时间（微秒）时写入文件
+
+# 记录类型；每条记录以 (类型, 距上一条记录的微秒数) 开头，后面是该类型的定长数据
+(TRACE_TICK, TRACE_CURSOR, TRACE_CURSOR_ERROR, TRACE_RECT, TRACE_GONE, TRACE_LAYOUT, TRACE_MANAGE,
+ TRACE_UNMANAGE, TRACE_PIN, TRACE_ZONE, TRACE_DECISION, TRACE_CONFIG, TRACE_GAP) = range(1, 14)
+TRACE_FORMATS = {kind: struct.Struct('<BI' + fmt) for kind, fmt in {
+    TRACE_TICK: '',                  # 鼠标没动的检测
+    TRACE_CURSOR: 'ii',              # 鼠标移动后的检测
+    TRACE_CURSOR_ERROR: '',          # 读取鼠标位置开始失败
+    TRACE_RECT: 'QiiiiB',            # 窗口几何变化：hwnd、矩形、是否最小化
+    TRACE_GONE: 'Q',                 # 窗口已销毁
+    TRACE_LAYOUT: 'H',               # 显示器布局，后面跟显示器个数个 TRACE_MONITOR
+    TRACE_MANAGE: 'Qiiii',           # 开始管理窗口：hwnd、矩形
+    TRACE_UNMANAGE: 'Q',
+    TRACE_PIN: 'QB',
+    TRACE_ZONE: 'QB',                # 鼠标钩子报告进入(1)/离开(0)触发区域
+    TRACE_DECISION: 'QBBBiiiii',     # hwnd、动作、边缘方向、显示器、边缘坐标、窗口矩形
+    TRACE_CONFIG: 'III',             # 隐藏延迟、显示停留时间、动画时长（毫秒）
+    TRACE_GAP: 'Q',                  # 两条记录间隔超过 32 位微秒数时补充的间隔
+}.items()}
+TRACE_MONITOR = struct.Struct('<iiii')
+TRACE_MAX_DELTA_US = 0xFFFFFFFF
+
+# 决策动作；不是由检测或鼠标区域事件引起的（停靠命令、规则、固定等）加上 TRACE_EXTERNAL，回放时直接执行
+TRACE_DEFER_HIDE, TRACE_HIDE, TRACE_DEFER_REVEAL, TRACE_SHOW = range(4)
+TRACE_ACTIONS = ('defer-hide', 'hide', 'defer-reveal', 'show')
+TRACE_EXTERNAL = 0x80
+TRACE_NO_EDGE = 0xFF
+
+TraceDecision = collections.namedtuple('TraceDecision', 'time hwnd action side monitor coord rect')
+
+
+class TraceRecorder:
+    """跟踪过程的二进制轨迹记录器
+
+    记录鼠标采样、窗口几何变化、显示器布局和隐藏/显示决策，用于复现现场问题和回放性能测试。
+    每条记录在内存缓冲区中追加一次 struct.pack，缓冲区满或超过一秒时才写入文件，
+    检测路径上的额外开销只有几次打包。path 为 None 时只保存在内存中，用 data() 取出。
+    derived 为 True 期间（检测、鼠标区域事件）记录的决策由输入决定，回放时应当重新得出。
+    """
+
+    def __init__(self, path=None, clock=time.monotonic, flush_bytes=TRACE_FLUSH_BYTES):
+        self.path = path
+        self.clock = clock
+        self.flush_bytes = flush_bytes
+        self.started = clock()
+        self.header = TRACE_HEADER.pack(TRACE_MAGIC, TRACE_VERSION, time.time())
+        self.buffer = bytearray()
+        self.packers = {kind: fmt.pack for kind, fmt in TRACE_FORMATS.items()}
+        self.last_us = 0
+        self.flushed_us = 0
+        self.records = 0
+        self.bytes_written = len(self.header)
+        self.derived = False
+        self.file = None
+        if path is not None:
+            self.file = open(path, 'wb', buffering=0)  # 已经在内存中缓冲，每次写入直接交给系统
+            self.file.write(self.header)
+
+    def write(self, kind, *values):
+        t_us = int((self.clock() - self.started) * 1000000 + 0.5)
+        delta = t_us - self.last_us
+        if not 0 <= delta <= TRACE_MAX_DELTA_US:
+            if delta > 0:
+                # 间隔记录已经包含了整个间隔，之后的记录从 t_us 开始计算增量
+                self.buffer += self.packers[TRACE_GAP](TRACE_GAP, 0, delta)
+                self.last_us = t_us
+            delta = 0
+        self.last_us += delta
+        buffer = self.buffer
+        buffer += self.packers[kind](kind, delta, *values)
+        self.records += 1
+        if len(buffer) >= self.flush_bytes or t_us - self.flushed_us >= TRACE_FLUSH_INTERVAL_US:
+            self.flush(t_us)
+
+    def flush(self, t_us=None):
+        if self.file is None:
+            return
+        if self.buffer:
+            self.file.write(self.buffer)
+            self.bytes_written += len(self.buffer)
+            self.buffer.clear()
+        self.flushed_us = self.last_us if t_us is None else t_us
+
+    def close(self):
+        if self.file is not None:
+            self.flush()
+            self.file.close()
+            self.file = None
+
+    def data(self):
+        """内存中记录的完整轨迹"""
+        return self.header + bytes(self.buffer)
+
+    def tick(self, cursor=None):
+        """检测开始评估：cursor 为移动后的鼠标位置，鼠标没动时为 None"""
+        self.derived = True
+        if cursor is None:
+            self.write(TRACE_TICK)
+        else:
+            self.write(TRACE_CURSOR, cursor[0], cursor[1])
+
+    def cursor_error(self):
+        self.derived = True
+        self.write(TRACE_CURSOR_ERROR)
+
+    def zone(self, hwnd, entered):
+        self.derived = True
+        self.write(TRACE_ZONE, hwnd, entered)
+
+    def settle(self):
+        """检测或鼠标区域事件处理完毕，之后的决策来自外部命令"""
+        self.derived = False
+
+    def rect(self, hwnd, rect, minimized):
+        self.write(TRACE_RECT, hwnd, *rect, minimized)
+
+    def gone(self, hwnd):
+        self.write(TRACE_GONE, hwnd)
+
+    def manage(self, hwnd, rect):
+        self.write(TRACE_MANAGE, hwnd, *rect)
+
+    def unmanage(self, hwnd):
+        self.write(TRACE_UNMANAGE, hwnd)
+
+    def pin(self, hwnd, pinned):
+        self.write(TRACE_PIN, hwnd, pinned)
+
+    def config(self, hide_delay_ms, reveal_dwell_ms, duration_ms):
+        self.write(TRACE_CONFIG, hide_delay_ms, reveal_dwell_ms, duration_ms)
+
+    def layout(self, monitors):
+        self.write(TRACE_LAYOUT, len(monitors))
+        for monitor in monitors:
+            self.buffer += TRACE_MONITOR.pack(*monitor)
+
+    def decision(self, hwnd, action, edge, rect):
+        if not self.derived:
+            action |= TRACE_EXTERNAL
+        if edge is None:
+            self.write(TRACE_DECISION, hwnd, action, TRACE_NO_EDGE, TRACE_NO_EDGE, 0, *rect)
+        else:
+            self.write(TRACE_DECISION, hwnd, action, MonitorLayout.SIDES.index(edge.side),
+                       edge.monitor, edge.coord, *rect)
+
+
+class TraceReader:
+    """通过内存映射读取轨迹文件，逐条产生 (秒, 类型, 数据)
+
+    source 可以是文件路径，也可以是 TraceRecorder.data() 返回的字节串。
+    程序崩溃时末尾可能留下不完整的记录，读取到该处时停止。
+    """
+
+    def __init__(self, source):
+        self.file = None
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            self.data = source
+        else:
+            self.file = open(source, 'rb')
+            try:
+                self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                self.file.close()
+                raise ValueError(f'{source} is empty')
+        if len(self.data) < TRACE_HEADER.size:
+            self.close()
+            raise ValueError('trace is truncated')
+        magic, self.version, self.started_at = TRACE_HEADER.unpack_from(self.data, 0)
+        if magic != TRACE_MAGIC or self.version != TRACE_VERSION:
+            self.close()
+            raise ValueError(f'not a trace file (version {self.version})')
+        self.truncated = False
+
+    def __iter__(self):
+        data = self.data
+        end = len(data)
+        offset = TRACE_HEADER.size
+        t_us = 0
+        formats = TRACE_FORMATS
+        while offset < end:
+            fmt = formats.get(data[offset])
+            if fmt is None:
+                raise ValueError(f'unknown trace record {data[offset]} at offset {offset}')
+            if offset + fmt.size > end:
+                self.truncated = True
+                return
+            values = fmt.unpack_from(data, offset)
+            offset += fmt.size
+            t_us += values[1]
+            kind = values[0]
+            if kind == TRACE_GAP:
+                t_us += values[2]
+                continue
+            if kind == TRACE_LAYOUT:
+                size = values[2] * TRACE_MONITOR.size
+                if offset + size > end:
+                    self.truncated = True
+                    return
+                values = (kind, values[1], [TRACE_MONITOR.unpack_from(data, offset + i)
+                                            for i in range(0, size, TRACE_MONITOR.size)])
+                offset += size
+            yield t_us / 1000000, kind, values[2:]
+
+    def decisions(self):
+        """轨迹中的所有决策，返回 [(TraceDecision, 是否外部命令), ...]"""
+        return [
+            (TraceDecision(t, values[0], values[1] & ~TRACE_EXTERNAL, *values[2:5], values[5:]),
+             bool(values[1] & TRACE_EXTERNAL))
+            for t, kind, values in self if kind == TRACE_DECISION
+        ]
+
+    def close(self):
+        if self.file is not None:
+            self.data.close()
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class TraceReplayer:
+    """把轨迹确定地回放到使用 FakeBackend 的 WindowManager 上
+
+    管理器、动画和命令执行器改用回放的虚拟时钟，窗口用 FakeBackend 窗口重建，
+    按记录依次施加输入（布局、窗口变化、鼠标位置、外部命令）并在记录检测的时刻执行检测，
+    回放中得出的决策与轨迹中记录的决策逐条对比。
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.backend = manager.backend
+        self.now = 0.0
+        manager.scheduler.stop()
+        manager.clock = self.clock
+        manager.animator.clock = self.clock
+        manager.commands.clock = self.clock
+        self.hwnds = {}        # 轨迹中的 hwnd -> 回放的窗口
+        self.trace_hwnds = {}  # 回放的窗口 -> 轨迹中的 hwnd
+        self.cursor = (0, 0)
+        self.ticks = 0
+
+    def clock(self):
+        return self.now
+
+    def run(self, reader):
+        """回放整个轨迹，返回 (记录的决策, 回放得出的决策)，外部命令不在其中"""
+        manager = self.manager
+        handlers = {
+            TRACE_TICK: self.on_tick, TRACE_CURSOR: self.on_cursor, TRACE_CURSOR_ERROR: self.on_cursor_error,
+            TRACE_RECT: self.on_rect, TRACE_GONE: self.on_gone, TRACE_LAYOUT: self.on_layout,
+            TRACE_MANAGE: self.on_manage, TRACE_UNMANAGE: self.on_unmanage, TRACE_PIN: self.on_pin,
+            TRACE_ZONE: self.on_zone, TRACE_DECISION: self.on_decision, TRACE_CONFIG: self.on_config,
+        }
+        self.recorded = []
+        recorder = manager.start_trace()
+        try:
+            for t, kind, values in reader:
+                self.now = t
+                if manager.animator.animations:
+                    manager.animator.step(t)
+                handlers[kind](*values)
+            if manager.animator.animations:
+                manager.animator.step(float('inf'))
+            replayed = [
+                decision._replace(hwnd=self.trace_hwnds.get(decision.hwnd, decision.hwnd))
+                for decision, external in TraceReader(recorder.data()).decisions() if not external
+            ]
+        finally:
+            manager.stop_trace()
+        return self.recorded, replayed
+
+    @staticmethod
+    def first_divergence(recorded, replayed):
+        """第一组不一致的决策的起始序号，完全一致时返回 None
+
+        同一时刻的决策来自同一次检测，它们之间的顺序取决于集合的遍历顺序，按内容排序后再比较。
+        """
+        def groups(decisions):
+            return [(time, sorted(decision[1:] for decision in group))
+                    for time, group in itertools.groupby(decisions, key=lambda decision: decision.time)]
+
+        index = 0
+        for a, b in itertools.zip_longest(groups(recorded), groups(replayed)):
+            if a != b:
+                return index
+            index += len(a[1])
+        return None
+
+    def window(self, hwnd):
+        window = self.hwnds.get(hwnd)
+        return window if window in self.backend.windows else None
+
+    def on_tick(self):
+        self.ticks += 1
+        self.manager.check_window_position()
+
+    def on_cursor(self, x, y):
+        self.cursor = self.backend.cursor = (x, y)
+        self.on_tick()
+
+    def on_cursor_error(self):
+        # 读取失败期间没有产生记录的检测不会改变状态，只回放失败的这一次
+        self.backend.cursor = None
+        self.on_tick()
+        self.backend.cursor = self.cursor
+
+    def on_rect(self, hwnd, left, top, right, bottom, minimized):
+        window = self.window(hwnd)
+        if window is None:
+            return
+        state = self.backend.windows[window]
+        if minimized and not state['minimized']:
+            self.backend.minimize_window(window)
+        elif not minimized and state['minimized']:
+            self.backend.restore_window(window)
+        if state['rect'] != (left, top, right, bottom):
+            self.backend.user_move(window, (left, top, right, bottom))
+
+    def on_gone(self, hwnd):
+        window = self.window(hwnd)
+        if window is not None:
+            self.backend.destroy_window(window)
+
+    def on_layout(self, monitors):
+        self.manager.apply_monitor_layout(MonitorLayout([
+            (left, top, right - left, bottom - top) for left, top, right, bottom in monitors
+        ]))
+
+    def on_manage(self, hwnd, *rect):
+        window = self.window(hwnd)
+        if window is None:
+            # 尽量沿用轨迹中的 hwnd，集合的遍历顺序（同一次检测中的决策顺序）与记录时一致
+            if hwnd not in self.backend.windows:
+                self.backend.next_hwnd = hwnd
+            window = self.backend.add_window(rect, f'{hwnd:#x}')
+            self.hwnds[hwnd] = window
+            self.trace_hwnds[window] = hwnd
+        elif self.backend.windows[window]['rect'] != rect:
+            self.backend.user_move(window, rect)
+        self.manager.add_window(window, f'{hwnd:#x}')
+
+    def on_unmanage(self, hwnd):
+        window = self.hwnds.get(hwnd)
+        if window is not None:
+            self.manager.remove_window(window)
+
+    def on_pin(self, hwnd, pinned):
+        record = self.manager.managed.get(self.hwnds.get(hwnd))
+        if record is not None and (record.state == STATE_PINNED) != bool(pinned):
+            self.manager.toggle_pinned(record.hwnd)
+
+    def on_zone(self, hwnd, entered):
+        window = self.hwnds.get(hwnd)
+        if window is not None:
+            self.manager.handle_zone_event('enter' if entered else 'leave', window, self.now)
+            self.manager.trace.settle()
+
+    def on_config(self, hide_delay_ms, reveal_dwell_ms, duration_ms):
+        self.manager.hide_delay_ms = hide_delay_ms
+        self.manager.reveal_dwell_ms = reveal_dwell_ms
+        self.manager.animator.duration_ms = duration_ms
+
+    def on_decision(self, hwnd, action, side, monitor, coord, *rect):
+        if not action & TRACE_EXTERNAL:
+            self.recorded.append(TraceDecision(self.now, hwnd, action, side, monitor, coord, rect))
+            return
+        window = self.hwnds.get(hwnd)
+        if window not in self.manager.managed:
+            return
+        action &= ~TRACE_EXTERNAL
+        if action == TRACE_SHOW:
+            self.manager.show_window(window)
+        elif action == TRACE_HIDE:
+            edge = self.find_edge(side, monitor, coord, rect)
+            if edge is None:
+                logging.warning(f'Trace edge {side}/{monitor}/{coord} not in the replayed layout, skipping hide')
+                return
+            # 停靠命令和找回的窗口先移到隐藏前的位置再隐藏
+            left, top, right, bottom = rect
+            self.manager.commands.move_window(window, left, top, right - left, bottom - top)
+            self.manager.tracker.update_rect(window, rect)
+            self.manager.hide_window(window, edge)
+
+    def find_edge(self, side, monitor, coord, rect):
+        if side == TRACE_NO_EDGE:
+            return None
+        side = MonitorLayout.SIDES[side]
+        along = (rect[1], rect[3]) if side in ('right', 'left') else (rect[0], rect[2])
+        candidates = [
+            edge for edge in self.manager.monitor_layout.edges[side]
+            if edge.monitor == monitor and edge.coord == coord
+        ]
+        for edge in candidates:
+            if edge.start < along[1] and along[0] < edge.end:
+                return edge
+        return candidates[0] if candidates else None
+
+
 class WindowManager(QMainWindow):
-    def __init__(self):
+    def __init__(self, backend=None, session_path=SESSION_FILE, rules_path=RULES_FILE, journal_path=JOURNAL_FILE):
         try:
             super().__init__()
-            # 先初始化授权相关属性
-            self.machine_code = self.get_machine_code()
-            self.license_key = self.generate_license_key(self.machine_code)
-            self.is_authorized = self.check_local_license()
-            self.target_windows = {}
-            self.is_hidden = {}
-            self.monitor_timer = QTimer()
-            self.monitor_timer.timeout.connect(self.check_window_position)
-            self.monitor_timer.start(100)
-            self.hook = None
-            self.user32 = ctypes.windll.user32
+            self.backend = backend or Win32Backend()
+            if perf_stats.enabled:
+                perf_stats.instrument_backend(self.backend)
+            self.tracker = WindowTracker(self.backend)
+            self.last_cursor_pos = None
+            self.cursor_error = False
+            self.managed = {}    # hwnd -> ManagedWindow
+            self.pending = set()  # 有等待中的延迟切换（deadline）的窗口
+            self.docked_visible = set()  # 贴边显示、鼠标离开后需要隐藏的窗口
+            self.hide_delay_ms = HIDE_DELAY_MS
+            self.reveal_dwell_ms = REVEAL_DWELL_MS
+            self.clock = time.monotonic
+            # 移动/激活/置顶交给命令执行器，可能阻塞的后端在后台线程执行，无响应的窗口不会卡住界面
+            self.commands = WindowCommandWorker(self.backend, parent=self)
+            self.commands.results_ready.connect(self.on_command_results)
+            if self.backend.blocking_calls:
+                self.commands.start()
+            self.animator = SlideAnimator(self.commands, parent=self)
+            # 隐藏窗口的预写日志，journal_path 为空时不使用。启动时先读出上次崩溃后留在屏幕外的窗口，
+            # 托盘显示后的第一次事件循环中再把它们移回原位
+            self.journal = WindowJournal(journal_path) if journal_path else None
+            self.journal_timer = QTimer(self)
+            self.journal_timer.setSingleShot(True)
+            self.journal_timer.setInterval(JOURNAL_FLUSH_DELAY_MS)
+            self.journal_timer.timeout.connect(self.flush_journal)
+            self.stranded = set()
+            if self.journal is not None:
+                self.load_journal()
+                self.animator.before_commit = self.journal_write_ahead
+            self.monitor_layout = MonitorLayout.from_screens(QApplication.screens())
+            # 鼠标钩子线程实时检测触发区域，避免定时采样带来的延迟；第一次有窗口隐藏时才启动
+            self.zone_matcher = EdgeZoneMatcher()
+            self.edge_trigger = None
+            self.edge_trigger_created = False
+            self.edge_zones = EdgeZoneIndex(self.monitor_layout, self.zone_matcher)
+            app = QApplication.instance()
+            app.screenAdded.connect(self.on_screen_added)
+            app.screenRemoved.connect(self.on_screens_changed)
+            for screen in QApplication.screens():
+                screen.geometryChanged.connect(self.on_screens_changed)
+            # 授权相关属性（machine_code/license_key/is_authorized）第一次用到时才计算
+            # 窗口列表模型不依赖控件，先创建；列表视图等界面第一次显示时才创建
+            self.window_model = WindowListModel(self.managed, self)
+            self.ui_ready = False
+            # 受管窗口会话：启动后一次枚举找回上次管理的窗口，session_path 为空时不保存
+            self.session_store = SessionStore(session_path) if session_path else None
+            self.session_index = SessionIndex()
+            self.window_identities = {}  # hwnd -> (可执行文件名, 窗口类名)
+            self.session_save_timer = QTimer(self)
+            self.session_save_timer.setSingleShot(True)
+            self.session_save_timer.setInterval(SESSION_SAVE_DELAY_MS)
+            self.session_save_timer.timeout.connect(self.save_session)
+            # 自动管理规则：命中的窗口出现时自动加入管理并停靠，rules_path 为空时不使用规则
+            self.rules_path = rules_path
+            self.rule_matcher = RuleMatcher()
+            self.dismissed = set()  # 用户手动移除的窗口，不再被规则自动加入
+            if self.session_store is not None or self.rules_path:
+                QTimer.singleShot(0, self.acquire_startup_windows)
+            # 检测频率随状态自适应：靠近边缘或动画中加快，空闲时放慢，锁屏/关闭显示器时暂停
+            self.scheduler = TickScheduler(self.check_window_position, self.choose_tick_mode, parent=self)
+            self.scheduler.start()
+            self.picker = None  # 选择窗口时的遮罩
+            self.control_server = None
+            self.trace = None  # 轨迹记录器，--trace 或 start_trace() 开启
             self.initTray()
             self.setWindowFlag(Qt.WindowType.Tool)
-            logging.info('Starting WindowManager initialization')
-            self.initUI()
             logging.info('WindowManager initialized successfully')
         except Exception as e:
             logging.error(f'Error in WindowManager initialization: {str(e)}\n{traceback.format_exc()}')
             QMessageBox.critical(None, '错误', f'初始化失败: {str(e)}')
             raise
 
+    @cached_property
+    def machine_code(self):
+        return self.get_machine_code()
+
+    @cached_property
+    def license_key(self):
+        return self.generate_license_key(self.machine_code)
+
+    @cached_property
+    def is_authorized(self):
+        return self.check_local_license()
+
     def get_machine_code(self):
+        import uuid
         return str(uuid.getnode())
 
     def generate_license_key(self, machine_code):
+        import hashlib
         h = hashlib.sha256(machine_code.encode('utf-8')).hexdigest()
         return h[-8:].upper()
 
@@ -106,11 +3194,14 @@ class WindowManager(QMainWindow):
         # 创建托盘菜单
         tray_menu = QMenu()
         show_action = QAction("显示", self)
+        stats_action = QAction("运行统计", self)
         quit_action = QAction("退出", self)
         show_action.triggered.connect(self.show)
+        stats_action.triggered.connect(self.show_stats_dialog)
         quit_action.triggered.connect(self.realQuit)
         
         tray_menu.addAction(show_action)
+        tray_menu.addAction(stats_action)
         tray_menu.addAction(quit_action)
         
         self.tray_icon.setContextMenu(tray_menu)
@@ -124,101 +3215,647 @@ class WindowManager(QMainWindow):
             self.show()
             self.activateWindow()
 
+    def set_stats_enabled(self, enabled):
+        """开启/关闭性能统计，关闭时移除后端调用计数"""
+        if enabled == perf_stats.enabled:
+            return
+        perf_stats.enabled = enabled
+        if enabled:
+            perf_stats.reset()
+            perf_stats.instrument_backend(self.backend)
+        else:
+            perf_stats.uninstrument_backend(self.backend)
+
+    def show_stats_dialog(self):
+        """显示运行统计，可导出为 JSON"""
+        box = QMessageBox(self)
+        box.setWindowTitle("运行统计")
+        box.setText(perf_stats.format_text())
+        toggle_btn = box.addButton("停用统计" if perf_stats.enabled else "启用统计", QMessageBox.ButtonRole.ActionRole)
+        export_btn = box.addButton("导出 JSON", QMessageBox.ButtonRole.ActionRole)
+        box.addButton(QMessageBox.StandardButton.Close)
+        box.exec()
+        if box.clickedButton() is toggle_btn:
+            self.set_stats_enabled(not perf_stats.enabled)
+        elif box.clickedButton() is export_btn:
+            path, _ = QFileDialog.getSaveFileName(self, "导出统计", "window_manager_stats.json", "JSON (*.json)")
+            if path:
+                try:
+                    perf_stats.dump_json(path)
+                except Exception as e:
+                    logging.error(f'Error exporting stats: {str(e)}')
+                    QMessageBox.critical(self, '错误', f'导出失败: {str(e)}')
+
+    def start_control_server(self, name=IPC_SERVER_NAME):
+        """启动本地控制接口，失败时返回 False"""
+        self.control_server = ControlServer({
+            'ping': lambda request: 'pong',
+            'list': self.control_list,
+            'add': self.control_add,
+            'dock': self.control_dock,
+            'reveal': self.control_reveal,
+            'remove': self.control_remove,
+            'stats': self.control_stats,
+            'quit': self.control_quit,
+        }, name, self)
+        if not self.control_server.listen():
+            self.control_server = None
+            return False
+        logging.info(f'Control endpoint listening on {name}')
+        return True
+
+    def control_record(self, request):
+        hwnd = int(request['hwnd'])
+        record = self.managed.get(hwnd)
+        if record is None:
+            raise ValueError(f'window {hwnd} is not managed')
+        return record
+
+    def control_edge(self, request):
+        edge, monitor = request['edge'], request.get('monitor')
+        if edge not in MonitorLayout.SIDES:
+            raise ValueError(f'unknown edge {edge!r}')
+        if monitor is not None and not isinstance(monitor, int):
+            raise ValueError(f'monitor must be an index, got {monitor!r}')
+        return edge, monitor
+
+    def control_window(self, record):
+        exe, class_name = self.window_identity(record.hwnd)
+        edge = record.edge or record.touching
+        return {
+            'hwnd': record.hwnd, 'title': record.title, 'state': record.state,
+            'edge': edge.side if edge else None, 'exe': exe, 'class_name': class_name,
+        }
+
+    def control_list(self, request):
+        return [self.control_window(record) for record in self.managed.values()]
+
+    def control_add(self, request):
+        """按 hwnd、规则或标识（exe/class_name/title，可带 edge/monitor）加入管理，返回新管理的窗口
+
+        exact 为真时按标识匹配：必须给出 exe 和 class_name，title 按原文完全匹配而不是正则。
+        keep 为真时规则同时用于之后出现的窗口。
+        """
+        if not self.is_authorized:
+            raise ValueError('not authorized')
+        if 'hwnd' in request:
+            hwnd = int(request['hwnd'])
+            if not self.backend.is_window(hwnd):
+                raise ValueError(f'window {hwnd} does not exist')
+            edge, monitor = self.control_edge(request) if request.get('edge') else (None, None)
+            added = self.add_window(hwnd, self.backend.get_window_text(hwnd))
+            self.dismissed.discard(hwnd)
+            if added and edge is not None and not self.dock_window(hwnd, edge, monitor):
+                raise ValueError(f'{edge} of monitor {monitor} is not an outer edge')
+            return [self.control_window(self.managed[hwnd])] if added else []
+        if request.get('exact'):
+            if not (request.get('exe') and request.get('class_name')):
+                raise ValueError('exact match needs exe and class_name')
+            if request.get('title') is not None:
+                request = dict(request, title=f'^{re.escape(request["title"])}$')
+        rule = parse_rule(request)
+        matcher = RuleMatcher([rule])
+        added = []
+        for hwnd in self.backend.enum_windows():
+            if hwnd in self.managed:
+                continue
+            try:
+                exe, class_name = self.window_identity(hwnd)
+                title = self.backend.get_window_text(hwnd)
+                if matcher.match(exe, class_name, title) is None:
+                    continue
+                self.dismissed.discard(hwnd)
+                self.apply_rule(hwnd, title, rule)
+                added.append(self.control_window(self.managed[hwnd]))
+            except Exception as e:
+                logging.error(f'Error adding window {hwnd} by rule: {str(e)}')
+        if request.get('keep'):
+            self.rule_matcher = RuleMatcher(self.rule_matcher.rules + [rule])
+            self.tracker.set_watch_created(True)
+        return added
+
+    def control_dock(self, request):
+        record = self.control_record(request)
+        if record.hidden:
+            raise ValueError(f'window {record.hwnd} is already docked')
+        if record.hwnd in self.tracker.animating:
+            raise ValueError(f'window {record.hwnd} is moving')
+        edge, monitor = self.control_edge(request)
+        if not self.dock_window(record.hwnd, edge, monitor):
+            raise ValueError(f'{edge} of monitor {monitor} is not an outer edge')
+        return self.control_window(record)
+
+    def control_reveal(self, request):
+        record = self.control_record(request)
+        self.reveal_window(record.hwnd)
+        return self.control_window(record)
+
+    def control_remove(self, request):
+        """停止管理窗口，隐藏中的窗口先移回隐藏前的位置"""
+        records = list(self.managed.values()) if request.get('all') else [self.control_record(request)]
+        for record in records:
+            if record.home_rect is not None:
+                self.animator.cancel(record.hwnd)
+                left, top, right, bottom = record.home_rect
+                self.commands.move_window(record.hwnd, left, top, right - left, bottom - top)
+                self.journal_restored(record.hwnd)
+            self.remove_window(record.hwnd)
+        return [record.hwnd for record in records]
+
+    def control_stats(self, request):
+        return {
+            'managed': len(self.managed),
+            'states': dict(collections.Counter(record.state for record in self.managed.values())),
+            'scheduler': self.scheduler.snapshot(),
+            'commands': self.commands.snapshot(),
+            'control_requests': self.control_server.requests if self.control_server else 0,
+            'perf': perf_stats.snapshot(),
+        }
+
+    def control_quit(self, request):
+        QTimer.singleShot(0, self.realQuit)
+        return True
+
     def realQuit(self):
         # 真正的退出程序
         self.tray_icon.hide()
+        if self.session_store is not None:
+            self.save_session()
+        self.backend.stop_event_hook()
+        if self.edge_trigger is not None:
+            self.edge_trigger.stop()
+        self.commands.stop()
+        if self.control_server is not None:
+            self.control_server.close()
+        self.stop_trace()
+        if self.journal is not None:
+            try:
+                self.journal.close()
+            except Exception as e:
+                logging.error(f'Error closing journal: {str(e)}')
         QApplication.quit()
 
     def closeEvent(self, event):
         # 重写关闭事件，改为最小化到托盘
-        if self.hook:
-            self.user32.UnhookWindowsHookEx(self.hook)
-            self.hook = None
+        self.cancel_window_selection()
         event.ignore()  # 忽略关闭事件
         self.hide()  # 隐藏窗口
 
+    def on_screen_added(self, screen):
+        screen.geometryChanged.connect(self.on_screens_changed)
+        self.on_screens_changed()
+
+    def on_screens_changed(self, *args):
+        self.apply_monitor_layout(MonitorLayout.from_screens(QApplication.screens()))
+
+    def apply_monitor_layout(self, layout):
+        """显示器布局变化时重建边缘索引，已隐藏的窗口先恢复到隐藏前的位置"""
+        self.monitor_layout = layout
+        self.edge_zones = EdgeZoneIndex(self.monitor_layout, self.zone_matcher)
+        for record in self.managed.values():
+            if record.home_rect is not None:
+                try:
+                    self.animator.cancel(record.hwnd)
+                    self.tracker.animating.discard(record.hwnd)
+                    left, top, right, bottom = record.home_rect
+                    self.commands.move_window(record.hwnd, left, top, right - left, bottom - top)
+                    self.tracker.update_rect(record.hwnd, record.home_rect)
+                    self.journal_restored(record.hwnd)
+                except Exception as e:
+                    logging.error(f"Error restoring window after screen change: {str(e)}")
+                record.edge = record.home_rect = None
+            rect = self.tracker.rects.get(record.hwnd)
+            record.touching = self.monitor_layout.edge_for_rect(rect) if rect else None
+            if record.state != STATE_PINNED:
+                self.set_state(record, STATE_DOCKED_VISIBLE if record.touching else STATE_VISIBLE)
+        self.last_cursor_pos = None
+        if self.trace is not None:
+            self.trace.layout(layout.monitors)
+        self.scheduler.wake()
+
+    def start_trace(self, path=None):
+        """开始记录轨迹，先写入当前的配置、显示器布局和受管窗口，轨迹可以在任意时刻开始"""
+        self.stop_trace()
+        try:
+            trace = TraceRecorder(path, self.clock)
+        except OSError as e:
+            logging.error(f'Cannot open trace file {path}: {str(e)}')
+            return None
+        trace.config(self.hide_delay_ms, self.reveal_dwell_ms, self.animator.duration_ms)
+        trace.layout(self.monitor_layout.monitors)
+        for hwnd, record in self.managed.items():
+            rect = self.tracker.rects.get(hwnd)
+            if rect is None:
+                continue
+            trace.manage(hwnd, rect)
+            if record.state == STATE_PINNED:
+                trace.pin(hwnd, True)
+            elif record.home_rect is not None:
+                trace.decision(hwnd, TRACE_HIDE, record.edge, record.home_rect)
+        # 等待中的延迟切换重新计时，下一次检测重新评估所有窗口，轨迹不依赖开始前的时间
+        for hwnd in list(self.pending):
+            self.cancel_deadline(self.managed[hwnd])
+        self.last_cursor_pos = None
+        self.trace = trace
+        logging.info(f'Tracing to {path or "memory"}')
+        return trace
+
+    def stop_trace(self):
+        if self.trace is None:
+            return
+        try:
+            self.trace.close()
+        except Exception as e:
+            logging.error(f'Error closing trace: {str(e)}')
+        self.trace = None
+
+    def load_journal(self):
+        """读取日志中上次隐藏后没有恢复（程序崩溃或被结束）的窗口，之后由 recover_stranded_windows 移回"""
+        try:
+            self.stranded = set(self.journal.load())
+        except Exception as e:
+            logging.error(f'Error loading journal: {str(e)}')
+        if self.stranded:
+            QTimer.singleShot(0, self.recover_stranded_windows)
+
+    def recover_stranded_windows(self):
+        """把上次遗留的隐藏窗口同步移回隐藏前的位置；本次已重新管理的窗口不动"""
+        stranded, self.stranded = self.stranded - set(self.managed), set()
+        if not stranded:
+            return
+        try:
+            recovered = self.journal.recover(self.backend, stranded)
+            logging.info(f'Recovered {len(recovered)} windows left hidden by a previous run')
+        except Exception as e:
+            logging.error(f'Error recovering hidden windows: {str(e)}')
+
+    def journal_restored(self, hwnd, destroyed=False):
+        """窗口已移回屏幕内或已销毁，日志记录合并后延迟写入"""
+        if self.journal is None:
+            return
+        if destroyed:
+            self.journal.forget(hwnd)
+        else:
+            self.journal.show(hwnd)
+        if self.journal.pending and not self.journal_timer.isActive():
+            self.journal_timer.start()
+
+    def journal_write_ahead(self):
+        """动画移动窗口前调用：有尚未写入的隐藏记录时先写入日志，显示等记录继续等待合并"""
+        if self.journal.needs_flush:
+            self.flush_journal()
+
+    def flush_journal(self):
+        """写入积累的日志记录，窗口移出屏幕前调用"""
+        if self.journal is None:
+            return
+        self.journal_timer.stop()
+        try:
+            self.journal.flush()
+        except Exception as e:
+            logging.error(f'Error writing journal: {str(e)}')
+
+    def ensure_edge_trigger(self):
+        """第一次有窗口隐藏到边缘时才创建鼠标钩子线程"""
+        if self.edge_trigger_created:
+            return
+        self.edge_trigger_created = True
+        self.edge_trigger = self.backend.create_edge_trigger(self.zone_matcher)
+        if self.edge_trigger is not None:
+            self.edge_trigger.zone_events_ready.connect(self.on_zone_events)
+            self.edge_trigger.start()
+
+    def on_zone_events(self):
+        """处理鼠标钩子线程发来的触发区域事件，进入隐藏窗口的触发区域时立即显示"""
+        now = self.clock()
+        for kind, hwnd, triggered_at in self.edge_trigger.drain():
+            self.handle_zone_event(kind, hwnd, now, triggered_at)
+        if self.trace is not None:
+            self.trace.settle()
+        self.scheduler.wake()
+
+    def handle_zone_event(self, kind, hwnd, now, triggered_at=None):
+        record = self.managed.get(hwnd)
+        if record is None:
+            return
+        if self.trace is not None:
+            self.trace.zone(hwnd, kind == 'enter')
+        if kind == 'enter':
+            self.zone_entered(record, now, triggered_at)
+        elif record.hidden:
+            self.cancel_deadline(record)
+
+    def on_command_results(self):
+        """处理命令执行器报告的慢窗口、无响应窗口和失败的操作"""
+        for result in self.commands.drain():
+            if perf_stats.enabled:
+                perf_stats.count(f'commands.{result.status}')
+            record = self.managed.get(result.hwnd)
+            title = record.title if record else result.hwnd
+            if result.status == 'recovered':
+                logging.info(f'Window {title} responds again, resumed {result.kind}')
+            elif result.status in ('slow', 'hung'):
+                logging.warning(f'Window {title} is not responding ({result.kind}, {result.elapsed_ms:.0f} ms), retrying later')
+            else:
+                logging.error(f'Window command {result.kind} {result.status} for {title}: {result.error}')
+        perf_stats.set_gauge('quarantined_windows', len(self.commands.quarantine))
+
+    def set_state(self, record, state):
+        if record.state != state:
+            record.state = state
+            if state == STATE_DOCKED_VISIBLE:
+                self.docked_visible.add(record.hwnd)
+            else:
+                self.docked_visible.discard(record.hwnd)
+            self.window_model.update_window(record.hwnd)
+
+    def choose_tick_mode(self):
+        """根据当前状态选择下一次检测的频率"""
+        if not self.managed:
+            return 'idle'
+        if self.pending or self.animator.animations:
+            return 'fast'
+        if self.cursor_error or self.last_cursor_pos is None:
+            return 'normal' if self.docked_visible else 'idle'
+        distance = self.edge_zones.distance_to(self.last_cursor_pos)
+        if distance is not None and distance <= NEAR_EDGE_DISTANCE:
+            return 'fast'
+        if self.docked_visible or (distance is not None and distance <= FAR_EDGE_DISTANCE):
+            return 'normal'
+        return 'idle'
+
+    def nativeEvent(self, event_type, message):
+        # 锁屏/解锁、显示器关闭/打开时暂停或恢复定时检测
+        if bytes(event_type) == b'windows_generic_MSG':
+            try:
+                change = self.backend.session_state_change(message)
+                if change is not None:
+                    self.scheduler.set_blocked(*change)
+            except Exception as e:
+                logging.error(f'Error handling session state message: {str(e)}')
+        return super().nativeEvent(event_type, message)
+
+    def cancel_deadline(self, record):
+        record.deadline = None
+        self.pending.discard(record.hwnd)
+
+    def zone_entered(self, record, now, triggered_at=None):
+        """鼠标进入隐藏窗口的触发区域：停留 reveal_dwell_ms 后显示，默认立即显示"""
+        if not record.hidden:
+            return
+        if self.reveal_dwell_ms <= 0 or (record.deadline is not None and now >= record.deadline):
+            self.reveal_window(record.hwnd, triggered_at)
+        elif record.deadline is None:
+            record.deadline = now + self.reveal_dwell_ms / 1000
+            self.pending.add(record.hwnd)
+            if self.trace is not None:
+                self.trace.decision(record.hwnd, TRACE_DEFER_REVEAL, record.edge, self.tracker.rects[record.hwnd])
+
+    def toggle_pinned(self, hwnd):
+        """固定/取消固定窗口：固定的窗口保持显示，不会自动隐藏"""
+        record = self.managed.get(hwnd)
+        if record is None:
+            return
+        self.cancel_deadline(record)
+        if record.state == STATE_PINNED:
+            self.set_state(record, STATE_DOCKED_VISIBLE if record.touching else STATE_VISIBLE)
+            self.last_cursor_pos = None  # 下一次检测重新评估
+            if self.trace is not None:
+                self.trace.pin(hwnd, False)
+            self.scheduler.wake()
+            return
+        if record.hidden:
+            self.show_window(hwnd)
+        self.set_state(record, STATE_PINNED)
+        if self.trace is not None:
+            self.trace.pin(hwnd, True)
+        self.schedule_session_save()
+        self.scheduler.wake()
+
     def clear_windows(self):
-        self.target_windows.clear()
-        self.is_hidden.clear()
-        self.update_window_list()
-
-    def update_window_list(self):
-        # 清除现有的窗口列表布局
-        if hasattr(self, 'windows_layout'):
-            # 清除旧的布局中的所有部件
-            while self.windows_layout.count():
-                item = self.windows_layout.takeAt(0)
-                if item.widget():
-                    item.widget().deleteLater()
-                elif item.layout():
-                    # 清理子布局中的部件
-                    while item.layout().count():
-                        sub_item = item.layout().takeAt(0)
-                        if sub_item.widget():
-                            sub_item.widget().deleteLater()
-            # 从主布局中移除窗口列表布局
-            self.main_layout.removeItem(self.windows_layout)
-            
-        # 创建新的窗口列表布局
-        self.windows_layout = QVBoxLayout()
-        self.windows_layout.setSpacing(5)  # 设置垂直间距
-        
-        # 创建一个滚动区域来容纳窗口列表
-        scroll_widget = QWidget()
-        scroll_layout = QVBoxLayout(scroll_widget)
-        scroll_layout.setSpacing(5)  # 设置垂直间距
-        
-        for hwnd, title in self.target_windows.items():
-            # 为每个窗口创建一个容器部件
-            window_widget = QWidget()
-            window_layout = QHBoxLayout(window_widget)
-            window_layout.setContentsMargins(5, 2, 5, 2)  # 设置边距
-            
-            # 添加窗口标题和状态
-            status = "已隐藏" if self.is_hidden.get(hwnd, False) else "显示中"
-            window_label = QLabel(f"• {title} ({status})")
-            window_label.setWordWrap(True)  # 允许文本换行
-            window_layout.addWidget(window_label, stretch=1)  # 设置拉伸因子
-            
-            # 添加删除按钮
-            delete_btn = QPushButton("删除")
-            delete_btn.setMaximumWidth(60)
-            delete_btn.clicked.connect(lambda checked, h=hwnd: self.remove_window(h))
-            window_layout.addWidget(delete_btn)
-            
-            # 将窗口部件添加到滚动区域的布局中
-            scroll_layout.addWidget(window_widget)
-        
+        self.dismissed.update(self.managed)
+        self.managed.clear()
+        self.pending.clear()
+        self.docked_visible.clear()
+        self.edge_zones = EdgeZoneIndex(self.monitor_layout, self.zone_matcher)
+        for hwnd in list(self.animator.animations):
+            self.animator.cancel(hwnd)
+        for hwnd in list(self.commands.pending):
+            self.commands.cancel(hwnd)
+        self.tracker.clear()
+        self.window_identities.clear()
+        self.window_model.clear()
+        self.schedule_session_save()
+
+    def update_empty_hint(self):
         # 如果没有窗口，显示提示文本
-        if not self.target_windows:
-            empty_label = QLabel("未选择任何窗口")
-            empty_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            scroll_layout.addWidget(empty_label)
-        
-        # 添加弹性空间
-        scroll_layout.addStretch()
-        
-        # 创建滚动区域
-        scroll_area = QScrollArea()
-        scroll_area.setWidget(scroll_widget)
-        scroll_area.setWidgetResizable(True)
-        scroll_area.setFrameShape(QFrame.Shape.NoFrame)  # 移除边框
-        
-        # 将滚动区域添加到主窗口列表布局中
-        self.windows_layout.addWidget(scroll_area)
-        
-        # 将窗口列表布局添加到主布局中
-        self.main_layout.insertLayout(1, self.windows_layout)
+        if not self.ui_ready:
+            return
+        has_windows = self.window_model.rowCount() > 0
+        self.window_list_view.setVisible(has_windows)
+        self.empty_label.setVisible(not has_windows)
 
     def remove_window(self, hwnd):
         """删除单个窗口"""
-        if hwnd in self.target_windows:
-            del self.target_windows[hwnd]
-            if hwnd in self.is_hidden:
-                del self.is_hidden[hwnd]
-            self.update_window_list()
+        if hwnd in self.managed:
+            del self.managed[hwnd]
+            self.pending.discard(hwnd)
+            self.docked_visible.discard(hwnd)
+            self.edge_zones.remove(hwnd)
+            self.animator.cancel(hwnd)
+            self.commands.cancel(hwnd)
+            self.tracker.untrack(hwnd)
+            self.window_identities.pop(hwnd, None)
+            self.window_model.remove_window(hwnd)
+            self.dismissed.add(hwnd)
+            self.schedule_session_save()
+            if self.trace is not None:
+                self.trace.unmanage(hwnd)
+
+    def add_window(self, hwnd, title):
+        """开始管理窗口，已在管理中时返回 False"""
+        if hwnd in self.managed:
+            return False
+        self.managed[hwnd] = ManagedWindow(hwnd, title)
+        self.tracker.track(hwnd)
+        if self.trace is not None:
+            self.trace.manage(hwnd, self.tracker.rects[hwnd])
+        self.window_model.add_window(hwnd)
+        self.schedule_session_save()
+        self.scheduler.wake()
+        return True
+
+    def window_identity(self, hwnd):
+        identity = self.window_identities.get(hwnd)
+        if identity is None:
+            identity = (self.backend.get_process_name(hwnd), self.backend.get_class_name(hwnd))
+            self.window_identities[hwnd] = identity
+        return identity
+
+    def schedule_session_save(self):
+        if self.session_store is not None:
+            self.session_save_timer.start()
+
+    def session_entries(self):
+        """当前受管窗口的会话条目，加上还没找到窗口的条目"""
+        entries = []
+        for hwnd, record in self.managed.items():
+            try:
+                exe, class_name = self.window_identity(hwnd)
+            except Exception as e:
+                logging.error(f'Error reading window identity: {str(e)}')
+                continue
+            if record.home_rect is not None:
+                edge, rect = record.edge, record.home_rect
+            else:
+                edge, rect = record.touching, self.tracker.rects.get(hwnd)
+            if rect is None:
+                continue
+            entries.append(SessionEntry(exe, class_name, record.title, edge.side if edge else None, tuple(rect)))
+        entries.extend(self.session_index.pending())
+        return entries
+
+    def save_session(self):
+        self.session_save_timer.stop()
+        self.session_store.save(self.session_entries())
+
+    def acquire_startup_windows(self):
+        """读取上次的会话和自动管理规则，一次枚举所有顶层窗口找回/停靠对应窗口，之后的窗口等创建事件"""
+        # 会话中的窗口可能就是上次遗留在屏幕外的窗口，先移回原位再重新停靠
+        self.recover_stranded_windows()
+        if self.session_store is not None:
+            self.session_index = SessionIndex(self.session_store.load())
+        if self.rules_path:
+            try:
+                self.rule_matcher = RuleMatcher(load_rules(self.rules_path))
+            except Exception as e:
+                logging.error(f'Error compiling rules: {str(e)}')
+                self.rule_matcher = RuleMatcher()
+        if not self.session_index and not self.rule_matcher:
+            return
+        try:
+            acquired = self.acquire_windows(self.backend.enum_windows())
+        except Exception as e:
+            logging.error(f'Error enumerating windows: {str(e)}')
+            acquired = 0
+        logging.info(
+            f'Startup acquisition: {acquired} windows managed, {len(self.session_index)} session windows '
+            f'waiting for launch, {len(self.rule_matcher)} rules'
+        )
+
+    def acquire_windows(self, hwnds):
+        """在窗口中查找会话里的窗口和命中规则的窗口并开始管理，返回新管理的窗口数量"""
+        index = self.session_index
+        rules = self.rule_matcher
+        candidates = []  # 可能属于会话的窗口
+        others = []      # 交给规则匹配的窗口
+        for hwnd in hwnds:
+            if not index.class_names and not rules:
+                break
+            if hwnd in self.managed or hwnd in self.dismissed:
+                continue
+            try:
+                class_name = self.backend.get_class_name(hwnd)
+                in_session = class_name in index.class_names
+                if not in_session and not rules:
+                    continue
+                key = (self.backend.get_process_name(hwnd), class_name)
+                if in_session and key in index.entries:
+                    candidates.append((hwnd, key, self.backend.get_window_text(hwnd)))
+                elif rules:
+                    others.append((hwnd, key, self.backend.get_window_text(hwnd)))
+            except Exception as e:
+                # 窗口可能在枚举后已被关闭
+                logging.error(f'Error reading window {hwnd}: {str(e)}')
+        # 先匹配标题完全相同的窗口，剩下的条目再按标题模式匹配，避免抢占同一程序的其他窗口
+        acquired = 0
+        for exact in (True, False):
+            remaining = []
+            for hwnd, key, title in candidates:
+                entry = index.claim(key, title, exact)
+                if entry is None:
+                    remaining.append((hwnd, key, title))
+                    continue
+                try:
+                    self.window_identities[hwnd] = key
+                    self.adopt_window(hwnd, title, entry)
+                    acquired += 1
+                except Exception as e:
+                    logging.error(f'Error acquiring window {hwnd}: {str(e)}')
+            candidates = remaining
+        # 会话之外的窗口按规则自动管理，每个窗口只匹配一次合并后的规则
+        if rules:
+            for hwnd, key, title in candidates + others:
+                rule = rules.match(key[0], key[1], title)
+                if rule is None:
+                    continue
+                try:
+                    self.window_identities[hwnd] = key
+                    self.apply_rule(hwnd, title, rule)
+                    acquired += 1
+                except Exception as e:
+                    logging.error(f'Error applying rule to window {hwnd}: {str(e)}')
+        self.tracker.set_watch_created(bool(index.class_names) or bool(rules))
+        return acquired
+
+    def apply_rule(self, hwnd, title, rule):
+        """管理命中规则的窗口，规则指定了边缘时贴到该边缘并隐藏"""
+        self.add_window(hwnd, title)
+        if rule.edge is None:
+            return
+        if not self.dock_window(hwnd, rule.edge, rule.monitor):
+            logging.warning(f'Rule edge {rule.edge} on monitor {rule.monitor} is not an outer edge, window {hwnd} left in place')
+
+    def dock_window(self, hwnd, side, monitor=None):
+        """把受管窗口贴到指定显示器的一条外边缘并隐藏，该边不是外边缘时返回 False"""
+        docked = self.monitor_layout.dock_rect(self.tracker.rects[hwnd], side, monitor)
+        if docked is None:
+            return False
+        edge, rect = docked
+        self.commands.move_window(hwnd, rect[0], rect[1], rect[2] - rect[0], rect[3] - rect[1])
+        self.tracker.update_rect(hwnd, rect)
+        self.hide_window(hwnd, edge)
+        return True
+
+    def adopt_window(self, hwnd, title, entry):
+        """管理找回的窗口：移回保存的位置，上次停靠在边缘的直接隐藏回去"""
+        self.add_window(hwnd, title)
+        rect = self.tracker.rects[hwnd]
+        home = entry.rect
+        if tuple(rect) != home:
+            self.commands.move_window(hwnd, home[0], home[1], home[2] - home[0], home[3] - home[1])
+            self.tracker.update_rect(hwnd, home)
+        if entry.edge is None:
+            return
+        edge = self.monitor_layout.edge_for_rect(home)
+        if edge is not None and edge.side == entry.edge:
+            self.hide_window(hwnd, edge)
+
+    def setVisible(self, visible):
+        # 界面推迟到第一次显示时再创建，启动时只需要托盘图标
+        if visible and not self.ui_ready:
+            self.initUI()
+        super().setVisible(visible)
+
+    def finish_startup(self):
+        """事件循环启动后再创建并显示主窗口，让托盘图标先出现"""
+        self.show()
+        logging.info('Main window shown')
+        # 确保窗口显示在最前面
+        self.raise_()
+        self.activateWindow()
+        self.backend.watch_session_state(int(self.winId()))
+        startup_timer.mark('main_window')
+        startup_timer.report()
+
+    def finish_headless_startup(self):
+        """无界面模式：不创建主窗口界面，只用它的窗口句柄接收锁屏/显示器通知"""
+        self.backend.watch_session_state(int(self.winId()))
+        startup_timer.mark('headless')
+        startup_timer.report()
 
     def initUI(self):
+        logging.info('Building main window UI')
         self.setWindowTitle('类QQ窗口隐藏器')
         self.setGeometry(100, 100, 500, 300)
         
@@ -231,7 +3868,7 @@ class WindowManager(QMainWindow):
         instruction_text = (
             "<b>用法：</b><br>"
             "1. 点击<b>选择窗口</b>，选择需要隐藏的窗口<br>"
-            "2. 把需要隐藏的窗口移动到屏幕右边或顶部边缘，移开鼠标，窗口会自动隐藏<br>"
+            "2. 把需要隐藏的窗口移动到任意显示器的外侧边缘（上、下、左、右，显示器之间相邻的边除外），移开鼠标，窗口会自动隐藏<br>"
             "3. 把鼠标移动到屏幕边缘，窗口就会自动弹出来显示，用完后又会自动隐藏<br><br>"
             "<b>授权说明：</b><br>"
             "1. 本软件一机一码，本机机器码：<span style='color:blue;'><b>{machine_code}</b></span><br>"
@@ -244,6 +3881,29 @@ class WindowManager(QMainWindow):
         self.instruction_label.setStyleSheet("color: #555; font-size: 13px;")
         self.instruction_label.setTextFormat(Qt.TextFormat.RichText)
         self.main_layout.addWidget(self.instruction_label)
+
+        # 窗口列表：模型/视图，状态变化只刷新对应行
+        self.window_delegate = WindowListDelegate(self)
+        self.window_delegate.delete_requested.connect(self.remove_window)
+        self.window_list_view = QListView()
+        self.window_list_view.setModel(self.window_model)
+        self.window_list_view.setItemDelegate(self.window_delegate)
+        self.window_list_view.setUniformItemSizes(True)
+        self.window_list_view.setTextElideMode(Qt.TextElideMode.ElideRight)
+        self.window_list_view.setSelectionMode(QListView.SelectionMode.NoSelection)
+        self.window_list_view.setFrameShape(QFrame.Shape.NoFrame)  # 移除边框
+        # 双击列表项固定/取消固定窗口
+        self.window_list_view.doubleClicked.connect(
+            lambda index: self.toggle_pinned(index.data(WindowListModel.HwndRole)))
+        self.empty_label = QLabel("未选择任何窗口")
+        self.empty_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.main_layout.addWidget(self.window_list_view)
+        self.main_layout.addWidget(self.empty_label)
+        self.window_model.rowsInserted.connect(self.update_empty_hint)
+        self.window_model.rowsRemoved.connect(self.update_empty_hint)
+        self.window_model.modelReset.connect(self.update_empty_hint)
+        self.ui_ready = True
+        self.update_empty_hint()
         # 显示机器码
         # self.machine_code_label = QLabel(f"本机机器码：{self.machine_code}")
         # self.main_layout.addWidget(self.machine_code_label)
@@ -259,226 +3919,334 @@ class WindowManager(QMainWindow):
         self.main_layout.addLayout(button_layout)
 
     def start_window_selection(self):
+        """对所有顶层窗口做一次快照，显示覆盖整个桌面的遮罩，单击高亮的窗口开始管理"""
         if not self.is_authorized:
             self.show_license_dialog()
             if not self.is_authorized:
                 return
-        self.status_label.setText('请点击要管理的窗口...')
-        
-        def mouse_callback(nCode, wParam, lParam):
-            if wParam == win32con.WM_LBUTTONDOWN:
-                try:
-                    cursor_pos = win32gui.GetCursorPos()
-                    hwnd = win32gui.WindowFromPoint(cursor_pos)
-                    window_text = win32gui.GetWindowText(hwnd)
-                    
-                    if hwnd not in self.target_windows:
-                        self.target_windows[hwnd] = window_text
-                        self.is_hidden[hwnd] = False
-                        self.update_window_list()
-                    
-                    # 取消钩子
-                    if self.hook:
-                        self.user32.UnhookWindowsHookEx(self.hook)
-                        self.hook = None
-                    
-                except Exception as e:
-                    logging.error(f'Error in mouse callback: {str(e)}')
-                
-            return self.user32.CallNextHookEx(None, nCode, wParam, lParam)
-        
-        # 创建钩子回调函数的C类型
-        CMPFUNC = ctypes.WINFUNCTYPE(ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.POINTER(ctypes.c_void_p))
-        self.callback_pointer = CMPFUNC(mouse_callback)  # 保存引用防止被垃圾回收
-        
-        # 设置鼠标钩子
-        module_handle = ctypes.c_void_p(win32api.GetModuleHandle(None))
-        self.hook = self.user32.SetWindowsHookExA(
-            win32con.WH_MOUSE_LL,
-            self.callback_pointer,
-            module_handle,
-            0
-        )
-        
-        if not self.hook:
-            logging.error('Failed to set mouse hook')
-            QMessageBox.critical(self, '错误', '无法设置鼠标钩子')
+        if self.picker is not None:
+            self.picker.activateWindow()
+            return
+        started = time.perf_counter() if perf_stats.enabled else None
+        bounds = self.monitor_layout.bounds()
+        try:
+            index = WindowPickIndex(self.backend.snapshot_windows(), bounds)
+        except Exception as e:
+            logging.error(f'Error taking window snapshot: {str(e)}')
+            QMessageBox.critical(self, '错误', f'无法获取窗口列表: {str(e)}')
+            return
+        if started is not None:
+            perf_stats.observe('picker_snapshot', time.perf_counter() - started)
+        self.picker = WindowPickerOverlay(index, bounds)
+        self.picker.picked.connect(self.on_window_picked)
+        self.picker.cancelled.connect(self.finish_window_selection)
+        self.picker.show()
+        self.picker.raise_()
+        self.picker.activateWindow()
+        if self.ui_ready:
+            self.status_label.setText('请点击要管理的窗口，右键或 Esc 取消...')
+
+    def on_window_picked(self, window):
+        self.finish_window_selection()
+        self.add_window(window.hwnd, window.title)
+
+    def finish_window_selection(self):
+        self.picker = None
+        if self.ui_ready:
+            self.status_label.setText('已选择的窗口:')
+
+    def cancel_window_selection(self):
+        if self.picker is not None:
+            self.picker.cancel()
 
     def check_window_position(self):
-        if not self.target_windows:
+        if self.tracker.created:
+            self.acquire_windows(self.tracker.take_created())
+        if not self.managed:
             return
             
+        tick_start = time.perf_counter() if perf_stats.enabled else None
+        trace = self.trace
         try:
-            for hwnd in list(self.target_windows.keys()):
-                if not win32gui.IsWindow(hwnd):  # 检查窗口是否还存在
-                    del self.target_windows[hwnd]
-                    del self.is_hidden[hwnd]
-                    self.update_window_list()
+            # 先处理窗口事件：已销毁的窗口直接移除，移动过的窗口刷新缓存位置
+            removed, changed = self.tracker.poll()
+            if trace is not None:
+                for hwnd in removed:
+                    trace.gone(hwnd)
+                for hwnd in changed:
+                    if hwnd in self.tracker.rects:
+                        trace.rect(hwnd, self.tracker.rects[hwnd], hwnd in self.tracker.minimized)
+            for hwnd in removed:
+                self.remove_window(hwnd)
+                self.dismissed.discard(hwnd)
+                self.journal_restored(hwnd, destroyed=True)
+
+            # 位置变化的显示中窗口重新计算触及的显示器边缘（隐藏/动画中的窗口保持原停靠边缘）
+            managed = self.managed
+            rects = self.tracker.rects
+            for hwnd in changed:
+                record = managed.get(hwnd)
+                if record is None or hwnd not in rects:
                     continue
-                    
-                rect = win32gui.GetWindowRect(hwnd)
-                screen = QApplication.primaryScreen()
-                screen_geometry = screen.geometry()
-                cursor_pos = win32gui.GetCursorPos()
-                
-                # 定义边缘检测的灵敏度（像素）
-                EDGE_SENSITIVITY = 5
-                SHOW_TRIGGER_WIDTH = 5
-                
-                # 检查窗口是否触及屏幕边缘
-                window_right_edge = rect[2]
-                window_top_edge = rect[1]
-                screen_right_edge = screen_geometry.width()
-                
-                # 检查鼠标是否在窗口的相应范围内
-                is_mouse_in_vertical_range = rect[1] <= cursor_pos[1] <= rect[3]
-                is_mouse_in_horizontal_range = rect[0] <= cursor_pos[0] <= rect[2]
-                
-                # 检查鼠标是否在触发区域
-                is_mouse_in_right_trigger = (
-                    cursor_pos[0] >= screen_right_edge - SHOW_TRIGGER_WIDTH and
-                    is_mouse_in_vertical_range
-                )
-                is_mouse_in_top_trigger = (
-                    cursor_pos[1] <= SHOW_TRIGGER_WIDTH and
-                    is_mouse_in_horizontal_range
-                )
-                
-                # 检查鼠标是否在窗口区域内
-                is_mouse_in_window = (
-                    rect[0] <= cursor_pos[0] <= rect[2] and
-                    rect[1] <= cursor_pos[1] <= rect[3]
-                )
-                
-                # 窗口显示/隐藏逻辑
-                if not self.is_hidden.get(hwnd, False):
-                    if window_right_edge >= screen_right_edge - EDGE_SENSITIVITY:
-                        if not is_mouse_in_window:
-                            self.hide_window(hwnd, 'right')
-                    elif window_top_edge <= EDGE_SENSITIVITY:
-                        if not is_mouse_in_window:
-                            self.hide_window(hwnd, 'top')
-                else:
-                    # 如果鼠标在触发区域，无论前台窗口状态如何都显示窗口
-                    if (is_mouse_in_right_trigger or is_mouse_in_top_trigger):
-                        try:
-                            # 强制激活窗口
-                            win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
-                            
-                            # 使用 keybd_event 模拟按键来强制激活窗口
-                            win32api.keybd_event(0, 0, 0, 0)
-                            win32api.keybd_event(0, 0, win32con.KEYEVENTF_KEYUP, 0)
-                            
-                            # 强制设置窗口位置和状态
-                            win32gui.SetWindowPos(
-                                hwnd,
-                                win32con.HWND_TOPMOST,
-                                rect[0], rect[1],
-                                rect[2] - rect[0], rect[3] - rect[1],
-                                win32con.SWP_SHOWWINDOW | win32con.SWP_NOSIZE | win32con.SWP_NOMOVE | 
-                                win32con.SWP_ASYNCWINDOWPOS
-                            )
-                            
-                            # 立即调用show_window更新窗口位置
-                            self.show_window(hwnd)
-                            
-                            # 确保窗口完全显示后再取消置顶
-                            def delayed_restore():
-                                try:
-                                    if win32gui.IsWindow(hwnd):
-                                        win32gui.SetWindowPos(
-                                            hwnd,
-                                            win32con.HWND_NOTOPMOST,
-                                            rect[0], rect[1],
-                                            rect[2] - rect[0], rect[3] - rect[1],
-                                            win32con.SWP_SHOWWINDOW | win32con.SWP_NOSIZE | win32con.SWP_NOMOVE |
-                                            win32con.SWP_ASYNCWINDOWPOS
-                                        )
-                                except Exception as e:
-                                    logging.error(f"Error in delayed_restore: {str(e)}")
-                            
-                            QTimer.singleShot(100, delayed_restore)
-                            
-                        except Exception as e:
-                            logging.error(f"Error activating window: {str(e)}")
+                if record.state in (STATE_VISIBLE, STATE_DOCKED_VISIBLE, STATE_PINNED):
+                    record.touching = self.monitor_layout.edge_for_rect(rects[hwnd])
+                    if record.state != STATE_PINNED:
+                        if record.touching is None:
+                            self.cancel_deadline(record)
+                        self.set_state(record, STATE_DOCKED_VISIBLE if record.touching else STATE_VISIBLE)
+
+            # 每次检测只读取一次鼠标位置；安全桌面（UAC/锁屏）下会拒绝访问，跳过本次检测
+            try:
+                cursor_pos = self.backend.get_cursor_pos()
+            except Exception as e:
+                if not self.cursor_error:
+                    logging.warning(f'GetCursorPos unavailable, skipping checks until it recovers: {str(e)}')
+                    self.cursor_error = True
+                    if trace is not None:
+                        trace.cursor_error()
+                return
+            self.cursor_error = False
+            cursor_moved = cursor_pos != self.last_cursor_pos
+            self.last_cursor_pos = cursor_pos
+            # 鼠标没动、窗口也没变化、也没有等待到期的延迟切换时无需重新评估
+            if not changed and not cursor_moved and not self.pending:
+                return
+            if trace is not None:
+                trace.tick(cursor_pos if cursor_moved else None)
+
+            now = self.clock()
+            if TICK_DEBUG:
+                logging.debug(f'Tick: cursor={cursor_pos}, changed={len(changed)}, pending={len(self.pending)}')
+
+            # 鼠标所在触发区域属于某个隐藏窗口时（停留足够久后）显示该窗口，离开触发区域的取消等待
+            owner = self.edge_zones.owner_at(cursor_pos)
+            for hwnd in list(self.pending):
+                record = managed[hwnd]
+                if record.hidden and hwnd != owner:
+                    self.cancel_deadline(record)
+            if owner is not None:
+                self.zone_entered(managed[owner], now, tick_start)
+
+            # 贴边显示的窗口：鼠标移动时全部评估，否则只评估位置变化和等待到期的窗口
+            snapshot = TickSnapshot(cursor_pos)
+            minimized = self.tracker.minimized
+            for hwnd in (managed if cursor_moved else changed | self.pending):
+                record = managed.get(hwnd)
+                if record is None or record.state != STATE_DOCKED_VISIBLE:
+                    continue
+                if hwnd in minimized:
+                    if record.deadline is not None:
+                        self.cancel_deadline(record)
+                    continue
+                snapshot.add(hwnd, rects[hwnd])
+
+            # 鼠标离开窗口后等待 hide_delay_ms 再隐藏，期间回到窗口内则取消
+            outside = set(hit_test_windows(snapshot))
+            for hwnd in snapshot.hwnds:
+                record = managed[hwnd]
+                if hwnd not in outside:
+                    if record.deadline is not None:
+                        self.cancel_deadline(record)
+                elif record.deadline is None and self.hide_delay_ms > 0:
+                    record.deadline = now + self.hide_delay_ms / 1000
+                    self.pending.add(hwnd)
+                    if trace is not None:
+                        trace.decision(hwnd, TRACE_DEFER_HIDE, record.touching, rects[hwnd])
+                elif record.deadline is None or now >= record.deadline:
+                    if TICK_DEBUG:
+                        logging.debug(f'Hiding window {hwnd} at {record.touching}')
+                    self.hide_window(hwnd, record.touching)
                         
         except Exception as e:
             logging.error(f"Error in check_window_position: {str(e)}")
-            pass
+        finally:
+            if trace is not None:
+                trace.settle()
+            if tick_start is not None:
+                perf_stats.observe('tick', time.perf_counter() - tick_start)
+
+    def reveal_window(self, hwnd, triggered_at=None):
+        """鼠标进入触发区域时，无论前台窗口状态如何都显示窗口
+
+        triggered_at 为鼠标到达边缘时的 perf_counter 时间，用于统计显示延迟。
+        """
+        if perf_stats.enabled and triggered_at is None:
+            triggered_at = time.perf_counter()
+        record = self.managed.get(hwnd)
+        if record is None or not record.hidden:
+            return
+        try:
+            self.commands.activate_window(hwnd)
+            # 强制置顶，保证窗口显示在最前面
+            self.commands.set_topmost(hwnd, True)
+            
+            # 滑入动画结束、窗口完全显示后再取消置顶（窗口已关闭时命令执行器会丢弃该命令）
+            def restore_topmost():
+                if perf_stats.enabled and triggered_at is not None:
+                    perf_stats.observe('reveal_latency', time.perf_counter() - triggered_at)
+                self.commands.set_topmost(hwnd, False)
+            
+            self.show_window(hwnd, on_finished=restore_topmost)
+            
+        except Exception as e:
+            logging.error(f"Error activating window: {str(e)}")
+
+    def slide_window(self, hwnd, rect, target, on_finished=None):
+        """以动画方式把窗口移动到目标位置，跟踪缓存直接记录目标位置"""
+        self.tracker.update_rect(hwnd, target)
+
+        def finished():
+            self.tracker.animating.discard(hwnd)
+            if on_finished:
+                on_finished()
+
+        self.animator.animate(hwnd, rect, target, finished)
+        if hwnd in self.animator.animations:
+            self.tracker.animating.add(hwnd)
 
     def restore_window_state(self, hwnd):
         """恢复窗口的正常状态（非置顶）"""
         try:
-            rect = win32gui.GetWindowRect(hwnd)
-            win32gui.SetWindowPos(
-                hwnd,
-                win32con.HWND_NOTOPMOST,
-                rect[0], rect[1],
-                rect[2] - rect[0], rect[3] - rect[1],
-                win32con.SWP_SHOWWINDOW | win32con.SWP_NOSIZE | win32con.SWP_NOMOVE
-            )
+            self.commands.set_topmost(hwnd, False)
         except Exception as e:
             logging.error(f"Error in restore_window_state: {str(e)}")
 
     def hide_window(self, hwnd, edge):
+        """把窗口隐藏到指定的显示器边缘，只留 HIDDEN_VISIBLE_WIDTH 像素在屏幕内"""
+        if perf_stats.enabled:
+            perf_stats.count('hide')
+        record = self.managed.get(hwnd)
+        if record is None:
+            return
         try:
-            self.is_hidden[hwnd] = True
-            rect = win32gui.GetWindowRect(hwnd)
+            self.cancel_deadline(record)
+            rect = self.tracker.rects.get(hwnd) or self.backend.get_window_rect(hwnd)
             width = rect[2] - rect[0]
             height = rect[3] - rect[1]
-            screen = QApplication.primaryScreen()
-            
-            if edge == 'right':
-                win32gui.MoveWindow(hwnd, screen.geometry().width() - 5, rect[1], width, height, True)
-            elif edge == 'top':
-                win32gui.MoveWindow(hwnd, rect[0], -height + 5, width, height, True)
             
-            self.update_window_list()
+            x, y = rect[0], rect[1]
+            if edge.side == 'right':
+                x = edge.coord - HIDDEN_VISIBLE_WIDTH
+            elif edge.side == 'left':
+                x = edge.coord - width + HIDDEN_VISIBLE_WIDTH
+            elif edge.side == 'top':
+                y = edge.coord - height + HIDDEN_VISIBLE_WIDTH
+            else:
+                y = edge.coord - HIDDEN_VISIBLE_WIDTH
+            if self.trace is not None:
+                self.trace.decision(hwnd, TRACE_HIDE, edge, rect)
+            if self.journal is not None:
+                # 记录隐藏前的位置，在动画第一次移动窗口前写入日志
+                exe, class_name = self.window_identity(hwnd)
+                self.journal.hide(JournalEntry(hwnd, exe, class_name, record.title, tuple(rect), edge.side))
+            record.edge = edge
+            record.home_rect = tuple(rect)
+            self.ensure_edge_trigger()
+            self.schedule_session_save()
+            if edge.side in ('right', 'left'):
+                self.edge_zones.add(hwnd, edge, y, y + height)
+            else:
+                self.edge_zones.add(hwnd, edge, x, x + width)
+
+            def finished():
+                if record.state == STATE_HIDING:
+                    self.set_state(record, STATE_HIDDEN)
+
+            self.set_state(record, STATE_HIDING)
+            self.slide_window(hwnd, rect, (x, y, x + width, y + height), finished)
                 
         except Exception as e:
             logging.error(f"Error in hide_window: {str(e)}")
 
-    def show_window(self, hwnd):
+    def show_window(self, hwnd, on_finished=None):
+        """把隐藏的窗口移回停靠边缘的内侧，移动完成后调用 on_finished"""
+        if perf_stats.enabled:
+            perf_stats.count('show')
+        record = self.managed.get(hwnd)
+        if record is None:
+            return
         try:
-            self.is_hidden[hwnd] = False
-            rect = win32gui.GetWindowRect(hwnd)
+            self.cancel_deadline(record)
+            self.edge_zones.remove(hwnd)
+            edge = record.edge
+            if edge is None:
+                self.set_state(record, STATE_DOCKED_VISIBLE if record.touching else STATE_VISIBLE)
+                if on_finished:
+                    on_finished()
+                return
+            record.edge = record.home_rect = None
+            rect = self.tracker.rects.get(hwnd) or self.backend.get_window_rect(hwnd)
+            if self.trace is not None:
+                self.trace.decision(hwnd, TRACE_SHOW, edge, rect)
+            self.journal_restored(hwnd)
             width = rect[2] - rect[0]
             height = rect[3] - rect[1]
-            screen = QApplication.primaryScreen()
             
-            if rect[0] >= screen.geometry().width() - 10:  # 右边隐藏状态
-                win32gui.MoveWindow(hwnd, screen.geometry().width() - width, rect[1], width, height, True)
-            elif rect[1] < 0:  # 顶部隐藏状态
-                win32gui.MoveWindow(hwnd, rect[0], 0, width, height, True)
-            
-            self.update_window_list()
+            x, y = rect[0], rect[1]
+            if edge.side == 'right':
+                x = edge.coord - width
+            elif edge.side == 'left':
+                x = edge.coord
+            elif edge.side == 'top':
+                y = edge.coord
+            else:
+                y = edge.coord - height
+            record.touching = edge
+
+            def finished():
+                if record.state == STATE_REVEALING:
+                    self.set_state(record, STATE_DOCKED_VISIBLE)
+                if on_finished:
+                    on_finished()
+
+            self.set_state(record, STATE_REVEALING)
+            self.slide_window(hwnd, rect, (x, y, x + width, y + height), finished)
             
         except Exception as e:
             logging.error(f"Error in show_window: {str(e)}")
 
     def closeEvent(self, event):
-        # 确保在关闭窗口时取消钩子
-        if self.hook:
-            self.user32.UnhookWindowsHookEx(self.hook)
-            self.hook = None
+        # 确保在关闭窗口时关闭选择窗口的遮罩
+        self.cancel_window_selection()
         super().closeEvent(event)
 
 def main():
     try:
+        startup_timer.mark('imports')
         logging.info('Application starting')
+        # --recover：不启动界面，只把上次崩溃后留在屏幕外的窗口移回原位
+        if '--recover' in sys.argv:
+            try:
+                recovered = recover_journal()
+            except Exception as e:
+                logging.error(f'Error recovering hidden windows: {str(e)}\n{traceback.format_exc()}')
+                return 1
+            print(f'Recovered {len(recovered)} hidden windows')
+            return 0
         # 确保只有一个QApplication实例
         if not QApplication.instance():
             app = QApplication(sys.argv)
         else:
             app = QApplication.instance()
+        startup_timer.mark('qapplication')
             
         window_manager = WindowManager()
-        window_manager.show()
-        logging.info('Main window shown')
-        
-        # 确保窗口显示在最前面
-        window_manager.raise_()
-        window_manager.activateWindow()
+        startup_timer.mark('tray')
+        # --trace 文件 或环境变量 WM_TRACE：记录跟踪轨迹，用 wmtrace.py 查看和回放
+        trace_path = os.environ.get('WM_TRACE')
+        if '--trace' in sys.argv[:-1]:
+            trace_path = sys.argv[sys.argv.index('--trace') + 1]
+        if trace_path:
+            window_manager.start_trace(trace_path)
+        # --headless 只运行跟踪引擎、托盘和本地控制接口，不创建主窗口界面
+        headless = '--headless' in sys.argv
+        if headless or '--ipc' in sys.argv:
+            window_manager.start_control_server()
+        if headless:
+            QTimer.singleShot(0, window_manager.finish_headless_startup)
+        else:
+            # 主窗口界面在事件循环启动后再创建，托盘图标先可用
+            QTimer.singleShot(0, window_manager.finish_startup)
         
         return app.exec()
     except Exception as e:
@@ -487,6 +4255,8 @@ def main():
         return 1
 
 if __name__ == '__main__':
+    # 设置日志到控制台和文件
+    setup_logging()
     try:
         logging.info('Script started')
         # 添加命令行参数，用于调试
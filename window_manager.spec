@@ -10,7 +10,7 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=['matplotlib', 'numpy', 'pandas'],  # 排除不需要的库
+    excludes=['matplotlib', 'numpy', 'pandas', 'tkinter', 'unittest', 'pydoc'],  # 排除不需要的库
     noarchive=False,
     optimize=2,  # 优化级别设为最高
 )
@@ -28,7 +28,8 @@ exe = EXE(
     strip=False,
     upx=True,
     upx_dir='C:\\Program Files\\UPX',  # 指定 UPX 安装路径
-    upx_exclude=[],
+    # Qt 和 VC 运行库不压缩：单文件程序每次启动都要解压，UPX 压缩的 DLL 加载时还要再解压一次
+    upx_exclude=['Qt6Core.dll', 'Qt6Gui.dll', 'Qt6Widgets.dll', 'qwindows.dll', 'vcruntime140.dll'],
     runtime_tmpdir=None,
     console=False,  # 设置为False以隐藏控制台窗口
     disable_windowed_traceback=False,
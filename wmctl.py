@@ -0,0 +1,136 @@
+"""窗口管理器的命令行控制客户端
+
+通过本地控制接口（Windows 上为命名管道，其他平台为本地套接字）控制以
+--headless 或 --ipc 启动的 window_manager.py，每个请求一行 JSON，结果以 JSON 输出。
+
+用法：
+    python wmctl.py list
+    python wmctl.py add --hwnd 0x1234 [--edge right] [--monitor 0]
+    python wmctl.py add --exe notepad.exe [--class-name Notepad] [--title 正则] [--edge top] [--keep]
+    python wmctl.py add --exact --exe notepad.exe --class-name Notepad [--title "a.txt - 记事本"]
+    python wmctl.py dock 0x1234 right [--monitor 1]
+    python wmctl.py reveal 0x1234
+    python wmctl.py remove 0x1234 | --all
+    python wmctl.py stats
+    python wmctl.py batch requests.jsonl     每行一个 JSON 请求，全部放在一次往返中发送（- 表示标准输入）
+    python wmctl.py quit
+"""
+import argparse
+import json
+import sys
+
+from PyQt6.QtCore import QCoreApplication
+from PyQt6.QtNetwork import QLocalSocket
+
+IPC_SERVER_NAME = 'window_manager_control'  # 与 window_manager.IPC_SERVER_NAME 一致
+TIMEOUT_MS = 5000
+
+
+class ControlClient:
+    """阻塞式的控制接口客户端，一个连接可以发送多个请求"""
+
+    def __init__(self, name=IPC_SERVER_NAME, timeout_ms=TIMEOUT_MS):
+        if QCoreApplication.instance() is None:
+            self.app = QCoreApplication(sys.argv[:1])
+        self.timeout_ms = timeout_ms
+        self.socket = QLocalSocket()
+        self.socket.connectToServer(name)
+        if not self.socket.waitForConnected(timeout_ms):
+            raise ConnectionError(f'cannot connect to {name}: {self.socket.errorString()}')
+        self.buffer = b''
+
+    def send(self, request):
+        """发送一个请求（dict）或一批请求（list），返回对应的响应"""
+        self.socket.write(json.dumps(request, ensure_ascii=False).encode('utf-8') + b'\n')
+        self.socket.flush()
+        while b'\n' not in self.buffer:
+            if not self.socket.waitForReadyRead(self.timeout_ms):
+                raise TimeoutError(f'no reply: {self.socket.errorString()}')
+            self.buffer += self.socket.readAll().data()
+        line, self.buffer = self.buffer.split(b'\n', 1)
+        return json.loads(line)
+
+    def close(self):
+        self.socket.disconnectFromServer()
+
+
+def parse_hwnd(text):
+    return int(text, 0)
+
+
+def build_request(args):
+    if args.command == 'add':
+        request = {'cmd': 'add'}
+        if args.hwnd is not None:
+            request['hwnd'] = args.hwnd
+        for key in ('exe', 'class_name', 'title', 'edge', 'monitor'):
+            if getattr(args, key) is not None:
+                request[key] = getattr(args, key)
+        for key in ('exact', 'keep'):
+            if getattr(args, key):
+                request[key] = True
+        return request
+    if args.command == 'dock':
+        request = {'cmd': 'dock', 'hwnd': args.hwnd, 'edge': args.edge}
+        if args.monitor is not None:
+            request['monitor'] = args.monitor
+        return request
+    if args.command == 'reveal':
+        return {'cmd': 'reveal', 'hwnd': args.hwnd}
+    if args.command == 'remove':
+        if args.all:
+            return {'cmd': 'remove', 'all': True}
+        if args.hwnd is None:
+            raise SystemExit('remove needs a window handle or --all')
+        return {'cmd': 'remove', 'hwnd': args.hwnd}
+    if args.command == 'batch':
+        f = sys.stdin if args.file == '-' else open(args.file, 'r', encoding='utf-8')
+        with f:
+            return [json.loads(line) for line in f if line.strip()]
+    return {'cmd': args.command}
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='窗口管理器控制客户端')
+    parser.add_argument('--server', default=IPC_SERVER_NAME, help='控制接口名称')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help='列出受管窗口')
+    add = commands.add_parser('add', help='按窗口句柄或规则加入管理')
+    add.add_argument('--hwnd', type=parse_hwnd)
+    add.add_argument('--exe')
+    add.add_argument('--class-name', dest='class_name')
+    add.add_argument('--title', help='标题正则表达式，--exact 时为完整标题')
+    add.add_argument('--exact', action='store_true', help='按标识加入：exe 和类名必须给出，标题完全相同')
+    add.add_argument('--edge', choices=('right', 'top', 'left', 'bottom'))
+    add.add_argument('--monitor', type=int)
+    add.add_argument('--keep', action='store_true', help='规则同时用于之后出现的窗口')
+    dock = commands.add_parser('dock', help='贴到边缘并隐藏')
+    dock.add_argument('hwnd', type=parse_hwnd)
+    dock.add_argument('edge', choices=('right', 'top', 'left', 'bottom'))
+    dock.add_argument('--monitor', type=int)
+    reveal = commands.add_parser('reveal', help='显示隐藏的窗口')
+    reveal.add_argument('hwnd', type=parse_hwnd)
+    remove = commands.add_parser('remove', help='停止管理窗口')
+    remove.add_argument('hwnd', type=parse_hwnd, nargs='?')
+    remove.add_argument('--all', action='store_true')
+    commands.add_parser('stats', help='运行统计')
+    batch = commands.add_parser('batch', help='一次往返发送多个请求')
+    batch.add_argument('file')
+    commands.add_parser('quit', help='退出窗口管理器')
+    args = parser.parse_args(argv)
+
+    request = build_request(args)
+    try:
+        client = ControlClient(args.server)
+        reply = client.send(request)
+        client.close()
+    except (ConnectionError, TimeoutError) as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    print(json.dumps(reply, indent=2, ensure_ascii=False))
+    replies = reply if isinstance(reply, list) else [reply]
+    return 0 if all(item.get('ok') for item in replies) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
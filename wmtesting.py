@@ -0,0 +1,156 @@
+"""测试和性能基准共用的辅助函数
+
+在离屏 Qt 和 FakeBackend 上创建/销毁 WindowManager，以及在子进程中测量启动、内存
+和运行控制接口客户端。tests/ 和 benchmark.py 都从这里导入，避免各自维护一份。
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from PyQt6.QtCore import QEvent
+
+import window_manager as wm
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# 两个并排的 1920x1080 显示器
+DESKTOP_MONITORS = [(0, 0, 1920, 1080), (1920, 0, 1920, 1080)]
+TICK_MS = wm.TICK_NORMAL_MS  # 与默认检测间隔一致
+
+
+def flush_events(app):
+    """处理挂起的事件，包括 deleteLater，模拟一次事件循环"""
+    app.sendPostedEvents(None, QEvent.Type.DeferredDelete.value)
+    app.processEvents()
+
+
+def fake_manager(backend=None, monitors=DESKTOP_MONITORS, clock=None, **paths):
+    """模拟后端上的 WindowManager：默认不读写会话/规则/日志文件，停止定时检测
+
+    clock 不为 None 时管理器、动画和命令执行器共用这个虚拟时钟。
+    """
+    paths = {'session_path': None, 'rules_path': None, 'journal_path': None, **paths}
+    manager = wm.WindowManager(wm.FakeBackend() if backend is None else backend, **paths)
+    manager.scheduler.stop()
+    if clock is not None:
+        manager.clock = manager.animator.clock = manager.commands.clock = clock
+    if monitors:
+        manager.apply_monitor_layout(wm.MonitorLayout(monitors))
+    return manager
+
+
+def close_manager(manager):
+    """停止所有定时器并销毁管理器，不保存会话、不写入日志（与崩溃时相同）"""
+    manager.scheduler.stop()
+    manager.animator.timer.stop()
+    manager.journal_timer.stop()
+    manager.commands.stop()
+    if manager.control_server is not None:
+        manager.control_server.close()
+    if manager.journal is not None:
+        manager.journal.close_file()
+    manager.tray_icon.hide()
+    manager.deleteLater()
+
+
+def on_screen(rect, monitors=DESKTOP_MONITORS):
+    left, top, right, bottom = rect
+    return any(x <= left and y <= top and right <= x + width and bottom <= y + height
+               for x, y, width, height in monitors)
+
+
+def run_python(args):
+    """在离屏 Qt 的子进程中运行 Python，返回 CompletedProcess"""
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+    return subprocess.run([sys.executable, *args], capture_output=True, text=True, check=True,
+                          cwd=ROOT, env=env, timeout=60)
+
+
+def run_script(script, *args):
+    """运行子进程脚本，返回最后一行输出的 JSON"""
+    return json.loads(run_python(['-c', script, *args]).stdout.strip().splitlines()[-1])
+
+
+# 冷启动：各阶段耗时、托盘出现时已加载的模块，以及主窗口界面是否在之后才创建
+STARTUP_SCRIPT = '''
+import json, sys
+import window_manager as wm
+from PyQt6.QtWidgets import QApplication
+wm.startup_timer.mark('imports')
+app = QApplication(sys.argv[:1])
+wm.startup_timer.mark('qapplication')
+manager = wm.WindowManager(wm.FakeBackend(), session_path=None, rules_path=None, journal_path=None)
+wm.startup_timer.mark('tray')
+tray_first = manager.tray_icon.isVisible() and not manager.ui_ready
+modules = sorted(sys.modules)
+manager.finish_startup()
+print(json.dumps({'modules': modules, 'tray_first': tray_first, 'ui_ready': manager.ui_ready,
+                  'startup_ms': wm.startup_timer.as_dict()}))
+'''
+
+# 峰值常驻内存：参数为 headless（无界面模式）或 ui（显示并绘制主窗口后）。
+# ru_maxrss 会从父进程继承，读取子进程自己的 VmHWM，只在有 /proc 的平台上可用
+RSS_SCRIPT = '''
+import json, re, sys
+import window_manager as wm
+from PyQt6.QtWidgets import QApplication
+app = QApplication(sys.argv[:1])
+manager = wm.WindowManager(wm.FakeBackend(), session_path=None, rules_path=None, journal_path=None)
+if sys.argv[1] == 'headless':
+    manager.finish_headless_startup()
+else:
+    manager.finish_startup()
+for _ in range(5):
+    app.processEvents()
+if manager.isVisible():
+    manager.grab()  # 确认主窗口真的绘制过一次
+with open('/proc/self/status') as f:
+    rss_kb = int(re.search(r'VmHWM:\\s*(\\d+) kB', f.read()).group(1))
+print(json.dumps({'rss_kb': rss_kb, 'visible': manager.isVisible(), 'ui_ready': manager.ui_ready}))
+'''
+
+# 控制接口客户端：逐个发送请求（dict 或批量的 list），输出各自的回复和往返耗时
+CLIENT_SCRIPT = '''
+import json, sys, time
+import wmctl
+name, script = json.loads(sys.stdin.read())
+client = wmctl.ControlClient(name)
+replies = []
+latencies = []
+for request in script:
+    start = time.perf_counter()
+    replies.append(client.send(request))
+    latencies.append(time.perf_counter() - start)
+client.close()
+print(json.dumps({'replies': replies, 'latencies': latencies}))
+'''
+
+
+def run_client(app, name, script):
+    """在子进程中向控制接口 name 发送 script，等待期间处理本进程的 Qt 事件
+
+    返回 {'replies': [...], 'latencies': [秒, ...]}，客户端出错时抛出 RuntimeError。
+    """
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+    # 输出写到临时文件，避免管道写满时子进程阻塞
+    with tempfile.TemporaryFile('w+') as stdout, tempfile.TemporaryFile('w+') as stderr:
+        process = subprocess.Popen(
+            [sys.executable, '-c', CLIENT_SCRIPT], stdin=subprocess.PIPE, stdout=stdout, stderr=stderr,
+            text=True, cwd=ROOT, env=env,
+        )
+        process.stdin.write(json.dumps([name, script]))
+        process.stdin.close()
+        deadline = time.perf_counter() + 60
+        while process.poll() is None and time.perf_counter() < deadline:
+            app.processEvents()
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        stdout.seek(0)
+        stderr.seek(0)
+        if process.returncode != 0:
+            raise RuntimeError(f'control client failed: {stderr.read()}')
+        return json.loads(stdout.read().strip().splitlines()[-1])
@@ -0,0 +1,131 @@
+"""跟踪轨迹的查看和回放工具
+
+轨迹由 window_manager.py --trace 文件（或环境变量 WM_TRACE）记录，
+回放在离屏 Qt 下用 FakeBackend 重建窗口，不需要 Windows 和 pywin32。
+
+用法：
+    python wmtrace.py dump trace.bin             逐条输出记录
+    python wmtrace.py summary trace.bin          统计各类记录的数量和时长
+    python wmtrace.py replay trace.bin           回放并与记录的决策对比，不一致时返回 1
+    python wmtrace.py replay trace.bin --repeat 20   重复回放，输出每次检测的耗时
+"""
+import argparse
+import collections
+import os
+import sys
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt6.QtCore import QEvent
+from PyQt6.QtWidgets import QApplication
+
+import window_manager as wm
+
+KIND_NAMES = {
+    wm.TRACE_TICK: 'tick', wm.TRACE_CURSOR: 'cursor', wm.TRACE_CURSOR_ERROR: 'cursor-error',
+    wm.TRACE_RECT: 'rect', wm.TRACE_GONE: 'gone', wm.TRACE_LAYOUT: 'layout', wm.TRACE_MANAGE: 'manage',
+    wm.TRACE_UNMANAGE: 'unmanage', wm.TRACE_PIN: 'pin', wm.TRACE_ZONE: 'zone',
+    wm.TRACE_DECISION: 'decision', wm.TRACE_CONFIG: 'config',
+}
+
+
+def format_decision(decision):
+    side = '-' if decision.side == wm.TRACE_NO_EDGE else wm.MonitorLayout.SIDES[decision.side]
+    return (f'{decision.time:10.3f}  {decision.hwnd:#x} {wm.TRACE_ACTIONS[decision.action]} '
+            f'{side}@{decision.coord} monitor {decision.monitor} rect {decision.rect}')
+
+
+def format_record(t, kind, values):
+    if kind == wm.TRACE_DECISION:
+        action = values[1]
+        external = ' (external)' if action & wm.TRACE_EXTERNAL else ''
+        decision = wm.TraceDecision(t, values[0], action & ~wm.TRACE_EXTERNAL, *values[2:5], values[5:])
+        return format_decision(decision) + external
+    if kind in (wm.TRACE_RECT, wm.TRACE_GONE, wm.TRACE_MANAGE, wm.TRACE_UNMANAGE, wm.TRACE_PIN, wm.TRACE_ZONE):
+        values = (f'{values[0]:#x}',) + tuple(values[1:])
+    return f'{t:10.3f}  {KIND_NAMES[kind]} ' + ' '.join(str(value) for value in values)
+
+
+def dump(path):
+    with wm.TraceReader(path) as reader:
+        for t, kind, values in reader:
+            print(format_record(t, kind, values))
+        if reader.truncated:
+            print('(trace ends with an incomplete record)')
+    return 0
+
+
+def summary(path):
+    counts = collections.Counter()
+    duration = 0.0
+    with wm.TraceReader(path) as reader:
+        for t, kind, values in reader:
+            counts[KIND_NAMES[kind]] += 1
+            duration = t
+        size = len(reader.data)
+        truncated = reader.truncated
+    records = sum(counts.values())
+    print(f'{path}: {size} bytes, {records} records, {duration:.3f} s'
+          f'{" (truncated)" if truncated else ""}')
+    for name, count in counts.most_common():
+        print(f'  {name}: {count}')
+    return 0
+
+
+def replay_once(app, path):
+    manager = wm.WindowManager(wm.FakeBackend(), session_path=None, rules_path=None, journal_path=None)
+    try:
+        replayer = wm.TraceReplayer(manager)
+        with wm.TraceReader(path) as reader:
+            start = time.perf_counter()
+            recorded, replayed = replayer.run(reader)
+            elapsed = time.perf_counter() - start
+        return recorded, replayed, replayer.ticks, elapsed
+    finally:
+        manager.tray_icon.hide()
+        manager.deleteLater()
+        # 没有运行事件循环，手动处理 deleteLater，重复回放时不会累积管理器
+        app.sendPostedEvents(None, QEvent.Type.DeferredDelete.value)
+
+
+def replay(app, path, repeat):
+    recorded, replayed, ticks, elapsed = replay_once(app, path)
+    index = wm.TraceReplayer.first_divergence(recorded, replayed)
+    print(f'{ticks} ticks, {len(recorded)} recorded decisions, {len(replayed)} replayed')
+    if index is not None:
+        print(f'diverged at decision {index}:')
+        print('  recorded: ' + (format_decision(recorded[index]) if index < len(recorded) else '(none)'))
+        print('  replayed: ' + (format_decision(replayed[index]) if index < len(replayed) else '(none)'))
+    timings = [elapsed]
+    for _ in range(repeat - 1):
+        timings.append(replay_once(app, path)[3])
+    best = min(timings)
+    if ticks:
+        print(f'replay: best {best * 1000:.3f} ms, {best * 1e6 / ticks:.2f} us per tick over {len(timings)} runs')
+    return 0 if index is None else 1
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='跟踪轨迹查看和回放工具')
+    commands = parser.add_subparsers(dest='command', required=True)
+    for name, text in (('dump', '逐条输出记录'), ('summary', '统计记录'), ('replay', '回放并对比决策')):
+        command = commands.add_parser(name, help=text)
+        command.add_argument('trace')
+        if name == 'replay':
+            command.add_argument('--repeat', type=int, default=1, help='重复回放次数，用于测量耗时')
+    args = parser.parse_args(argv)
+    try:
+        if args.command == 'dump':
+            return dump(args.trace)
+        if args.command == 'summary':
+            return summary(args.trace)
+        app = QApplication.instance() or QApplication(sys.argv[:1])
+        return replay(app, args.trace, max(args.repeat, 1))
+    except (OSError, ValueError) as e:
+        print(str(e), file=sys.stderr)
+        return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))